@@ -1,5 +1,34 @@
-from .causadb import CausaDB
-from .model import Model
-from .data import Data
-
 from .__version__ import __version__
+
+# Public classes are imported on first access (PEP 562), so that `import causadb` doesn't load
+# pandas, numpy, pydantic or requests until they are needed
+_LAZY_IMPORTS = {
+    "CausaDB": ".causadb",
+    "Model": ".model",
+    "Data": ".data",
+    "HedgePolicy": ".hedging",
+    "SimulationResult": ".results",
+    "PosteriorSamples": ".results",
+    "LocalModel": ".local",
+    "ResponseSurface": ".surface",
+    "BulkJob": ".jobs",
+    "ActionOptimizer": ".optimize",
+    "ModelEnsemble": ".ensemble",
+}
+
+__all__ = [*_LAZY_IMPORTS, "__version__"]
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        import importlib
+
+        value = getattr(importlib.import_module(
+            _LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_LAZY_IMPORTS])
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+DEFAULT_TOKEN_CACHE_PATH = "~/.causadb/token-cache.json"
+
+
+class TokenCache:
+    """Remembers which tokens the server accepted recently, so clients can skip validating them.
+
+    Entries are kept in memory and in a file shared by all processes of the user, keyed by a hash
+    of the server URL and the token (the token itself is never written). Entries expire after
+    `ttl` seconds and are removed as soon as the server rejects the token.
+    """
+
+    def __init__(self, path: str = DEFAULT_TOKEN_CACHE_PATH, ttl: float = 3600.0) -> None:
+        """Initializes the TokenCache class.
+
+        Args:
+            path (str, optional): The cache file. Pass None to keep the cache in memory only.
+                Defaults to ~/.causadb/token-cache.json.
+            ttl (float): The number of seconds a validation is trusted for. Defaults to one hour.
+        """
+        self.path = os.path.expanduser(path) if path is not None else None
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        return {"path": self.path, "ttl": self.ttl}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    @staticmethod
+    def _key(url: str, token: str) -> str:
+        return hashlib.sha256(f"{url}\n{token}".encode()).hexdigest()
+
+    def is_valid(self, url: str, token: str) -> bool:
+        """Check whether a token was accepted by a server within the TTL.
+
+        Args:
+            url (str): The server URL.
+            token (str): The token secret.
+
+        Returns:
+            bool: Whether the token can be used without validating it.
+        """
+        key = self._key(url, token)
+        now = time.time()
+
+        with self._lock:
+            if self._entries.get(key, 0) > now:
+                return True
+
+            entries = self._read()
+            self._entries.update(entries)
+            return entries.get(key, 0) > now
+
+    def add(self, url: str, token: str) -> None:
+        """Record that a server accepted a token.
+
+        Args:
+            url (str): The server URL.
+            token (str): The token secret.
+        """
+        self._set(self._key(url, token), time.time() + self.ttl)
+
+    def invalidate(self, url: str, token: str) -> None:
+        """Forget a token, e.g. after the server rejected it.
+
+        Args:
+            url (str): The server URL.
+            token (str): The token secret.
+        """
+        self._set(self._key(url, token), None)
+
+    def _set(self, key: str, expires_at: float) -> None:
+        with self._lock:
+            if expires_at is None:
+                self._entries.pop(key, None)
+            else:
+                self._entries[key] = expires_at
+
+            if self.path is None:
+                return
+
+            now = time.time()
+            entries = {k: v for k, v in self._read().items() if v > now}
+            if expires_at is None:
+                entries.pop(key, None)
+            else:
+                entries[key] = expires_at
+            self._write(entries)
+
+    def _read(self) -> dict:
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, entries: dict) -> None:
+        # Write to a temporary file and rename it, so concurrent readers never see a partial file
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # The cache is an optimisation, so an unwritable file only costs extra validations
+            pass
+
+
+_default_token_cache = None
+
+
+def default_token_cache() -> TokenCache:
+    """Get the token cache shared by the clients of this process."""
+    global _default_token_cache
+    if _default_token_cache is None:
+        _default_token_cache = TokenCache()
+    return _default_token_cache
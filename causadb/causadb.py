@@ -1,10 +1,23 @@
-import requests
 import os
-import toml
+import pickle
+import threading
+import requests
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Iterable, Union
 from pydantic import validate_call
+from .auth import TokenCache, default_token_cache
 from .data import Data
 from .model import Model
-from .utils import get_causadb_url, set_causadb_url
+from .deadlines import Deadline, deadline
+from .lanes import lane as lane_context
+from .endpoints import EndpointSelector
+from .hedging import HedgePolicy
+from .metrics import ClientStats
+from .tracing import Span
+from .executor import QueryResult, iter_concurrent
+from .ratelimit import RateController
+from .transport import Transport
+from .utils import get_causadb_url, load_config
 
 
 class CausaDB:
@@ -17,23 +30,104 @@ class CausaDB:
     def __str__(self) -> str:
         return "CausaDB client"
 
-    def __init__(self, token: str = None, custom_url: str = None) -> None:
+    def __init__(self, token: str = None, custom_url: Union[str, list[str], EndpointSelector] = None, pool_size: int = 16, rate_limit: float = None,
+                 max_concurrency: int = 64, bulk_concurrency: int = 4, max_retries: int = 5,
+                 timeout: Union[float, tuple[float, float]] = (10.0, 300.0),
+                 hedging: Union[bool, HedgePolicy] = False, slow_call_threshold: float = None,
+                 token_cache: Union[bool, TokenCache] = True) -> None:
         """Initializes the CausaDB client.
 
+        The token is not validated here, so creating a client makes no network requests. It is validated by the
+        first request (an invalid token raises an exception there), or immediately by `set_token`.
+
         Args:
-            custom_url (str, optional): The URL of the CausaDB server. For custom deployments or development purposes. Defaults to None.
+            token (str, optional): Token secret provided by CausaDB. Defaults to the token in ~/.causadb/config.toml.
+            custom_url (Union[str, list[str], EndpointSelector], optional): The URL of the CausaDB server, for custom
+                deployments or development purposes. Pass a list of equivalent URLs (e.g. regional endpoints) to send
+                requests to the one with the lowest latency and fail over between them, or an EndpointSelector to
+                configure probing. The URL only applies to this client. Defaults to the CAUSADB_URL environment
+                variable, or the CausaDB cloud.
+            pool_size (int, optional): The maximum number of connections kept open to the server. Defaults to 16.
+            rate_limit (float, optional): The maximum number of requests per second sent by this client. Defaults to no limit.
+            max_concurrency (int, optional): The maximum number of requests in flight. The client lowers this
+                automatically while the server is throttling requests. Defaults to 64.
+            bulk_concurrency (int, optional): The maximum number of bulk requests (e.g. data uploads) in flight. Bulk
+                requests have their own connections and wait while interactive requests are waiting. Defaults to 4.
+            max_retries (int, optional): The maximum number of times a throttled (429/503) request is retried. Defaults to 5.
+            timeout (Union[float, tuple[float, float]], optional): The default (connect, read) timeouts of every request,
+                in seconds. Use `deadline` to bound a group of calls. Defaults to (10, 300).
+            hedging (Union[bool, HedgePolicy], optional): Whether to hedge read queries (simulations, effects, attributions
+                and status/config lookups): if one is slow, a duplicate is sent and the first response is used. Pass a
+                HedgePolicy to configure the delay and the budget capping extra load. Defaults to False.
+            slow_call_threshold (float, optional): Calls taking longer than this many seconds are logged as warnings
+                and kept in the slow-call log of `stats`. Defaults to no slow-call log.
+            token_cache (Union[bool, TokenCache], optional): Whether to remember tokens the server accepted (in memory
+                and in ~/.causadb/token-cache.json), so `set_token` can skip validating them. Pass a TokenCache to
+                configure the file and TTL. Defaults to True.
         """
+        # Settings the client can be rebuilt from, e.g. after being pickled
+        self._settings = {
+            "custom_url": custom_url,
+            "pool_size": pool_size,
+            "rate_limit": rate_limit,
+            "max_concurrency": max_concurrency,
+            "bulk_concurrency": bulk_concurrency,
+            "max_retries": max_retries,
+            "timeout": timeout,
+            "hedging": hedging,
+            "slow_call_threshold": slow_call_threshold,
+            "token_cache": token_cache,
+        }
+        self._transport, self._stats = _build_transport(self._settings)
+        self._token_cache = default_token_cache() if token_cache is True else token_cache or None
+        self._token_validated = False
+        self._config_token = None
+
         # If the token is not provided, try to load it from the config file
         if token is None:
-            token = self._load_token()
+            token = self._config_token = self._load_token()
 
-        # If we now have a token, set it. If not, the user will have to use set_token.
+        # If we now have a token, use it, validating it on the first request. If not, the user will have to
+        # use set_token.
         if token is not None:
-            self.set_token(token)
+            self.token = token
+
+    def __getstate__(self) -> dict:
+        # A token from the config file is loaded again where the client is unpickled, rather than copied. Hooks
+        # and connections aren't pickled.
+        token = getattr(self, "token", None)
+        return {
+            "settings": self._settings,
+            "token": token if token != self._config_token else None,
+            "token_validated": self._token_validated,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        # Clients unpickled in the same process share a transport, so a pool of workers each receiving clients
+        # (or models) keeps one set of connections per process
+        self._settings = state["settings"]
+        self._transport, self._stats = _shared_transport(self._settings)
+        token_cache = self._settings["token_cache"]
+        self._token_cache = default_token_cache() if token_cache is True else token_cache or None
+        self._token_validated = state["token_validated"]
+        self._config_token = None
+
+        token = state["token"]
+        if token is None:
+            token = self._config_token = self._load_token()
+        if token is not None:
+            self.token = token
 
-        # If a custom URL is provided, set it
-        if custom_url is not None:
-            set_causadb_url(custom_url)
+    @property
+    def url(self) -> str:
+        """The URL of the CausaDB server this client sends requests to."""
+        return self._transport.base_url
+
+    @property
+    def _deployment(self) -> str:
+        # Identifies the deployment independently of which of its endpoints is currently in use
+        endpoints = self._transport.endpoints
+        return ",".join(endpoints.urls) if endpoints is not None else get_causadb_url()
 
     def _load_token(self) -> str:
         """Load the token from the config file.
@@ -41,21 +135,134 @@ class CausaDB:
         Returns:
             str: The token secret.
         """
-        dir_name = os.path.expanduser("~/.causadb")
-        config_filepath = os.path.join(dir_name, "config.toml")
-
-        if not os.path.exists(config_filepath):
+        try:
+            config = load_config()
+        except FileNotFoundError:
             raise Exception("No token found")
 
-        with open(config_filepath, "r") as f:
-            config = toml.load(f)
-
         token_secret = config \
             .get("default", {}) \
             .get("token_secret", None)
 
         return token_secret
 
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send an authenticated request to the CausaDB server over the pooled transport.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path of the endpoint, relative to the server URL (e.g. "/models").
+            kwargs: Additional arguments passed to `Transport.request` (e.g. `json`, `headers`).
+
+        Returns:
+            requests.Response: The server response.
+
+        Raises:
+            Exception: If the server rejects the token.
+        """
+        client_token = getattr(self, "token", None)
+        token = (kwargs.get("headers") or {}).get("token", client_token)
+        response = self._transport.request(method, path, token=client_token, **kwargs)
+
+        if response.status_code == 401:
+            if token == client_token:
+                self._token_validated = False
+            if self._token_cache is not None and token is not None:
+                self._token_cache.invalidate(self._deployment, token)
+            raise Exception("Invalid token")
+
+        # The first request accepted with the client's token validates it
+        if not self._token_validated and token is not None and token == client_token and response.ok:
+            self._token_validated = True
+            if self._token_cache is not None:
+                self._token_cache.add(self._deployment, token)
+
+        return response
+
+    def before_request(self, hook: Callable[[Span], None]) -> Callable[[Span], None]:
+        """Register a function to call before every request. Can be used as a decorator.
+
+        The hook receives the request's Span, and may add headers (e.g. trace context) to `span.headers`.
+
+        Args:
+            hook (Callable[[Span], None]): The function to call.
+
+        Returns:
+            Callable[[Span], None]: The hook.
+        """
+        self._transport.before_request_hooks.append(hook)
+        return hook
+
+    def after_request(self, hook: Callable[[Span], None]) -> Callable[[Span], None]:
+        """Register a function to call after every request, including failed ones. Can be used as a decorator.
+
+        The hook receives the request's Span, with the endpoint, model name, payload sizes, status, and the
+        serialisation, network and decode times.
+
+        Args:
+            hook (Callable[[Span], None]): The function to call.
+
+        Returns:
+            Callable[[Span], None]: The hook.
+
+        Example:
+            >>> @client.after_request
+            ... def log_span(span):
+            ...     print(span.name, span.model_name, span.network_time)
+        """
+        self._transport.after_request_hooks.append(hook)
+        return hook
+
+    def stats(self) -> ClientStats:
+        """Get statistics of the requests made by this client.
+
+        Returns:
+            ClientStats: Per-endpoint call counts, latency percentiles, bytes sent and received, retries, cache hit
+                rates and slow calls. Use `summary()` for a dataframe or `to_prometheus()` for Prometheus metrics.
+
+        Example:
+            >>> client.stats().summary()[["calls", "p50", "p95", "p99"]]
+        """
+        return self._stats
+
+    def deadline(self, timeout: float = None) -> ContextManager[Deadline]:
+        """Apply a deadline to every request made inside a `with` block.
+
+        The server is told the deadline, so it can give up on work the client will no longer wait
+        for. The returned Deadline can be cancelled from another thread, which aborts the calls
+        in the block, including any request in flight.
+
+        Args:
+            timeout (float, optional): The time limit in seconds. Defaults to no time limit (cancellation only).
+
+        Returns:
+            ContextManager[Deadline]: A context manager yielding the deadline.
+
+        Example:
+            >>> with client.deadline(0.5):
+            ...     effects = model.causal_effects({"x": [0, 1]})
+        """
+        return deadline(timeout)
+
+    def lane(self, name: str) -> ContextManager[str]:
+        """Send every request made inside a `with` block in a priority lane.
+
+        Requests are "interactive" by default, except data uploads and `find_best_actions`, which are "bulk". Bulk
+        requests use separate connections and a lower concurrency limit, and wait while interactive requests are
+        waiting, so background work doesn't slow down latency-sensitive calls.
+
+        Args:
+            name (str): The lane, "interactive" or "bulk".
+
+        Returns:
+            ContextManager[str]: A context manager yielding the lane.
+
+        Example:
+            >>> with client.lane("bulk"):
+            ...     client.map_queries(lambda node: model.causal_attributions(node), nodes)
+        """
+        return lane_context(name)
+
     @validate_call
     def set_token(self, token: str) -> None:
         """Set the token for the CausaDB client.
@@ -67,16 +274,28 @@ class CausaDB:
             Exception: If the token is invalid.
         """
 
+        # Tokens the server accepted recently don't need validating again
+        if self._token_cache is not None:
+            cached = self._token_cache.is_valid(self._deployment, token)
+            self._stats.record_cache("token", cached)
+            if cached:
+                self.token = token
+                self._token_validated = True
+                return
+
         # Verify that the tokens are correct
         headers = {"token": token}
-        response = requests.get(
-            f"{get_causadb_url()}/account",
+        response = self._request(
+            "GET", "/account",
             headers=headers
         )
 
         # If the response is successful, set the tokens
         if response.status_code == 200:
             self.token = token
+            self._token_validated = True
+            if self._token_cache is not None:
+                self._token_cache.add(self._deployment, token)
         else:
             raise Exception("Invalid token")
 
@@ -114,11 +333,9 @@ class CausaDB:
         Returns:
             Model: The model object.
         """
-        headers = {"token": self.token}
-
         try:
-            response = requests.get(
-                f"{get_causadb_url()}/models/{model_name}", headers=headers
+            response = self._request(
+                "GET", f"/models/{model_name}"
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -135,11 +352,9 @@ class CausaDB:
         Returns:
             list[Model]: A list of model objects.
         """
-        headers = {"token": self.token}
-
         try:
-            response = requests.get(
-                f"{get_causadb_url()}/models", headers=headers
+            response = self._request(
+                "GET", "/models"
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -161,10 +376,9 @@ class CausaDB:
         Returns:
             Data: The data object.
         """
-        headers = {"token": self.token}
         try:
-            response = requests.get(
-                f"{get_causadb_url()}/data/{data_name}", headers=headers
+            response = self._request(
+                "GET", f"/data/{data_name}"
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -179,11 +393,9 @@ class CausaDB:
         Returns:
             list[Data]: A list of data objects.
         """
-        headers = {"token": self.token}
-
         try:
-            response = requests.get(
-                f"{get_causadb_url()}/data", headers=headers
+            response = self._request(
+                "GET", "/data"
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -194,3 +406,77 @@ class CausaDB:
             data_list.append(data)
 
         return data_list
+
+    def map_queries(self, query: Callable[[Any], Any], items: Iterable, max_workers: int = 8,
+                    ordered: bool = True, progress: bool = False, lane: str = None) -> list[QueryResult]:
+        """Run a query for each item concurrently over the client's pooled connections.
+
+        Errors are captured per item rather than aborting the batch, so a failed query can be
+        inspected or retried afterwards.
+
+        Args:
+            query (Callable): A function taking one item and running a query with it.
+            items (Iterable): The items to run the query for (e.g. models or node names).
+            max_workers (int, optional): The number of queries to run at once. Defaults to 8.
+            ordered (bool, optional): Whether to return results in input order rather than completion order. Defaults to True.
+            progress (bool, optional): Whether to display a progress bar. Defaults to False.
+            lane (str, optional): The lane to send the queries in, e.g. "bulk" for background work. Defaults to the
+                lane of the calling context.
+
+        Returns:
+            list[QueryResult]: One result per item, holding either the returned `value` or the raised `error`.
+
+        Example:
+            >>> results = client.map_queries(
+            ...     lambda model: model.causal_attributions("y"),
+            ...     client.list_models(),
+            ... )
+            >>> attributions = {r.item.model_name: r.value for r in results if r.ok}
+        """
+        items = list(items)
+
+        with lane_context(lane) if lane is not None else nullcontext():
+            results = iter_concurrent(
+                query, items, max_workers=max_workers, ordered=ordered)
+
+            if progress:
+                from tqdm import tqdm
+                results = tqdm(results, total=len(items))
+
+            return list(results)
+
+
+def _build_transport(settings: dict) -> tuple[Transport, ClientStats]:
+    """Build a client's transport, with its statistics collector installed."""
+    custom_url = settings["custom_url"]
+    hedging = settings["hedging"]
+    transport = Transport(
+        pool_size=settings["pool_size"],
+        bulk_pool_size=settings["bulk_concurrency"],
+        rate_controller=RateController(
+            rate=settings["rate_limit"],
+            max_concurrency=settings["max_concurrency"],
+            bulk_concurrency=settings["bulk_concurrency"],
+            max_retries=settings["max_retries"],
+        ),
+        timeout=settings["timeout"],
+        hedge_policy=HedgePolicy() if hedging is True else hedging or None,
+        endpoints=EndpointSelector(custom_url) if isinstance(
+            custom_url, (str, list)) else custom_url,
+    )
+    stats = ClientStats(slow_threshold=settings["slow_call_threshold"])
+    transport.after_request_hooks.append(stats.record)
+    return transport, stats
+
+
+_shared_transports = {}
+_shared_transports_lock = threading.Lock()
+
+
+def _shared_transport(settings: dict) -> tuple[Transport, ClientStats]:
+    """Get the transport shared by the unpickled clients of this process with the same settings."""
+    key = (os.getpid(), pickle.dumps(settings))
+    with _shared_transports_lock:
+        if key not in _shared_transports:
+            _shared_transports[key] = _build_transport(settings)
+        return _shared_transports[key]
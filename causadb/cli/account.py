@@ -1,11 +1,8 @@
 import typer
-import requests
 import toml
 import os
 import causadb.cli.utils as utils
 
-CAUSADB_URL = utils.CAUSADB_URL
-
 app = typer.Typer()
 
 
@@ -14,13 +11,15 @@ def setup():
     """
     Set up a CausaDB account on this device
     """
+    import requests
+
     token_secret = typer.prompt(
         "Enter your token (begins with cdb_)")
 
     headers = {"token": token_secret}
 
     response = requests.get(
-        f"{CAUSADB_URL}/account",
+        f"{utils.get_causadb_url()}/account",
         headers=headers
     )
 
@@ -1,7 +1,5 @@
 import typer
-import requests
-from causadb.cli.utils import load_config, show_table, CAUSADB_URL
-import pandas as pd
+from causadb.cli.utils import load_config, show_table, get_causadb_url
 from typing import Annotated
 
 app = typer.Typer()
@@ -12,13 +10,15 @@ def list():
     """
     List linked datasources.
     """
+    import requests
+
     config = load_config()
     token_secret = config["default"]["token_secret"]
 
     headers = {"token": token_secret}
 
     data = requests.get(
-        f"{CAUSADB_URL}/data", headers=headers
+        f"{get_causadb_url()}/data", headers=headers
     ).json()
 
     show_table(data["data"], columns=["id", "name", "type"])
@@ -35,6 +35,7 @@ def add(
     """
     Add a datasource.
     """
+    import requests
 
     # If filepath is None, prompt the user for a filepath.
     if filepath is None:
@@ -44,6 +45,8 @@ def add(
             "Enter the path to your datasource file (e.g. /path/to/file.csv)")
 
     # Read the file into a pandas dataframe.
+    import pandas as pd
+
     try:
         dataset = pd.read_csv(filepath).to_dict()
     except:
@@ -64,7 +67,7 @@ def add(
     headers = {"token": token_secret}
 
     data = requests.post(
-        f"{CAUSADB_URL}/data/{data_name}",
+        f"{get_causadb_url()}/data/{data_name}",
         headers=headers,
         json=dataset,
     ).json()
@@ -85,6 +88,7 @@ def remove(
     """
     Remove a datasource.
     """
+    import requests
 
     if name is None:
         # Prompt the user for the name of the datasource to remove
@@ -99,7 +103,7 @@ def remove(
 
     # Make a request to the remove data endpoint
     response = requests.delete(
-        f"{CAUSADB_URL}/data/{name}",
+        f"{get_causadb_url()}/data/{name}",
         headers=headers
     )
 
@@ -1,10 +1,9 @@
 import typer
 from typing import Optional
-import requests
 import causadb.cli.account as account
 import causadb.cli.data as data
 import causadb.cli.models as models
-from causadb.cli.utils import CAUSADB_URL
+from causadb.cli.utils import get_causadb_url
 from causadb import __version__
 
 app = typer.Typer()
@@ -13,10 +12,6 @@ app = typer.Typer()
 def version_callback(value: bool):
     if value:
         typer.echo(f"CausaDB CLI v{__version__}")
-        server_version = requests.get(
-            f"{CAUSADB_URL}/version"
-        ).json()["version"]
-        typer.echo(f"CausaDB Server v{server_version}")
 
         raise typer.Exit()
 
@@ -30,6 +25,20 @@ def cli(
     ...
 
 
+@app.command()
+def version():
+    """
+    Print the versions of the CausaDB CLI and server
+    """
+    import requests
+
+    typer.echo(f"CausaDB CLI v{__version__}")
+    server_version = requests.get(
+        f"{get_causadb_url()}/version"
+    ).json()["version"]
+    typer.echo(f"CausaDB Server v{server_version}")
+
+
 app.add_typer(account.app, name="account", help="Manage account")
 app.add_typer(data.app, name="data", help="Manage linked datasources")
 app.add_typer(models.app, name="models", help="Manage models")
@@ -1,6 +1,5 @@
 import typer
-import requests
-from causadb.cli.utils import load_config, show_table, CAUSADB_URL
+from causadb.cli.utils import load_config, show_table, get_causadb_url
 from typing import Annotated
 import json
 
@@ -12,13 +11,15 @@ def list():
     """
     List models.
     """
+    import requests
+
     config = load_config()
     token_secret = config["default"]["token_secret"]
 
     headers = {"token": token_secret}
 
     data = requests.get(
-        f"{CAUSADB_URL}/models", headers=headers
+        f"{get_causadb_url()}/models", headers=headers
     ).json()
 
     show_table(data["models"], columns=[
@@ -37,6 +38,7 @@ def add(
     """
     Create a model.
     """
+    import requests
 
     # If name is None, prompt the user for a name.
     if model_name_raw is None:
@@ -74,7 +76,7 @@ def add(
     headers = {"token": token_secret}
 
     data = requests.post(
-        f"{CAUSADB_URL}/models/{model_name}",
+        f"{get_causadb_url()}/models/{model_name}",
         headers=headers,
         json=model_config,
     ).json()
@@ -91,6 +93,8 @@ def remove(
     """
     Delete a model.
     """
+    import requests
+
     # If name is None, prompt the user for a name.
     if model_name is None:
         model_name = typer.prompt(
@@ -110,7 +114,7 @@ def remove(
 
     # Make a request to the remove data endpoint
     response = requests.delete(
-        f"{CAUSADB_URL}/models/{model_name}",
+        f"{get_causadb_url()}/models/{model_name}",
         headers=headers
     ).json()
 
@@ -126,6 +130,7 @@ def info(
     """
     Show info about a model.
     """
+    import requests
 
     if model_name is None:
         model_name = typer.prompt(
@@ -137,7 +142,7 @@ def info(
     headers = {"token": token_secret}
 
     data = requests.get(
-        f"{CAUSADB_URL}/models/{model_name}",
+        f"{get_causadb_url()}/models/{model_name}",
         headers=headers,
     ).json()
 
@@ -157,6 +162,7 @@ def attach(
     """
     Attach data to a model.
     """
+    import requests
 
     if model_name is None:
         model_name = typer.prompt(
@@ -172,7 +178,7 @@ def attach(
     headers = {"token": token_secret}
 
     data = requests.post(
-        f"{CAUSADB_URL}/models/{model_name}/attach/{data_name}",
+        f"{get_causadb_url()}/models/{model_name}/attach/{data_name}",
         headers=headers,
     ).json()
 
@@ -188,6 +194,7 @@ def detach(
     """
     Detach a datasource from a model.
     """
+    import requests
 
     if model_name is None:
         model_name = typer.prompt(
@@ -199,7 +206,7 @@ def detach(
     headers = {"token": token_secret}
 
     data = requests.delete(
-        f"{CAUSADB_URL}/models/{model_name}/detach",
+        f"{get_causadb_url()}/models/{model_name}/detach",
         headers=headers,
     ).json()
 
@@ -215,6 +222,7 @@ def train(
     """
     Train a model.
     """
+    import requests
 
     if model_name is None:
         model_name = typer.prompt(
@@ -226,7 +234,7 @@ def train(
     headers = {"token": token_secret}
 
     data = requests.post(
-        f"{CAUSADB_URL}/models/{model_name}/train",
+        f"{get_causadb_url()}/models/{model_name}/train",
         headers=headers,
     ).json()
 
@@ -246,6 +254,7 @@ def status(
     """
     Show status of a model.
     """
+    import requests
 
     if model_name is None:
         model_name = typer.prompt(
@@ -257,7 +266,7 @@ def status(
     headers = {"token": token_secret}
 
     data = requests.get(
-        f"{CAUSADB_URL}/models/{model_name}",
+        f"{get_causadb_url()}/models/{model_name}",
         headers=headers,
     ).json()
 
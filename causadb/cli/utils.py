@@ -1,14 +1,10 @@
 import os
 import dotenv
 import toml
-from rich.console import Console
-from rich.table import Table
+from causadb.utils import get_causadb_url
 dotenv.load_dotenv()
 
 
-CAUSADB_URL = os.getenv("CAUSADB_URL", "https://api.causadb.com/v1")
-
-
 def load_config():
     # Get config from ~/.causadb/config.toml
     dir_name = os.path.expanduser("~/.causadb")
@@ -24,6 +20,9 @@ def load_config():
 
 
 def show_table(data, columns=None):
+    from rich.console import Console
+    from rich.table import Table
+
     table = Table(show_header=True, header_style="bold turquoise4")
 
     if columns is None:
@@ -1,6 +1,7 @@
-import requests
-import pandas as pd
-from .utils import get_causadb_url
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class Data:
@@ -19,26 +20,45 @@ class Data:
 
     def remove(self) -> None:
         """Remove the data from the CausaDB system."""
-        headers = {"token": self.client.token}
         try:
-            requests.delete(
-                f"{get_causadb_url()}/data/{self.data_name}",
-                headers=headers,
+            self.client._request(
+                "DELETE", f"/data/{self.data_name}",
             )
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
 
+    def n_rows(self) -> int:
+        """Get the number of rows of the data.
+
+        Returns:
+            int: The number of rows.
+        """
+        try:
+            response = self.client._request(
+                "GET", f"/data/{self.data_name}",
+            ).json()
+        except Exception as e:
+            raise Exception(f"CausaDB server request failed: {e}")
+
+        if "rows" not in response.get("details", {}):
+            raise Exception(
+                f"CausaDB server request failed - the server doesn't report the number of rows of {self.data_name}")
+
+        return int(response["details"]["rows"])
+
     def from_csv(self, filepath: str) -> None:
         """Add data from a CSV file.
 
         Args:
             filepath (str): The path to the CSV file.
         """
+        import pandas as pd
+
         dataset = pd.read_csv(filepath).to_dict()
 
         self._update(dataset)
 
-    def from_pandas(self, dataframe: pd.DataFrame) -> None:
+    def from_pandas(self, dataframe: "pd.DataFrame") -> None:
         """Add data from a pandas DataFrame.
 
         Args:
@@ -63,6 +83,8 @@ class Data:
             data (dict): The new data.
         """
 
+        import pandas as pd
+
         # Check if the data are valid (no missing values, all numeric or string values)
         df = pd.DataFrame(data)
         if df.isnull().values.any():
@@ -83,11 +105,10 @@ class Data:
 
         # Send a POST request to the CausaDB server to update the data
         try:
-            headers = {"token": self.client.token}
-            response = requests.post(
-                f"{get_causadb_url()}/data/{self.data_name}",
-                headers=headers,
+            response = self.client._request(
+                "POST", f"/data/{self.data_name}",
                 json=data,
+                lane="bulk",
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -0,0 +1,162 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+# Header used to tell the server how long the client is willing to wait, in milliseconds
+DEADLINE_HEADER = "x-causadb-deadline-ms"
+
+_current_deadline = contextvars.ContextVar("causadb_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request is started or waited on after its deadline."""
+
+
+class RequestCancelled(Exception):
+    """Raised when a request is cancelled while it is queued or in flight."""
+
+
+class Deadline:
+    """A time limit on a group of requests, which can also be cancelled from another thread."""
+
+    def __init__(self, timeout: float = None, parent: "Deadline" = None) -> None:
+        """Initializes the Deadline class.
+
+        Args:
+            timeout (float, optional): The time limit in seconds. Defaults to no time limit.
+            parent (Deadline, optional): An enclosing deadline. The earlier of the two applies, and
+                cancelling the parent cancels this deadline too.
+        """
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout if timeout is not None else float("inf")
+        if parent is not None:
+            self.expires_at = min(self.expires_at, parent.expires_at)
+        self.parent = parent
+        self._cancelled = threading.Event()
+        self._listeners = []
+        self._lock = threading.Lock()
+
+        if parent is not None:
+            parent._add_listener(self.cancel)
+
+    def __repr__(self) -> str:
+        return f"<Deadline {self.remaining():.3f}s remaining>"
+
+    def remaining(self) -> float:
+        """Get the time left before the deadline, in seconds (infinite if there is no time limit)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Cancel every request made under this deadline, including those in flight."""
+        with self._lock:
+            self._cancelled.set()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def check(self) -> None:
+        """Raise if the deadline has been cancelled or has passed."""
+        if self.cancelled:
+            raise RequestCancelled("Request cancelled")
+        if self.expired:
+            raise DeadlineExceeded(
+                f"Deadline exceeded ({self.timeout}s)" if self.timeout is not None else "Deadline exceeded")
+
+    def wait(self, event: threading.Event, timeout: float = None) -> bool:
+        """Wait for an event, waking early if the deadline passes or is cancelled.
+
+        Args:
+            event (threading.Event): The event to wait for.
+            timeout (float, optional): The maximum time to wait, in seconds.
+
+        Returns:
+            bool: Whether the event was set.
+        """
+        self._add_listener(event.set)
+        try:
+            limit = self.remaining() if timeout is None else min(
+                timeout, self.remaining())
+            event.wait(None if limit == float("inf") else limit)
+        finally:
+            self._remove_listener(event.set)
+
+        return event.is_set() and not self.cancelled
+
+    def wait_condition(self, condition: threading.Condition, timeout: float = None) -> None:
+        """Wait on a condition whose lock is held, raising as soon as the deadline passes or is cancelled.
+
+        Args:
+            condition (threading.Condition): The condition to wait on.
+            timeout (float, optional): The maximum time to wait, in seconds.
+        """
+        self.check()
+
+        def wake() -> None:
+            with condition:
+                condition.notify_all()
+
+        self._add_listener(wake)
+        try:
+            limit = self.remaining() if timeout is None else min(
+                timeout, self.remaining())
+            condition.wait(None if limit == float("inf") else limit)
+        finally:
+            self._remove_listener(wake)
+        self.check()
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep, raising as soon as the deadline passes or is cancelled.
+
+        Args:
+            seconds (float): The time to sleep.
+        """
+        self.wait(threading.Event(), seconds)
+        self.check()
+
+    def _add_listener(self, listener: Callable[[], None]) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+            cancelled = self._cancelled.is_set()
+        if cancelled:
+            listener()
+
+    def _remove_listener(self, listener: Callable[[], None]) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Get the deadline that applies in the current context, if any."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline(timeout: float = None) -> Iterator[Deadline]:
+    """Apply a deadline to all requests made in this context.
+
+    Args:
+        timeout (float, optional): The time limit in seconds. Defaults to no time limit, in which
+            case the deadline is only used for cancellation.
+
+    Returns:
+        Iterator[Deadline]: The deadline, which can be cancelled from another thread.
+    """
+    scope = Deadline(timeout, parent=current_deadline())
+    token = _current_deadline.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_deadline.reset(token)
+        if scope.parent is not None:
+            scope.parent._remove_listener(scope.cancel)
@@ -0,0 +1,60 @@
+import json
+import struct
+import numpy as np
+
+# Content type used to negotiate the compact binary array format with the server
+BINARY_CONTENT_TYPE = "application/x-causadb-array"
+
+_MAGIC = b"CDBA"
+_PREFIX_SIZE = len(_MAGIC) + 4
+
+
+def encode_array(array: np.ndarray, **metadata) -> bytes:
+    """Encode an array and its metadata in the compact binary format.
+
+    The payload is a 4-byte magic string, a little-endian uint32 header length,
+    a JSON header (padded to an 8-byte boundary) and the raw array buffer.
+
+    Args:
+        array (np.ndarray): The array to encode.
+        metadata: Additional JSON-serialisable fields to store in the header.
+
+    Returns:
+        bytes: The encoded payload.
+    """
+    array = np.ascontiguousarray(array)
+    header = dict(metadata, dtype=array.dtype.str, shape=list(array.shape))
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    # Pad the header so the array buffer is aligned for zero-copy reads
+    header_bytes += b" " * (-(_PREFIX_SIZE + len(header_bytes)) % 8)
+
+    return _MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes + array.tobytes()
+
+
+def decode_array(payload: bytes) -> tuple[dict, np.ndarray]:
+    """Decode a payload in the compact binary format without copying the array buffer.
+
+    Args:
+        payload (bytes): The encoded payload.
+
+    Returns:
+        tuple[dict, np.ndarray]: The header metadata and a read-only view of the array.
+    """
+    if payload[:len(_MAGIC)] != _MAGIC:
+        raise Exception("Invalid binary payload - unexpected format.")
+
+    (header_size,) = struct.unpack_from("<I", payload, len(_MAGIC))
+    header = json.loads(
+        bytes(payload[_PREFIX_SIZE:_PREFIX_SIZE + header_size]))
+
+    dtype = np.dtype(header.pop("dtype"))
+    shape = tuple(header.pop("shape"))
+    array = np.frombuffer(
+        payload,
+        dtype=dtype,
+        count=int(np.prod(shape)),
+        offset=_PREFIX_SIZE + header_size,
+    ).reshape(shape)
+
+    return header, array
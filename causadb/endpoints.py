@@ -0,0 +1,129 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
+import requests
+
+
+class EndpointSelector:
+    """Chooses which of several equivalent CausaDB servers (e.g. regional endpoints) to send requests to.
+
+    The endpoints are probed with a `GET /version` when first used and every `probe_interval` seconds
+    after that (in the background), and requests go to the healthy endpoint with the lowest latency.
+    An endpoint that fails to connect is skipped for `cooldown` seconds, so requests fail over to the
+    next best one.
+    """
+
+    def __init__(self, urls: Union[str, list[str]], probe_interval: float = 300.0, probe_timeout: float = 2.0,
+                 cooldown: float = 30.0, session: requests.Session = None) -> None:
+        """Initializes the EndpointSelector class.
+
+        Args:
+            urls (Union[str, list[str]]): The server URLs, e.g. ["https://eu.example.com/v1", "https://us.example.com/v1"].
+            probe_interval (float): The number of seconds between latency probes.
+            probe_timeout (float): The timeout of each probe in seconds.
+            cooldown (float): The number of seconds a failed endpoint is skipped for.
+            session (requests.Session, optional): The session to probe with. Defaults to the client's session.
+        """
+        urls = [urls] if isinstance(urls, str) else list(urls)
+        if not urls:
+            raise Exception("At least one endpoint URL is required")
+
+        self.urls = [url.rstrip("/") for url in urls]
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.cooldown = cooldown
+        self.session = session
+        self.latencies = {}
+        self._failed_until = {}
+        self._probed_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<EndpointSelector {self.urls}>"
+
+    def __getstate__(self) -> dict:
+        # Latencies are probed again where the selector is unpickled
+        return {"urls": self.urls, "probe_interval": self.probe_interval,
+                "probe_timeout": self.probe_timeout, "cooldown": self.cooldown}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def current(self) -> str:
+        """Get the endpoint to send the next request to.
+
+        Returns:
+            str: The URL of the healthy endpoint with the lowest latency.
+        """
+        if len(self.urls) == 1:
+            return self.urls[0]
+
+        if self._probed_at is None:
+            self.probe()
+        elif time.monotonic() - self._probed_at > self.probe_interval:
+            self._probe_in_background()
+
+        now = time.monotonic()
+        with self._lock:
+            healthy = [url for url in self.urls if self._failed_until.get(url, 0) <= now]
+            if not healthy:
+                # Every endpoint failed recently, so try the one that has been failing longest
+                return min(self.urls, key=lambda url: self._failed_until[url])
+            return min(healthy, key=lambda url: self.latencies.get(url, float("inf")))
+
+    def mark_failed(self, url: str) -> None:
+        """Skip an endpoint for the cooldown period, e.g. after it failed to connect.
+
+        Args:
+            url (str): The endpoint URL.
+        """
+        with self._lock:
+            self._failed_until[url] = time.monotonic() + self.cooldown
+
+    def probe(self) -> dict[str, float]:
+        """Measure the latency of every endpoint, concurrently.
+
+        Returns:
+            dict[str, float]: The latency in seconds of each endpoint (infinite if it is unreachable).
+        """
+        with ThreadPoolExecutor(max_workers=len(self.urls)) as executor:
+            latencies = dict(zip(self.urls, executor.map(self._probe_endpoint, self.urls)))
+
+        now = time.monotonic()
+        with self._lock:
+            self.latencies = latencies
+            self._probed_at = now
+            for url, latency in latencies.items():
+                if latency == float("inf"):
+                    self._failed_until[url] = now + self.cooldown
+                else:
+                    self._failed_until.pop(url, None)
+        return latencies
+
+    def _probe_in_background(self) -> None:
+        with self._lock:
+            if self._probing:
+                return
+            self._probing = True
+
+        def run() -> None:
+            try:
+                self.probe()
+            finally:
+                self._probing = False
+
+        threading.Thread(target=run, name="causadb-probe", daemon=True).start()
+
+    def _probe_endpoint(self, url: str) -> float:
+        start = time.perf_counter()
+        try:
+            response = (self.session or requests).get(f"{url}/version", timeout=self.probe_timeout)
+            response.raise_for_status()
+        except requests.RequestException:
+            return float("inf")
+        return time.perf_counter() - start
@@ -0,0 +1,133 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable
+import pandas as pd
+
+from .executor import iter_concurrent
+
+
+@dataclass
+class EnsembleResult:
+    """The results of one query sent to every model of a `ModelEnsemble`.
+
+    `medians` and `widths` (upper - lower) hold one column per model, aligned on the union of the
+    models' rows: nodes for `causal_effects`, and (row, node) pairs for `simulate_actions`. Nodes
+    that a model doesn't have are NaN and left out of the statistics.
+    """
+    results: dict[str, Any]
+    medians: pd.DataFrame
+    widths: pd.DataFrame
+    errors: dict[str, BaseException] = field(default_factory=dict)
+
+    @property
+    def mean(self) -> pd.Series:
+        """The mean of the models' medians."""
+        return self.medians.mean(axis=1)
+
+    @property
+    def std(self) -> pd.Series:
+        """The standard deviation of the models' medians."""
+        return self.medians.std(axis=1, ddof=0)
+
+    @property
+    def disagreement(self) -> pd.Series:
+        """The range of the models' medians relative to their mean interval width.
+
+        Below 1 the models agree to within their own uncertainty, and above 1 they disagree by more.
+        """
+        spread = self.medians.max(axis=1) - self.medians.min(axis=1)
+        return spread / self.widths.mean(axis=1)
+
+    def summary(self) -> pd.DataFrame:
+        """Get the medians of every model next to the mean, spread and disagreement.
+
+        Returns:
+            pd.DataFrame: One column per model, and "mean", "std" and "disagreement" columns.
+        """
+        return self.medians.assign(mean=self.mean, std=self.std, disagreement=self.disagreement)
+
+
+class ModelEnsemble:
+    """Sends the same query to several models (e.g. candidate graphs of one system) concurrently, to compare them.
+
+    All models are queried at once, so a comparison takes about the time of the slowest single
+    query. A model whose query fails is reported in `EnsembleResult.errors` and left out.
+
+    Example:
+        >>> ensemble = ModelEnsemble([client.get_model("graph-a"), client.get_model("graph-b")])
+        >>> ensemble.causal_effects({"x": (0, 1)}).summary()
+    """
+
+    def __init__(self, models: list["Model"], max_workers: int = None) -> None:
+        """Initializes the ModelEnsemble class.
+
+        Args:
+            models (list[Model]): The models, which must have different names.
+            max_workers (int, optional): The number of models to query at once. Defaults to all of them.
+        """
+        names = [model.model_name for model in models]
+        if not models or len(set(names)) != len(names):
+            raise Exception("An ensemble needs at least one model, and the models must have different names")
+
+        self.models = list(models)
+        self.max_workers = max_workers or len(models)
+
+    def __repr__(self) -> str:
+        return f"<ModelEnsemble {[model.model_name for model in self.models]}>"
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def _query(self, query: Callable) -> tuple[dict, dict]:
+        results, errors = {}, {}
+        for result in iter_concurrent(query, self.models, max_workers=self.max_workers):
+            if result.ok:
+                results[result.item.model_name] = result.value
+            else:
+                errors[result.item.model_name] = result.error
+
+        if not results:
+            raise Exception(f"CausaDB server request failed for every model: {errors}")
+        return results, errors
+
+    def simulate_actions(self, actions: dict, fixed: dict = {}, interval: float = 0.9,
+                         observation_noise: bool = False, outcomes: list[str] = None) -> EnsembleResult:
+        """Simulate an action on every model, like `Model.simulate_actions`.
+
+        Args:
+            actions (dict): A dictionary representing the actions.
+            fixed (dict): A dictionary representing the fixed nodes.
+            interval (float): The interval at which to simulate the action.
+            observation_noise (bool): Whether to include observation noise.
+            outcomes (list[str], optional): The nodes to return. Defaults to every node.
+
+        Returns:
+            EnsembleResult: The results of every model, indexed by (row, node).
+        """
+        results, errors = self._query(lambda model: model.simulate_actions(
+            actions, fixed=fixed, interval=interval, observation_noise=observation_noise, outcomes=outcomes))
+
+        medians = pd.DataFrame({name: result["median"].stack() for name, result in results.items()})
+        widths = pd.DataFrame({name: (result["upper"] - result["lower"]).stack() for name, result in results.items()})
+        return EnsembleResult(results, medians, widths, errors)
+
+    def causal_effects(self, actions: dict[str, tuple[float, float]], fixed: dict[str, float] = None,
+                       interval: float = 0.90, observation_noise: bool = False,
+                       outcomes: list[str] = None) -> EnsembleResult:
+        """Get the causal effects of actions on every model, like `Model.causal_effects`.
+
+        Args:
+            actions (dict[str, tuple[float, float]]): The (baseline, treatment) values of each action node.
+            fixed (dict[str, float], optional): A dictionary representing the fixed nodes.
+            interval (float): The interval at which to simulate the action.
+            observation_noise (bool): Whether to include observation noise.
+            outcomes (list[str], optional): The nodes to return the effects on. Defaults to every node.
+
+        Returns:
+            EnsembleResult: The results of every model, indexed by node.
+        """
+        results, errors = self._query(lambda model: model.causal_effects(
+            actions, fixed=fixed, interval=interval, observation_noise=observation_noise, outcomes=outcomes))
+
+        medians = pd.DataFrame({name: result["median"] for name, result in results.items()})
+        widths = pd.DataFrame({name: result["upper"] - result["lower"] for name, result in results.items()})
+        return EnsembleResult(results, medians, widths, errors)
@@ -0,0 +1,80 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+
+@dataclass
+class QueryResult:
+    """The outcome of one query in a batch. Exactly one of `value` and `error` is set."""
+    index: int
+    item: Any
+    value: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _run_query(fn: Callable, index: int, item: Any) -> QueryResult:
+    try:
+        return QueryResult(index, item, value=fn(item))
+    except Exception as e:
+        return QueryResult(index, item, error=e)
+
+
+def iter_concurrent(fn: Callable, items: Iterable, max_workers: int = 8, ordered: bool = True,
+                    max_in_flight: int = None) -> Iterator[QueryResult]:
+    """Apply a function to items on a thread pool, yielding results as they become available.
+
+    Errors raised by `fn` are captured in the yielded QueryResult rather than aborting the batch.
+    At most `max_in_flight` items are submitted at once, so memory stays bounded for long or
+    lazily-generated inputs.
+
+    Args:
+        fn (Callable): The function to apply to each item.
+        items (Iterable): The items.
+        max_workers (int): The number of worker threads.
+        ordered (bool): Whether to yield results in input order rather than completion order.
+        max_in_flight (int, optional): The maximum number of submitted but unyielded items. Defaults
+            to twice the number of workers.
+
+    Returns:
+        Iterator[QueryResult]: The results.
+    """
+    max_in_flight = max_in_flight or 2 * max_workers
+    items = iter(enumerate(items))
+    pending = {}
+    next_index = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_next() -> bool:
+            try:
+                index, item = next(items)
+            except StopIteration:
+                return False
+            # Run each query in a copy of the caller's context so context-local settings apply
+            context = contextvars.copy_context()
+            pending[index] = executor.submit(
+                context.run, _run_query, fn, index, item)
+            return True
+
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                exhausted = not submit_next()
+
+            if not pending:
+                return
+
+            if ordered:
+                result = pending.pop(next_index).result()
+                next_index += 1
+                yield result
+            else:
+                done, _ = wait(pending.values(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    del pending[result.index]
+                    yield result
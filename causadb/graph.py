@@ -0,0 +1,168 @@
+from collections import deque
+from typing import Iterable, Optional
+
+
+class DagIndex:
+    """Local index of a model's causal graph, answering graph queries without the server.
+
+    The topological order is computed once, and the ancestors and descendants of each node are
+    computed when first asked for and then memoised. Nodes that appear only in edges are included,
+    so edges can be set before nodes.
+
+    Example:
+        >>> graph = DagIndex(["x", "y", "z"], [("x", "y"), ("y", "z")])
+        >>> graph.descendants("x")
+        frozenset({'y', 'z'})
+    """
+
+    def __init__(self, nodes: Iterable[str], edges: Iterable[tuple[str, str]]) -> None:
+        """Initializes the DagIndex class.
+
+        Args:
+            nodes (Iterable[str]): The node names.
+            edges (Iterable[tuple[str, str]]): The edges, as (cause, effect) pairs.
+        """
+        self.nodes = list(dict.fromkeys(nodes))
+        self.edges = [(edge[0], edge[1]) for edge in edges]
+        self._parents = {node: [] for node in self.nodes}
+        self._children = {node: [] for node in self.nodes}
+
+        for cause, effect in self.edges:
+            for node in (cause, effect):
+                if node not in self._parents:
+                    self.nodes.append(node)
+                    self._parents[node] = []
+                    self._children[node] = []
+            self._parents[effect].append(cause)
+            self._children[cause].append(effect)
+
+        self._order = self._topological_order()
+        self._ancestors = {}
+        self._descendants = {}
+
+    def __repr__(self) -> str:
+        return f"<DagIndex {len(self.nodes)} nodes, {len(self.edges)} edges>"
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._parents
+
+    def _topological_order(self) -> Optional[list[str]]:
+        # Kahn's algorithm. Returns None if the graph has a cycle.
+        in_degree = {node: len(parents) for node, parents in self._parents.items()}
+        queue = deque(node for node in self.nodes if in_degree[node] == 0)
+        order = []
+
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for child in self._children[node]:
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    queue.append(child)
+
+        return order if len(order) == len(self.nodes) else None
+
+    @property
+    def is_acyclic(self) -> bool:
+        """Whether the graph is a DAG."""
+        return self._order is not None
+
+    def topological_order(self) -> list[str]:
+        """Get the nodes ordered so that every node comes after its causes.
+
+        Returns:
+            list[str]: The nodes in topological order.
+
+        Raises:
+            Exception: If the graph contains cycles.
+        """
+        if self._order is None:
+            raise Exception(
+                f"The causal graph contains cycles: {' -> '.join(self.find_cycle())}")
+        return list(self._order)
+
+    def find_cycle(self) -> Optional[list[str]]:
+        """Find a cycle in the graph.
+
+        Returns:
+            Optional[list[str]]: The nodes of a cycle, starting and ending with the same node, or None if the graph
+                is acyclic.
+        """
+        if self._order is not None:
+            return None
+
+        # Iterative depth-first search, tracking the nodes on the current path
+        state = {}
+        for root in self.nodes:
+            if root in state:
+                continue
+            path = [root]
+            stack = [iter(self._children[root])]
+            state[root] = "open"
+            while stack:
+                child = next(stack[-1], None)
+                if child is None:
+                    state[path.pop()] = "done"
+                    stack.pop()
+                elif state.get(child) == "open":
+                    return path[path.index(child):] + [child]
+                elif child not in state:
+                    state[child] = "open"
+                    path.append(child)
+                    stack.append(iter(self._children[child]))
+        return None
+
+    def parents(self, node: str) -> list[str]:
+        """Get the direct causes of a node."""
+        return list(self._parents[self._check(node)])
+
+    def children(self, node: str) -> list[str]:
+        """Get the direct effects of a node."""
+        return list(self._children[self._check(node)])
+
+    def ancestors(self, node: str) -> frozenset[str]:
+        """Get every node with a causal path to a node.
+
+        Args:
+            node (str): The node.
+
+        Returns:
+            frozenset[str]: The ancestors, excluding the node itself.
+        """
+        return self._reachable(self._check(node), self._parents, self._ancestors)
+
+    def descendants(self, node: str) -> frozenset[str]:
+        """Get every node a node has a causal path to.
+
+        Args:
+            node (str): The node.
+
+        Returns:
+            frozenset[str]: The descendants, excluding the node itself.
+        """
+        return self._reachable(self._check(node), self._children, self._descendants)
+
+    def _reachable(self, node: str, neighbours: dict, memo: dict) -> frozenset[str]:
+        if node not in memo:
+            seen = set()
+            queue = deque(neighbours[node])
+            while queue:
+                other = queue.popleft()
+                if other in seen:
+                    continue
+                seen.add(other)
+                if other in memo:
+                    seen |= memo[other]
+                else:
+                    queue.extend(neighbours[other])
+            seen.discard(node)
+            memo[node] = frozenset(seen)
+        return memo[node]
+
+    def _check(self, node: str) -> str:
+        if node not in self._parents:
+            raise Exception(f"Node '{node}' is not in the causal graph")
+        return node
@@ -0,0 +1,90 @@
+import threading
+from collections import defaultdict, deque
+from typing import Optional
+
+
+class HedgePolicy:
+    """Decides when to send a duplicate (hedged) request for an idempotent read.
+
+    A hedge is sent when the original request has not completed after `delay` seconds or, if no
+    delay is given, after the `percentile` latency recently observed for the same endpoint. The
+    number of hedges is capped at a `budget` fraction of requests so hedging adds little load.
+    """
+
+    def __init__(self, delay: float = None, percentile: float = 0.95, budget: float = 0.05,
+                 min_samples: int = 20, window: int = 200) -> None:
+        """Initializes the HedgePolicy class.
+
+        Args:
+            delay (float, optional): A fixed delay in seconds before hedging. Defaults to using `percentile`.
+            percentile (float): The latency percentile after which to hedge, when no fixed delay is given.
+            budget (float): The maximum number of hedges as a fraction of requests (e.g. 0.05 for 5%).
+            min_samples (int): The number of latencies to observe for an endpoint before hedging it.
+            window (int): The number of recent latencies kept per endpoint.
+        """
+        if not 0 < percentile < 1:
+            raise Exception("Hedging percentile must be between 0 and 1")
+
+        self.delay = delay
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window = window
+        self.hedges_sent = 0
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        # Hedging credit accrues by `budget` per request, up to a small burst
+        self._credit = 0.0
+        self._max_credit = max(1.0, 10 * budget)
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Only the configuration is pickled, not the observed latencies
+        return {"delay": self.delay, "percentile": self.percentile, "budget": self.budget,
+                "min_samples": self.min_samples, "window": self.window}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """Get the delay after which a request to an endpoint should be hedged.
+
+        Args:
+            endpoint (str): The endpoint, e.g. "POST /models/my-model/causal-effects".
+
+        Returns:
+            Optional[float]: The delay in seconds, or None if the endpoint shouldn't be hedged yet.
+        """
+        if self.delay is not None:
+            return self.delay
+
+        with self._lock:
+            latencies = sorted(self._latencies[endpoint])
+
+        if len(latencies) < self.min_samples:
+            return None
+
+        return latencies[min(len(latencies) - 1, int(self.percentile * len(latencies)))]
+
+    def record(self, endpoint: str, latency: float) -> None:
+        """Record the latency of a request and accrue hedging budget.
+
+        Args:
+            endpoint (str): The endpoint.
+            latency (float): The latency in seconds.
+        """
+        with self._lock:
+            self._latencies[endpoint].append(latency)
+            self._credit = min(self._max_credit, self._credit + self.budget)
+
+    def try_hedge(self) -> bool:
+        """Take budget for one hedge, if there is enough.
+
+        Returns:
+            bool: Whether a hedge may be sent.
+        """
+        with self._lock:
+            if self._credit < 1:
+                return False
+            self._credit -= 1
+            self.hedges_sent += 1
+            return True
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import time
+import pandas as pd
+from typing import Callable
+
+from .executor import iter_concurrent
+
+MANIFEST = "manifest.json"
+
+
+class BulkJob:
+    """A large batch of queries over the rows of a dataframe, that can be stopped and resumed.
+
+    The rows are split into chunks, which are queried concurrently. The result of each chunk is
+    written to a Parquet file in the job's directory as soon as it completes, and the finished
+    chunk IDs are recorded in a manifest there. Running the job again (e.g. after a crash or a
+    network outage) skips the finished chunks. A failing chunk is retried with exponential backoff,
+    and if it still fails it is recorded in the manifest and retried on the next run.
+
+    Example:
+        >>> job = BulkJob.for_best_actions("jobs/best-actions", model, {"y": 0.5}, ["x"], data=df)
+        >>> job.run()
+        >>> best_actions = job.result()
+    """
+
+    def __init__(self, directory: str, query: Callable[[pd.DataFrame], pd.DataFrame], data: pd.DataFrame,
+                 chunk_size: int = 10000, max_workers: int = 4, max_attempts: int = 3, retry_delay: float = 1.0,
+                 progress: bool = False) -> None:
+        """Initializes the BulkJob class.
+
+        Args:
+            directory (str): The directory to store the manifest and the chunk results in.
+            query (Callable[[pd.DataFrame], pd.DataFrame]): A function taking a chunk of rows and returning the results for them.
+            data (pd.DataFrame): The rows to query.
+            chunk_size (int): The number of rows per chunk.
+            max_workers (int): The number of chunks to query at once.
+            max_attempts (int): The number of times to try a chunk before recording it as failed.
+            retry_delay (float): The delay in seconds before the first retry, doubled for each further one.
+            progress (bool): Whether to display a progress bar.
+        """
+        self.directory = directory
+        self.query = query
+        self.data = data
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.progress = progress
+        self.n_chunks = -(-len(data) // chunk_size)
+
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def __repr__(self) -> str:
+        return f"<BulkJob {self.directory}: {len(self.completed)}/{self.n_chunks} chunks done>"
+
+    @classmethod
+    def for_best_actions(cls, directory: str, model: "Model", targets: dict[str, float], actionable: list[str],
+                         data: pd.DataFrame, fixed: dict = {}, constraints: dict = {},
+                         target_importance: dict = {}, **kwargs) -> "BulkJob":
+        """Create a job finding the optimal actions for each row of a dataframe.
+
+        Args:
+            directory (str): The directory to store the job in.
+            model (Model): The model.
+            targets (dict[str, float]): A dictionary representing the target outcomes.
+            actionable (list[str]): A list of actionable nodes.
+            data (pd.DataFrame): The rows.
+            fixed (dict): A dictionary representing the fixed nodes.
+            constraints (dict): A dictionary representing the constraints.
+            target_importance (dict): A dictionary representing the target importance.
+            **kwargs: Other arguments of `BulkJob`.
+
+        Returns:
+            BulkJob: The job.
+        """
+        def query(chunk: pd.DataFrame) -> pd.DataFrame:
+            result = model.find_best_actions(targets, actionable, fixed=fixed, constraints=constraints,
+                                             data=chunk, target_importance=target_importance)
+            if len(result) == len(chunk):
+                result.index = chunk.index
+            return result
+
+        return cls(directory, query, data, **kwargs)
+
+    @classmethod
+    def for_causal_effects(cls, directory: str, model: "Model", actions: dict[str, tuple[float, float]],
+                           contexts: pd.DataFrame, outcomes: list[str] = None, interval: float = 0.90,
+                           request_size: int = 500, request_workers: int = 1, **kwargs) -> "BulkJob":
+        """Create a job getting the causal effects of actions for each row of a dataframe of contexts.
+
+        Args:
+            directory (str): The directory to store the job in.
+            model (Model): The model.
+            actions (dict[str, tuple[float, float]]): The (baseline, treatment) values of each action node.
+            contexts (pd.DataFrame): The values to fix nodes at, one row per unit.
+            outcomes (list[str], optional): The nodes to return the effects on. Defaults to every node.
+            interval (float): The width of the interval, between 0 and 1.
+            request_size (int): The number of rows per request within a chunk.
+            request_workers (int): The number of requests to run at once within a chunk. Up to
+                `max_workers * request_workers` requests are in flight.
+            **kwargs: Other arguments of `BulkJob`.
+
+        Returns:
+            BulkJob: The job.
+        """
+        def query(chunk: pd.DataFrame) -> pd.DataFrame:
+            return model.causal_effects_by_row(actions, chunk, outcomes=outcomes, interval=interval,
+                                               chunk_size=request_size, max_workers=request_workers)
+
+        return cls(directory, query, contexts, **kwargs)
+
+    @property
+    def completed(self) -> list[int]:
+        """The IDs of the finished chunks."""
+        return self.manifest["completed"]
+
+    @property
+    def failed(self) -> dict[str, str]:
+        """The error of each chunk that failed on the last run, by chunk ID."""
+        return self.manifest["failed"]
+
+    @property
+    def done(self) -> bool:
+        """Whether every chunk has finished."""
+        return len(self.completed) == self.n_chunks
+
+    def _fingerprint(self) -> str:
+        # Identifies the data, so a directory is never resumed with different rows
+        hashes = pd.util.hash_pandas_object(self.data, index=True).to_numpy()
+        return hashlib.sha256(hashes.tobytes()).hexdigest()[:16]
+
+    def _chunk_path(self, chunk_id: int) -> str:
+        return os.path.join(self.directory, f"chunk-{chunk_id:06d}.parquet")
+
+    def _load_manifest(self) -> dict:
+        expected = {"rows": len(self.data), "chunk_size": self.chunk_size, "fingerprint": self._fingerprint()}
+        try:
+            with open(os.path.join(self.directory, MANIFEST), "r") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {**expected, "completed": [], "failed": {}}
+
+        if {key: manifest.get(key) for key in expected} != expected:
+            raise Exception(
+                f"The job directory {self.directory} holds a job for different data or chunk size")
+
+        # Only trust chunks whose results were written
+        manifest["completed"] = [chunk_id for chunk_id in manifest["completed"]
+                                 if os.path.exists(self._chunk_path(chunk_id))]
+        return manifest
+
+    def _save_manifest(self) -> None:
+        # Write to a temporary file and rename it, so an interrupted write never corrupts the manifest
+        path = os.path.join(self.directory, MANIFEST)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _run_chunk(self, chunk_id: int) -> pd.DataFrame:
+        chunk = self.data.iloc[chunk_id * self.chunk_size:(chunk_id + 1) * self.chunk_size]
+        for attempt in range(self.max_attempts):
+            try:
+                return self.query(chunk)
+            except Exception:
+                if attempt == self.max_attempts - 1:
+                    raise
+                time.sleep(self.retry_delay * 2 ** attempt)
+
+    def run(self) -> None:
+        """Query the chunks that haven't finished yet, including those that failed on earlier runs.
+
+        Raises:
+            Exception: If any chunk still fails after all its attempts. Running the job again retries them.
+        """
+        completed = set(self.completed)
+        pending = [chunk_id for chunk_id in range(self.n_chunks) if chunk_id not in completed]
+        self.manifest["failed"] = {}
+
+        results = iter_concurrent(self._run_chunk, pending, max_workers=self.max_workers, ordered=False)
+
+        if self.progress:
+            from tqdm import tqdm
+            results = tqdm(results, total=self.n_chunks, initial=len(completed), unit="chunk")
+
+        for result in results:
+            if result.ok:
+                # Write the results before recording the chunk, so a recorded chunk always has its results
+                tmp_path = f"{self._chunk_path(result.item)}.tmp"
+                result.value.to_parquet(tmp_path)
+                os.replace(tmp_path, self._chunk_path(result.item))
+                self.manifest["completed"].append(result.item)
+            else:
+                self.manifest["failed"][str(result.item)] = str(result.error)
+            self._save_manifest()
+
+        if self.failed:
+            raise Exception(
+                f"{len(self.failed)} of {self.n_chunks} chunks failed, run the job again to retry them: {self.failed}")
+
+    def result(self) -> pd.DataFrame:
+        """Read the results of all chunks, in the order of the rows.
+
+        Returns:
+            pd.DataFrame: The combined results.
+        """
+        if not self.done:
+            raise Exception(
+                f"The job hasn't finished: {len(self.completed)} of {self.n_chunks} chunks are done")
+
+        if self.n_chunks == 0:
+            return pd.DataFrame()
+
+        return pd.concat([pd.read_parquet(self._chunk_path(chunk_id)) for chunk_id in range(self.n_chunks)])
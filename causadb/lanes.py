@@ -0,0 +1,47 @@
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Latency-sensitive requests. Requests use this lane unless told otherwise.
+INTERACTIVE = "interactive"
+# Throughput-oriented requests (e.g. data uploads and backfills), which yield to interactive ones
+BULK = "bulk"
+
+LANES = (INTERACTIVE, BULK)
+
+_current_lane: contextvars.ContextVar = contextvars.ContextVar(
+    "causadb_lane", default=None)
+
+
+def current_lane() -> Optional[str]:
+    """Get the lane chosen for requests in the current context.
+
+    Returns:
+        Optional[str]: The lane, or None if no lane was chosen.
+    """
+    return _current_lane.get()
+
+
+def check_lane(name: str) -> str:
+    if name not in LANES:
+        raise Exception(
+            f"Unknown lane '{name}', expected one of: {', '.join(LANES)}")
+    return name
+
+
+@contextmanager
+def lane(name: str) -> Iterator[str]:
+    """Send the requests made in this context (including from threads started by `map_queries`) in a lane.
+
+    Args:
+        name (str): The lane, "interactive" or "bulk".
+
+    Example:
+        >>> with lane("bulk"):
+        ...     data.from_pandas(df)
+    """
+    token = _current_lane.set(check_lane(name))
+    try:
+        yield name
+    finally:
+        _current_lane.reset(token)
@@ -0,0 +1,308 @@
+import numpy as np
+import pandas as pd
+from typing import Iterable, Union
+
+from .graph import DagIndex
+from .results import PosteriorSamples
+
+
+class LocalModel:
+    """Posterior draws of a model's parameters, evaluated in-process with NumPy.
+
+    The model is a linear structural causal model: each node is an intercept plus a weighted sum
+    of its parents, plus Gaussian noise. Each posterior draw has its own intercepts, edge
+    coefficients and noise scales, so queries return the same median and interval bands as the
+    server, without a network round trip. A local model can also be fitted to a dataframe with
+    `LocalModel.fit` (or `Model.fit_local`), as a quick approximation of the server model.
+
+    Example:
+        >>> local = model.export("my-model.npz")
+        >>> local = LocalModel.load("my-model.npz")
+        >>> local.simulate_actions({"x": [0, 1]})["median"]
+    """
+
+    def __init__(self, nodes: list[str], edges: list[tuple[str, str]], intercepts: np.ndarray,
+                 coefficients: np.ndarray, noise_scale: np.ndarray) -> None:
+        """Initializes the LocalModel class.
+
+        Args:
+            nodes (list[str]): The node names.
+            edges (list[tuple[str, str]]): The edges, as (cause, effect) pairs.
+            intercepts (np.ndarray): Array of shape (draws, nodes).
+            coefficients (np.ndarray): Array of shape (draws, edges), ordered as `edges`.
+            noise_scale (np.ndarray): Array of shape (draws, nodes), the standard deviation of each node's noise.
+        """
+        self.graph = DagIndex(nodes, edges)
+        if len(self.graph.nodes) != len(nodes):
+            raise Exception("Every node of an edge must be in the list of nodes")
+
+        self.nodes = list(nodes)
+        self.edges = [(edge[0], edge[1]) for edge in edges]
+        self.intercepts = np.asarray(intercepts, dtype=float)
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.noise_scale = np.asarray(noise_scale, dtype=float)
+
+        n_draws = self.intercepts.shape[0]
+        expected = {
+            "intercepts": (n_draws, len(self.nodes)),
+            "coefficients": (n_draws, len(self.edges)),
+            "noise_scale": (n_draws, len(self.nodes)),
+        }
+        for name, shape in expected.items():
+            if getattr(self, name).shape != shape:
+                raise Exception(
+                    f"Expected {name} of shape {shape}, got {getattr(self, name).shape}")
+
+        # Evaluation plan: in topological order, each node's position with its parents' positions and edge columns
+        self._position = {node: i for i, node in enumerate(self.nodes)}
+        incoming = {node: [] for node in self.nodes}
+        for i, (cause, effect) in enumerate(self.edges):
+            incoming[effect].append((self._position[cause], i))
+        self._plan = [
+            (self._position[node], np.array([p for p, _ in incoming[node]], dtype=int),
+             np.array([e for _, e in incoming[node]], dtype=int))
+            for node in self.graph.topological_order()
+        ]
+
+    def __repr__(self) -> str:
+        return f"<LocalModel {len(self.nodes)} nodes, {self.n_draws} draws>"
+
+    @property
+    def n_draws(self) -> int:
+        return self.intercepts.shape[0]
+
+    def _simulate(self, interventions: dict[str, np.ndarray], n_rows: int, observation_noise: bool,
+                  seed: int = None, shared_noise: bool = False) -> np.ndarray:
+        """Evaluate the model under interventions, returning values of shape (draws, rows, nodes).
+
+        With `shared_noise`, every row of a draw gets the same observation noise, so differences
+        between rows are the effects of the interventions alone.
+        """
+        values = np.empty((self.n_draws, n_rows, len(self.nodes)))
+        intervened = {self._position[node]: np.broadcast_to(np.asarray(value, dtype=float), (n_rows,))
+                      for node, value in interventions.items()}
+
+        rng = np.random.default_rng(seed) if observation_noise else None
+
+        for node, parents, edges in self._plan:
+            if node in intervened:
+                values[:, :, node] = intervened[node]
+                continue
+
+            column = np.repeat(self.intercepts[:, node, None], n_rows, axis=1)
+            if len(parents):
+                column += np.einsum("srp,sp->sr", values[:, :, parents], self.coefficients[:, edges])
+            if rng is not None:
+                noise = rng.standard_normal((self.n_draws, 1 if shared_noise else n_rows))
+                column += noise * self.noise_scale[:, node, None]
+            values[:, :, node] = column
+
+        return values
+
+    def _check_nodes(self, nodes) -> None:
+        unknown = [node for node in nodes if node not in self.graph]
+        if unknown:
+            raise Exception(f"Nodes not in the model: {unknown}")
+
+    def simulate_actions(self, actions: dict, fixed: dict = {}, interval: float = 0.9, observation_noise: bool = False,
+                         samples: bool = False, outcomes: list[str] = None, seed: int = None) -> Union[dict, PosteriorSamples]:
+        """Simulate actions on the model, like `Model.simulate_actions`.
+
+        Args:
+            actions (dict): The values to set each action node to, one per simulated row.
+            fixed (dict): The values to fix nodes at in every row.
+            interval (float): The width of the interval bands, between 0 and 1.
+            observation_noise (bool): Whether to include observation noise.
+            samples (bool): Whether to return the draws as PosteriorSamples instead of summary bands.
+            outcomes (list[str], optional): The nodes to return. Defaults to every node.
+            seed (int, optional): The random seed for observation noise.
+
+        Returns:
+            dict: A dictionary of "median", "lower" and "upper" dataframes, with one row per simulated action
+                and one column per node.
+        """
+        self._check_nodes([*actions, *fixed, *(outcomes or [])])
+        actions = {node: np.atleast_1d(np.asarray(value, dtype=float)) for node, value in actions.items()}
+        n_rows = max((len(value) for value in actions.values()), default=1)
+
+        values = self._simulate({**fixed, **actions}, n_rows, observation_noise, seed)
+        draws = PosteriorSamples(values, range(n_rows), self.nodes)
+        if outcomes is not None:
+            draws = draws.select(outcomes)
+
+        if samples:
+            return draws
+        return draws.interval(interval).to_dict()
+
+    def causal_effects(self, actions: dict[str, tuple[float, float]], fixed: dict[str, float] = None,
+                       interval: float = 0.90, observation_noise: bool = False, samples: bool = False,
+                       seed: int = None) -> Union[pd.DataFrame, PosteriorSamples]:
+        """Get the causal effects of actions, like `Model.causal_effects`.
+
+        Args:
+            actions (dict[str, tuple[float, float]]): The (baseline, treatment) values of each action node.
+            fixed (dict[str, float], optional): The values to fix nodes at in both arms.
+            interval (float): The width of the interval, between 0 and 1.
+            observation_noise (bool): Whether to include observation noise (the same noise in both arms).
+            samples (bool): Whether to return the draws of the effects as PosteriorSamples.
+            seed (int, optional): The random seed for observation noise.
+
+        Returns:
+            pd.DataFrame: A dataframe with "median", "lower" and "upper" columns, indexed by node.
+        """
+        fixed = fixed or {}
+        self._check_nodes([*actions, *fixed])
+
+        interventions = {**fixed, **{node: np.asarray(arms, dtype=float) for node, arms in actions.items()}}
+        values = self._simulate(interventions, 2, observation_noise, seed, shared_noise=True)
+        effects = PosteriorSamples(values[:, 1:] - values[:, :1], [0], self.nodes)
+
+        if samples:
+            return effects
+        return effects.summary(interval)
+
+    def causal_attributions(self, outcome: str, normalise: bool = False) -> pd.DataFrame:
+        """Get the causal attributions for an outcome, like `Model.causal_attributions`.
+
+        The attribution of a node is the variance of the outcome caused by that node's own noise,
+        i.e. the squared total effect of the node on the outcome times the node's noise variance.
+
+        Args:
+            outcome (str): The outcome node.
+            normalise (bool): Whether to normalise the attributions to fractions of the outcome's variance.
+
+        Returns:
+            pd.DataFrame: A dataframe with one column named after the outcome, indexed by the outcome and its ancestors.
+        """
+        self._check_nodes([outcome])
+        target = self._position[outcome]
+
+        # Total effects of every node on every other node, for all draws at once: (I - B)^-1
+        weights = np.zeros((self.n_draws, len(self.nodes), len(self.nodes)))
+        for i, (cause, effect) in enumerate(self.edges):
+            weights[:, self._position[effect], self._position[cause]] = self.coefficients[:, i]
+        total_effects = np.linalg.inv(np.eye(len(self.nodes)) - weights)
+
+        contributions = (total_effects[:, target, :] * self.noise_scale) ** 2
+        if normalise:
+            contributions = contributions / contributions.sum(axis=1, keepdims=True)
+
+        ancestors = self.graph.ancestors(outcome)
+        nodes = [node for node in self.nodes if node in ancestors or node == outcome]
+        attributions = contributions.mean(axis=0)[[self._position[node] for node in nodes]]
+
+        return pd.DataFrame({outcome: attributions}, index=nodes)
+
+    @classmethod
+    def fit(cls, nodes: Iterable[str], edges: Iterable[tuple[str, str]], data: pd.DataFrame, n_draws: int = 500,
+            seed: int = None) -> "LocalModel":
+        """Fit a linear-Gaussian model to data, as a fast local approximation of the server model.
+
+        Each node is regressed on its parents by least squares, and the posterior draws come from the
+        conjugate posterior under a flat prior: sigma^2 ~ RSS / chi^2(n - p) and
+        beta ~ N(beta_hat, sigma^2 (X^T X)^-1).
+
+        Args:
+            nodes (Iterable[str]): The node names.
+            edges (Iterable[tuple[str, str]]): The edges, as (cause, effect) pairs.
+            data (pd.DataFrame): The data, with a numeric column for every node.
+            n_draws (int): The number of posterior draws.
+            seed (int, optional): The random seed.
+
+        Returns:
+            LocalModel: The fitted model.
+
+        Example:
+            >>> local = LocalModel.fit(["x", "y"], [("x", "y")], df)
+            >>> local.causal_effects({"x": (0, 1)})
+        """
+        graph = DagIndex(nodes, edges)
+        missing = [node for node in graph.nodes if node not in data.columns]
+        if missing:
+            raise Exception(f"Data is missing columns for nodes: {missing}")
+
+        values = data[graph.nodes].to_numpy(dtype=float)
+        if np.isnan(values).any():
+            raise Exception("Data must not contain missing values")
+
+        rng = np.random.default_rng(seed)
+        edges = graph.edges
+        position = {node: i for i, node in enumerate(graph.nodes)}
+        intercepts = np.empty((n_draws, len(graph.nodes)))
+        coefficients = np.empty((n_draws, len(edges)))
+        noise_scale = np.empty((n_draws, len(graph.nodes)))
+
+        for node in graph.nodes:
+            parents = graph.parents(node)
+            design = np.column_stack([np.ones(len(values)), values[:, [position[p] for p in parents]]])
+            dof = len(values) - design.shape[1]
+            if dof < 1:
+                raise Exception(f"Not enough rows to fit node '{node}' with {len(parents)} parents")
+
+            target = values[:, position[node]]
+            beta, *_ = np.linalg.lstsq(design, target, rcond=None)
+            rss = np.sum((target - design @ beta) ** 2)
+
+            # Draw the noise variance, then the coefficients given it, for all draws at once
+            variance = rss / rng.chisquare(dof, size=n_draws)
+            chol = np.linalg.cholesky(np.linalg.pinv(design.T @ design) + 1e-12 * np.eye(design.shape[1]))
+            draws = beta + np.sqrt(variance)[:, None] * rng.standard_normal((n_draws, len(beta))) @ chol.T
+
+            intercepts[:, position[node]] = draws[:, 0]
+            noise_scale[:, position[node]] = np.sqrt(variance)
+            for parent, column in zip(parents, draws[:, 1:].T):
+                coefficients[:, edges.index((parent, node))] = column
+
+        return cls(graph.nodes, edges, intercepts, coefficients, noise_scale)
+
+    def save(self, path: str) -> None:
+        """Save the model to a compressed NumPy archive.
+
+        Args:
+            path (str): The file path, e.g. "my-model.npz".
+        """
+        np.savez_compressed(
+            path,
+            nodes=np.array(self.nodes, dtype=str),
+            edges=np.array(self.edges, dtype=str).reshape(-1, 2),
+            intercepts=self.intercepts,
+            coefficients=self.coefficients,
+            noise_scale=self.noise_scale,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LocalModel":
+        """Load a model saved with `save` or `Model.export`.
+
+        Args:
+            path (str): The file path.
+
+        Returns:
+            LocalModel: The model.
+        """
+        with np.load(path) as archive:
+            return cls(
+                nodes=archive["nodes"].tolist(),
+                edges=[tuple(edge) for edge in archive["edges"].tolist()],
+                intercepts=archive["intercepts"],
+                coefficients=archive["coefficients"],
+                noise_scale=archive["noise_scale"],
+            )
+
+    @classmethod
+    def from_response(cls, response: dict) -> "LocalModel":
+        """Build a model from the JSON response of the model export endpoint.
+
+        Args:
+            response (dict): The response, with "nodes", "edges", "intercepts", "coefficients" and "noise_scale".
+
+        Returns:
+            LocalModel: The model.
+        """
+        return cls(
+            nodes=response["nodes"],
+            edges=response["edges"],
+            intercepts=np.asarray(response["intercepts"], dtype=float),
+            coefficients=np.asarray(response["coefficients"], dtype=float),
+            noise_scale=np.asarray(response["noise_scale"], dtype=float),
+        )
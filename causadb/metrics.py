@@ -0,0 +1,222 @@
+import logging
+import threading
+from collections import defaultdict, deque
+
+from .tracing import Span
+
+logger = logging.getLogger("causadb")
+
+# Upper bounds (in seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class EndpointStats:
+    """Call counts, sizes and latencies of one endpoint."""
+
+    def __init__(self, window: int = 1000) -> None:
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedged = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.total_latency = 0.0
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.latencies = deque(maxlen=window)
+
+    def record(self, span: Span) -> None:
+        self.count += 1
+        self.errors += span.error is not None or (
+            span.status_code is not None and span.status_code >= 400)
+        self.retries += span.retries
+        self.hedged += span.hedged
+        self.bytes_sent += span.request_bytes
+        self.bytes_received += span.response_bytes
+        self.total_latency += span.duration
+        self.latencies.append(span.duration)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if span.duration <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def percentile(self, q: float) -> float:
+        """Get a latency percentile over the recent calls, in seconds (NaN if there were none)."""
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return float("nan")
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+class ClientStats:
+    """Aggregated statistics of the requests made by a client.
+
+    Collects per-endpoint call counts, errors, retries, bytes sent and received and latency
+    histograms, cache hit rates, and a log of slow calls. Percentiles are computed over the most
+    recent `window` calls of each endpoint.
+    """
+
+    def __init__(self, slow_threshold: float = None, window: int = 1000, slow_log_size: int = 100) -> None:
+        """Initializes the ClientStats class.
+
+        Args:
+            slow_threshold (float, optional): Calls taking longer than this many seconds are added to the
+                slow-call log and logged as warnings. Defaults to no slow-call log.
+            window (int): The number of recent latencies kept per endpoint for percentiles.
+            slow_log_size (int): The number of slow calls kept.
+        """
+        self.slow_threshold = slow_threshold
+        self.window = window
+        self.endpoints = defaultdict(lambda: EndpointStats(window))
+        self.caches = defaultdict(lambda: [0, 0])
+        self.slow_calls = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<ClientStats {sum(e.count for e in self.endpoints.values())} calls>"
+
+    def record(self, span: Span) -> None:
+        """Record a finished request. Registered as an after-request hook of the client.
+
+        Args:
+            span (Span): The request span.
+        """
+        with self._lock:
+            self.endpoints[(span.method, span.endpoint)].record(span)
+
+        if self.slow_threshold is not None and span.duration >= self.slow_threshold:
+            call = span.to_dict()
+            with self._lock:
+                self.slow_calls.append(call)
+            logger.warning(
+                "Slow CausaDB call: %s took %.3fs (model=%s, sent=%d bytes, received=%d bytes, status=%s)",
+                span.name, span.duration, span.model_name, span.request_bytes, span.response_bytes, span.status_code,
+            )
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        """Record a lookup in one of the client's caches.
+
+        Args:
+            cache (str): The name of the cache.
+            hit (bool): Whether the lookup was a hit.
+        """
+        with self._lock:
+            self.caches[cache][0 if hit else 1] += 1
+
+    def cache_hit_rates(self) -> dict[str, float]:
+        """Get the hit rate of each cache.
+
+        Returns:
+            dict[str, float]: The fraction of lookups that were hits, by cache name.
+        """
+        with self._lock:
+            return {
+                cache: hits / (hits + misses)
+                for cache, (hits, misses) in self.caches.items() if hits + misses > 0
+            }
+
+    def summary(self) -> "pd.DataFrame":
+        """Summarise the statistics of each endpoint, busiest first.
+
+        Returns:
+            pd.DataFrame: A dataframe indexed by method and endpoint, with call counts, errors, retries,
+                bytes sent and received, and mean, p50, p95 and p99 latencies in seconds.
+        """
+        import pandas as pd
+
+        with self._lock:
+            rows = [{
+                "method": method,
+                "endpoint": endpoint,
+                "calls": stats.count,
+                "errors": stats.errors,
+                "retries": stats.retries,
+                "hedged": stats.hedged,
+                "bytes_sent": stats.bytes_sent,
+                "bytes_received": stats.bytes_received,
+                "total_time": stats.total_latency,
+                "mean": stats.total_latency / stats.count,
+                "p50": stats.percentile(0.5),
+                "p95": stats.percentile(0.95),
+                "p99": stats.percentile(0.99),
+            } for (method, endpoint), stats in self.endpoints.items()]
+
+        columns = ["method", "endpoint", "calls", "errors", "retries", "hedged", "bytes_sent",
+                   "bytes_received", "total_time", "mean", "p50", "p95", "p99"]
+        return pd.DataFrame(rows, columns=columns) \
+            .sort_values("total_time", ascending=False) \
+            .set_index(["method", "endpoint"])
+
+    def to_prometheus(self) -> str:
+        """Export the statistics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics.
+        """
+        lines = []
+
+        def metric(name: str, kind: str, help: str) -> None:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            caches = sorted(self.caches.items())
+
+            counters = [
+                ("causadb_requests_total", "Requests sent, by endpoint.", "count"),
+                ("causadb_request_errors_total",
+                 "Requests that failed or returned an error status, by endpoint.", "errors"),
+                ("causadb_request_retries_total",
+                 "Retries of throttled requests, by endpoint.", "retries"),
+                ("causadb_request_hedges_total",
+                 "Hedged requests, by endpoint.", "hedged"),
+                ("causadb_request_sent_bytes_total",
+                 "Request body bytes sent, by endpoint.", "bytes_sent"),
+                ("causadb_request_received_bytes_total",
+                 "Response body bytes received, by endpoint.", "bytes_received"),
+            ]
+            for name, help, field in counters:
+                metric(name, "counter", help)
+                for (method, endpoint), stats in endpoints:
+                    lines.append(
+                        f"{name}{{{_labels(method=method, endpoint=endpoint)}}} {getattr(stats, field)}")
+
+            name = "causadb_request_duration_seconds"
+            metric(name, "histogram", "Request latency, by endpoint.")
+            for (method, endpoint), stats in endpoints:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.bucket_counts):
+                    cumulative += count
+                    lines.append(
+                        f"{name}_bucket{{{_labels(method=method, endpoint=endpoint, le=repr(bound))}}} {cumulative}")
+                lines.append(
+                    f"{name}_bucket{{{_labels(method=method, endpoint=endpoint, le='+Inf')}}} {stats.count}")
+                lines.append(
+                    f"{name}_sum{{{_labels(method=method, endpoint=endpoint)}}} {stats.total_latency}")
+                lines.append(
+                    f"{name}_count{{{_labels(method=method, endpoint=endpoint)}}} {stats.count}")
+
+            name = "causadb_cache_lookups_total"
+            metric(name, "counter", "Client cache lookups, by cache and result.")
+            for cache, (hits, misses) in caches:
+                lines.append(
+                    f"{name}{{{_labels(cache=cache, result='hit')}}} {hits}")
+                lines.append(
+                    f"{name}{{{_labels(cache=cache, result='miss')}}} {misses}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Clear all statistics."""
+        with self._lock:
+            self.endpoints.clear()
+            self.caches.clear()
+            self.slow_calls.clear()
+
+
+def _labels(**labels) -> str:
+    def escape(value: str) -> str:
+        return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels.items())
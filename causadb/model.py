@@ -1,11 +1,24 @@
+import hashlib
+import json
+import logging
 import requests
 import time
 import pandas as pd
 import numpy as np
-from typing import Union
+from typing import Iterator, Optional, Union
 from pydantic import validate_call
 
-from .utils import get_causadb_url
+from .data import Data
+from .deadlines import current_deadline
+from .encoding import BINARY_CONTENT_TYPE
+from .executor import iter_concurrent
+from .graph import DagIndex
+from .lanes import lane as lane_context
+from .local import LocalModel
+from .optimize import ActionOptimizer, OptimizationResult
+from .results import SimulationResult, PosteriorSamples
+
+logger = logging.getLogger("causadb")
 
 
 class Model:
@@ -19,29 +32,58 @@ class Model:
         self.client = client
         self.model_name = model_name
         self.config = {}
+        self._graph = None
+        self._attribution_cache = {}
+        # The fingerprint of the model's server-side state, fetched when results are first cached
+        self._version = None
 
         # Pull config from the server
-        headers = {"token": self.client.token}
-        response = requests.get(
-            f"{get_causadb_url()}/models/{self.model_name}",
-            headers=headers,
+        response = self.client._request(
+            "GET", f"/models/{self.model_name}",
         ).json()
 
         if "details" in response:
             self.config = response["details"]["config"]
 
+        # A cyclic graph stored earlier is only reported, so the model can still be fixed or removed
+        if not self.graph.is_acyclic:
+            logger.warning("The causal graph of model %s contains cycles, which are not valid: %s",
+                           self.model_name, " -> ".join(self.graph.find_cycle()))
+
         self._update()
 
     def __repr__(self) -> str:
         return f"<Model {self.model_name}>"
 
+    def __getstate__(self) -> dict:
+        # The config is pickled with the model, so unpickling it doesn't need the server
+        return {"model_name": self.model_name, "client": self.client, "config": self.config}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._graph = None
+        self._attribution_cache = {}
+        self._version = None
+
+    @property
+    def graph(self) -> DagIndex:
+        """A local index of the model's causal graph, for answering graph queries without the server.
+
+        Built from the model's config when first used, and rebuilt after the config is updated.
+
+        Example:
+            >>> model.graph.descendants("x")
+            frozenset({'y', 'z'})
+        """
+        if getattr(self, "_graph", None) is None:
+            self._graph = DagIndex(self.config.get("nodes", []), self.config.get("edges", []))
+        return self._graph
+
     def remove(self) -> None:
         """Remove the model from the CausaDB system."""
-        headers = {"token": self.client.token}
         try:
-            requests.delete(
-                f"{get_causadb_url()}/models/{self.model_name}",
-                headers=headers,
+            self.client._request(
+                "DELETE", f"/models/{self.model_name}",
             )
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -56,11 +98,9 @@ class Model:
         Example:
             >>> model.set_nodes(["x", "y", "z"])
         """
-        headers = {"token": self.client.token}
-
         try:
-            response = requests.get(
-                f"{get_causadb_url()}/models/{self.model_name}", headers=headers
+            response = self.client._request(
+                "GET", f"/models/{self.model_name}"
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -76,11 +116,9 @@ class Model:
         Returns:
             list[str]: A list of node names.
         """
-        headers = {"token": self.client.token}
-
         try:
-            response = requests.get(
-                f"{get_causadb_url()}/models/{self.model_name}", headers=headers
+            response = self.client._request(
+                "GET", f"/models/{self.model_name}"
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -100,11 +138,12 @@ class Model:
             ...     ("Weight", "BMI"),
             ... ])
         """
-        headers = {"token": self.client.token}
+        # Reject cyclic graphs before contacting the server
+        _check_acyclic(DagIndex([], edges))
 
         try:
-            response = requests.get(
-                f"{get_causadb_url()}/models/{self.model_name}", headers=headers
+            response = self.client._request(
+                "GET", f"/models/{self.model_name}"
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -120,11 +159,9 @@ class Model:
         Returns:
             list[tuple[str, str]]: A list of tuples representing edges.
         """
-        headers = {"token": self.client.token}
-
         try:
-            response = requests.get(
-                f"{get_causadb_url()}/models/{self.model_name}", headers=headers
+            response = self.client._request(
+                "GET", f"/models/{self.model_name}"
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -145,11 +182,9 @@ class Model:
             ...     "x1": {"type": "seasonal", "min": 0, "max": 1}
             ... })
         """
-        headers = {"token": self.client.token}
-
         try:
-            response = requests.get(
-                f"{get_causadb_url()}/models/{self.model_name}", headers=headers
+            response = self.client._request(
+                "GET", f"/models/{self.model_name}"
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -166,11 +201,9 @@ class Model:
         Returns:
             dict: A dictionary of node types.
         """
-        headers = {"token": self.client.token}
-
         try:
-            response = requests.get(
-                f"{get_causadb_url()}/models/{self.model_name}", headers=headers
+            response = self.client._request(
+                "GET", f"/models/{self.model_name}"
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -184,12 +217,9 @@ class Model:
         Args:
             data_name (str): The name of the data to attach.
         """
-        headers = {"token": self.client.token}
-
         try:
-            response = requests.post(
-                f"{get_causadb_url()}/models/{self.model_name}/attach/{data_name}",
-                headers=headers
+            response = self.client._request(
+                "POST", f"/models/{self.model_name}/attach/{data_name}"
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -201,12 +231,9 @@ class Model:
         Args:
             data_name (str): The name of the data to detach.
         """
-        headers = {"token": self.client.token}
-
         try:
-            response = requests.delete(
-                f"{get_causadb_url()}/models/{self.model_name}/detach",
-                headers=headers
+            response = self.client._request(
+                "DELETE", f"/models/{self.model_name}/detach"
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -218,7 +245,8 @@ class Model:
         Args:
             wait (bool): Whether to wait for the model to finish training.
             poll_interval (float): The interval at which to poll the server for the model status.
-            poll_limit (float): The maximum time to wait for the model to finish training.
+            poll_limit (float): The maximum time to wait for the model to finish training. Inside a
+                `client.deadline` block, waiting also stops at the deadline.
             verbose (bool): Whether to display model progress.
             progress_interval (float): The interval at which to display the model progress.
 
@@ -230,12 +258,9 @@ class Model:
         if data_name:
             self.attach(data_name)
 
-        headers = {"token": self.client.token}
-
         try:
-            response = requests.post(
-                f"{get_causadb_url()}/models/{self.model_name}/train",
-                headers=headers
+            response = self.client._request(
+                "POST", f"/models/{self.model_name}/train"
             )
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -250,8 +275,12 @@ class Model:
             last_progress = 0
             if verbose:
                 print(f"Training model...")
+            scope = current_deadline()
             while self.status() != "trained":
-                time.sleep(poll_interval)
+                if scope is not None:
+                    scope.sleep(poll_interval)
+                else:
+                    time.sleep(poll_interval)
                 time_elapsed += poll_interval
 
                 if verbose and time_elapsed - last_progress >= progress_interval:
@@ -271,12 +300,9 @@ class Model:
         Returns:
             str: The status of the model.
         """
-        headers = {"token": self.client.token}
-
         try:
-            response = requests.get(
-                f"{get_causadb_url()}/models/{self.model_name}",
-                headers=headers,
+            response = self.client._request(
+                "GET", f"/models/{self.model_name}",
             ).json()
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -285,8 +311,27 @@ class Model:
 
         return model_status
 
+    def version(self) -> str:
+        """Get a fingerprint of the model's server-side state.
+
+        The fingerprint changes when the model's config, status or training details reported by the
+        server change, so it can be used to invalidate results computed from an earlier version.
+
+        Returns:
+            str: The fingerprint.
+        """
+        try:
+            response = self.client._request(
+                "GET", f"/models/{self.model_name}",
+            ).json()
+        except Exception as e:
+            raise Exception(f"CausaDB server request failed: {e}")
+
+        self._version = _fingerprint(response["details"])
+        return self._version
+
     @validate_call
-    def simulate_actions(self, actions: dict, fixed: dict = {}, interval: float = 0.9, observation_noise: bool = False) -> dict:
+    def simulate_actions(self, actions: dict, fixed: dict = {}, interval: float = 0.9, observation_noise: bool = False, binary: bool = False, samples: bool = False, outcomes: Optional[list[str]] = None) -> Union[dict, SimulationResult, PosteriorSamples]:
         """Simulate an action on the model.
 
         Args:
@@ -294,6 +339,12 @@ class Model:
             fixed (dict): A dictionary representing the fixed nodes.
             interval (float): The interval at which to simulate the action.
             observation_noise (bool): Whether to include observation noise.
+            binary (bool): Whether to request the compact binary response format. The result is then
+                returned as a SimulationResult, which behaves like the usual dictionary.
+            samples (bool): Whether to return the raw posterior draws as PosteriorSamples instead of
+                summary bands, so that any interval can be computed locally. `interval` is ignored.
+            outcomes (list[str], optional): The nodes to return. Actions and fixed nodes that have no causal
+                path to these are left out of the query. Defaults to every node.
 
         Returns:
             dict: A dictionary representing the result of the action.
@@ -303,7 +354,10 @@ class Model:
             ...     {"x": [0, 1]}
             ... )
         """
-        headers = {"token": self.client.token}
+        headers = {}
+
+        if outcomes is not None:
+            actions, fixed, _ = self._prune_query(actions, fixed, outcomes)
 
         query = {
             "actions": actions,
@@ -312,11 +366,18 @@ class Model:
             "observation_noise": observation_noise
         }
 
+        if binary or samples:
+            headers["Accept"] = BINARY_CONTENT_TYPE
+
+        if samples:
+            query["return_samples"] = True
+
         try:
-            response = requests.post(
-                f"{get_causadb_url()}/models/{self.model_name}/simulate-actions",
+            response = self.client._request(
+                "POST", f"/models/{self.model_name}/simulate-actions",
                 headers=headers,
                 json=query,
+                idempotent=True,
             )
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -324,27 +385,46 @@ class Model:
         if response.status_code != 200:
             raise Exception(response.json()["detail"])
 
+        if samples:
+            result = self._parse_samples(response)
+            return result.select(outcomes) if outcomes is not None else result
+
+        if binary and response.headers.get("content-type", "").startswith(BINARY_CONTENT_TYPE):
+            result = SimulationResult.from_bytes(response.content)
+            return result.select(outcomes) if outcomes is not None else result
+
         response = response.json()
 
         if "outcome" in response:
             outcome = response["outcome"]
-            return {
+            if binary:
+                result = SimulationResult.from_outcome(outcome)
+                return result.select(outcomes) if outcomes is not None else result
+            result = {
                 "median": pd.DataFrame.from_dict(outcome["median"]),
                 "lower": pd.DataFrame.from_dict(outcome["lower"]),
                 "upper": pd.DataFrame.from_dict(outcome["upper"])
             }
+            if outcomes is not None:
+                result = {band: frame[outcomes] for band, frame in result.items()}
+            return result
 
         raise Exception("CausaDB server request failed - unexpected response.")
 
     @validate_call
-    def causal_effects(self, actions: Union[str, dict[str, tuple[float, float]]], fixed: dict[str, float] = None, interval: float = 0.90, observation_noise=False) -> pd.DataFrame:
+    def causal_effects(self, actions: Union[str, dict[str, tuple[float, float]]], fixed: Optional[dict[str, float]] = None, interval: float = 0.90, observation_noise=False, samples: bool = False, outcomes: Optional[list[str]] = None) -> Union[pd.DataFrame, PosteriorSamples]:
         """ Get the causal effects of actions on the model.
 
         Args:
             actions (Union[str, dict[str, tuple[np.ndarray, np.ndarray]]]): A dictionary representing the actions.
-            fixed (dict): A dictionary representing the fixed nodes.
+            fixed (dict): The values to set nodes to by intervention (do()) in both arms.
             interval (float): The interval at which to simulate the action.
             observation_noise (bool): Whether to include observation noise.
+            samples (bool): Whether to return the raw posterior draws of the effects as PosteriorSamples,
+                so that any interval can be computed locally. `interval` is ignored.
+            outcomes (list[str], optional): The nodes to return the effects on. Outcomes that no action has a causal
+                path to have an effect of exactly zero, and are answered without the server. Actions and fixed nodes
+                that have no causal path to the outcomes are left out of the query. Defaults to every node.
 
         Returns:
             pd.DataFrame: A dataframe representing the causal effects of the actions.
@@ -355,7 +435,18 @@ class Model:
             ... )
 
         """
-        headers = {"token": self.client.token}
+        headers = {}
+        unaffected = []
+
+        if outcomes is not None:
+            actions, fixed, unaffected = self._prune_query(
+                actions, fixed, outcomes)
+
+            # No action has a causal path to any of the outcomes, so every effect is exactly zero
+            if len(unaffected) == len(outcomes):
+                if samples:
+                    return PosteriorSamples(np.zeros((1, 1, len(outcomes))), [0], outcomes)
+                return pd.DataFrame(0.0, index=outcomes, columns=["median", "lower", "upper"])
 
         query = {
             "actions": actions,
@@ -364,11 +455,16 @@ class Model:
             "observation_noise": observation_noise
         }
 
+        if samples:
+            headers["Accept"] = BINARY_CONTENT_TYPE
+            query["return_samples"] = True
+
         try:
-            response = requests.post(
-                f"{get_causadb_url()}/models/{self.model_name}/causal-effects",
+            response = self.client._request(
+                "POST", f"/models/{self.model_name}/causal-effects",
                 headers=headers,
                 json=query,
+                idempotent=True,
             )
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -376,16 +472,184 @@ class Model:
         if response.status_code != 200:
             raise Exception(response.json()["detail"])
 
+        if samples:
+            result = self._parse_samples(response)
+            if outcomes is None:
+                return result
+            result = result.select(outcomes)
+            result.samples[:, :, [outcomes.index(node) for node in unaffected]] = 0.0
+            return result
+
         response = response.json()
 
         if "outcome" in response:
-            return pd.DataFrame.from_dict(response["outcome"])
+            effects = pd.DataFrame.from_dict(response["outcome"])
+            if outcomes is None:
+                return effects
+            effects = effects.reindex(outcomes)
+            effects.loc[unaffected] = 0.0
+            return effects
 
         raise Exception("CausaDB server request failed - unexpected response.")
 
+    def causal_effects_by_row(self, actions: dict[str, tuple[float, float]], contexts: pd.DataFrame,
+                              outcomes: list[str] = None, interval: float = 0.90, chunk_size: int = 500,
+                              max_workers: int = 8, progress: bool = False, lane: str = "bulk") -> pd.DataFrame:
+        """Get the causal effects of actions for each row of a dataframe of contexts, e.g. one row per customer.
+
+        This gives the same effects as calling `causal_effects(actions, fixed=row)` for every row, but the
+        rows are sent in chunks of `chunk_size`, each as a single simulation of the baseline and treated
+        actions in every context, and the chunks run concurrently. Only a bounded number of chunks is in
+        flight at once, and each chunk's posterior draws are reduced to summary bands as it completes.
+
+        Fixed nodes are set by intervention (do()), and so are the contexts: each row's values are set in
+        both arms, not conditioned on. The server takes one fixed value per node for a whole query, so
+        the contexts are sent as actions, repeated for the baseline and treatment rows.
+
+        Args:
+            actions (dict[str, tuple[float, float]]): The (baseline, treatment) values of each action node.
+            contexts (pd.DataFrame): The values to fix nodes at, one row per unit and one column per node.
+            outcomes (list[str], optional): The nodes to return the effects on. Defaults to every node.
+            interval (float): The width of the interval, between 0 and 1.
+            chunk_size (int): The number of rows per request.
+            max_workers (int): The number of requests to run at once.
+            progress (bool): Whether to display a progress bar.
+            lane (str): The lane to send the requests in. Defaults to "bulk".
+
+        Returns:
+            pd.DataFrame: The effects, aligned to the index of `contexts`, with (node, "median"/"lower"/"upper") columns.
+
+        Example:
+            >>> effects = model.causal_effects_by_row({"discount": (0, 10)}, customers, outcomes=["spend"])
+            >>> effects["spend", "median"]
+        """
+        if not 0 < interval < 1:
+            raise Exception("Interval must be between 0 and 1")
+        overlap = set(actions) & set(contexts.columns)
+        if overlap:
+            raise Exception(f"Nodes cannot be both actions and contexts: {sorted(overlap)}")
+
+        tail = (1 - interval) / 2
+        starts = np.arange(0, len(contexts), chunk_size)
+
+        def query(start: int) -> np.ndarray:
+            chunk = contexts.iloc[start:start + chunk_size]
+            # Each context is simulated twice in a row, with the baseline and then the treatment values
+            rows = {node: np.tile(arms, len(chunk)).tolist() for node, arms in actions.items()}
+            # Raw values are repeated, so categorical and string contexts are sent as they are
+            rows.update({node: np.repeat(chunk[node].to_numpy(), 2).tolist() for node in chunk.columns})
+            result = self.simulate_actions(rows, samples=True, outcomes=outcomes)
+            effects = result.samples[:, 1::2] - result.samples[:, 0::2]
+            return result.columns, np.quantile(effects, [0.5, tail, 1 - tail], axis=0)
+
+        columns, bands = None, None
+        with lane_context(lane):
+            results = iter_concurrent(query, starts, max_workers=max_workers, ordered=False)
+
+            if progress:
+                from tqdm import tqdm
+                results = tqdm(results, total=len(starts), unit="chunk")
+
+            for result in results:
+                if not result.ok:
+                    raise Exception(f"CausaDB server request failed: {result.error}")
+                columns, chunk_bands = result.value
+                if bands is None:
+                    bands = np.empty((len(contexts), len(columns), 3))
+                start = result.item
+                bands[start:start + chunk_size] = chunk_bands.transpose(1, 2, 0)
+
+        if bands is None:
+            bands = np.empty((0, len(outcomes or []), 3))
+            columns = outcomes or []
+
+        return pd.DataFrame(
+            bands.reshape(len(contexts), -1), index=contexts.index,
+            columns=pd.MultiIndex.from_product([list(columns), ["median", "lower", "upper"]]),
+        )
+
+    @validate_call
+    def sweep(self, node: str, range: tuple[float, float], outcomes: list[str], fixed: dict = {}, interval: float = 0.9,
+              initial_points: int = 9, max_points: int = 129, tolerance: float = 0.01) -> pd.DataFrame:
+        """Simulate a node over a range of values, refining the grid only where the outcomes bend.
+
+        The node is first simulated on a coarse uniform grid. Then, in each round, the midpoints of the
+        intervals next to points that are further than `tolerance` from the straight line through their
+        neighbours are simulated, in one batch per round, until the curves are straight to within
+        `tolerance` or `max_points` is reached. When the budget runs short, the intervals next to the
+        sharpest bends are refined first.
+
+        Args:
+            node (str): The node to set.
+            range (tuple[float, float]): The lowest and highest values of the node.
+            outcomes (list[str]): The nodes to return.
+            fixed (dict): A dictionary representing the fixed nodes.
+            interval (float): The interval at which to simulate the action.
+            initial_points (int): The number of points in the initial grid.
+            max_points (int): The maximum number of points to simulate.
+            tolerance (float): The largest acceptable deviation from a straight line between points, as a
+                fraction of each outcome's range.
+
+        Returns:
+            pd.DataFrame: A tidy dataframe with columns for the node's value, "outcome", "median", "lower"
+                and "upper", sorted by outcome and value.
+
+        Example:
+            >>> model.sweep("heating", (0, 30), ["energy"])
+        """
+        low, high = range
+        if not low < high:
+            raise Exception("The range must have low < high")
+        if initial_points < 3 or max_points < initial_points:
+            raise Exception("Need at least 3 initial points, and max_points >= initial_points")
+
+        bands = {}
+
+        def evaluate(values: np.ndarray) -> None:
+            result = self.simulate_actions(
+                {node: values.tolist()}, fixed=fixed, interval=interval, outcomes=outcomes)
+            for i, value in enumerate(values):
+                bands[value] = np.array([[result[band][outcome].iloc[i] for outcome in outcomes]
+                                         for band in ["median", "lower", "upper"]])
+
+        evaluate(np.linspace(low, high, initial_points))
+
+        while len(bands) < max_points:
+            points = np.array(sorted(bands))
+            medians = np.array([bands[value][0] for value in points])
+
+            # Deviation of each interior point from the line through its neighbours, relative to each outcome's range
+            weight = (points[1:-1] - points[:-2]) / (points[2:] - points[:-2])
+            line = medians[:-2] + weight[:, None] * (medians[2:] - medians[:-2])
+            scale = np.ptp(medians, axis=0)
+            scale[scale == 0] = 1.0
+            bend = (np.abs(medians[1:-1] - line) / scale).max(axis=1)
+
+            # Refine both intervals next to each bent point, scoring each by the larger bend of its ends
+            score = np.zeros(len(points) - 1)
+            score[:-1] = np.maximum(score[:-1], bend)
+            score[1:] = np.maximum(score[1:], bend)
+            midpoints = (points[:-1] + points[1:]) / 2
+            refine = (score > tolerance) & ~np.isin(midpoints, points)
+            midpoints, score = midpoints[refine], score[refine]
+            if not len(midpoints):
+                break
+
+            # If the budget runs out, the intervals next to the sharpest bends are refined first
+            order = np.argsort(-score, kind="stable")
+            evaluate(midpoints[order[:max_points - len(bands)]])
+
+        points = sorted(bands)
+        values = np.array([bands[value] for value in points])  # (point, band, outcome)
+        return pd.DataFrame({
+            node: np.tile(points, len(outcomes)),
+            "outcome": np.repeat(outcomes, len(points)),
+            **{band: values[:, b, :].T.ravel() for b, band in enumerate(["median", "lower", "upper"])},
+        })
+
     # @validate_call
     def find_best_actions(self, targets: dict[str, float], actionable: list[str], fixed: dict[str, list[float]] = {},
-                          constraints: dict[str, tuple] = {}, data: pd.DataFrame = None, target_importance: dict[str, float] = {}) -> pd.DataFrame:
+                          constraints: dict[str, tuple] = {}, data: Union[pd.DataFrame, Data] = None, target_importance: dict[str, float] = {}) -> pd.DataFrame:
         """Get the optimal actions for a given set of target outcomes.
 
         Args:
@@ -393,7 +657,8 @@ class Model:
             actionable (list[str]): A list of actionable nodes.
             fixed (dict[str, float]): A dictionary representing the fixed nodes.
             constraints (dict[str, tuple]): A dictionary representing the constraints.
-            data (pd.DataFrame): A dataframe representing the data.
+            data (Union[pd.DataFrame, Data]): A dataframe representing the data, or data already added to CausaDB,
+                which is referred to by name instead of being sent again. For large data, use `iter_best_actions`.
             target_importance (dict[str, float]): A dictionary representing the target importance.
 
         Returns:
@@ -405,8 +670,149 @@ class Model:
             ...     ["x"],
             ...     {"y": 0.5}
         """
-        headers = {"token": self.client.token}
+        query = self._best_actions_query(targets, actionable, fixed, constraints, target_importance)
+
+        if isinstance(data, Data):
+            query["data_name"] = data.data_name
+        elif data is not None:
+            query["data"] = data.to_dict(orient="list")
+
+        return self._find_best_actions(query)
+
+    def iter_best_actions(self, targets: dict[str, float], actionable: list[str], data: Union[pd.DataFrame, Data],
+                          fixed: dict[str, list[float]] = {}, constraints: dict[str, tuple] = {},
+                          target_importance: dict[str, float] = {}, chunk_size: int = 10000, max_workers: int = 4,
+                          ordered: bool = True, progress: bool = False) -> Iterator[pd.DataFrame]:
+        """Get the optimal actions for each row of a large dataset, in chunks that are queried concurrently.
+
+        The results are yielded as a dataframe per chunk as soon as they are ready, so they never all have
+        to be held in memory. Only a bounded number of chunks is in flight at once, and the requests are
+        sent in the "bulk" lane unless the calling context chooses a lane. For a `Data` reference, the number
+        of rows is read from the server first, and each chunk is a page of the stored data.
+
+        Args:
+            targets (dict[str, float]): A dictionary representing the target outcomes.
+            actionable (list[str]): A list of actionable nodes.
+            data (Union[pd.DataFrame, Data]): A dataframe, or data already added to CausaDB, which is then paged
+                through on the server instead of being sent again.
+            fixed (dict[str, float]): A dictionary representing the fixed nodes.
+            constraints (dict[str, tuple]): A dictionary representing the constraints.
+            target_importance (dict[str, float]): A dictionary representing the target importance.
+            chunk_size (int): The number of rows per request.
+            max_workers (int): The number of requests to run at once.
+            ordered (bool): Whether to yield chunks in the order of the data rather than as they complete.
+            progress (bool): Whether to display a progress bar.
+
+        Returns:
+            Iterator[pd.DataFrame]: The optimal actions for each chunk, indexed like the rows of `data` (or by row
+                number for a `Data` reference).
+
+        Example:
+            >>> for actions in model.iter_best_actions({"y": 0.5}, ["x"], data=df):
+            ...     process(actions)
+        """
+        query = self._best_actions_query(targets, actionable, fixed, constraints, target_importance)
+
+        if isinstance(data, Data):
+            n_rows = data.n_rows()
+
+            def run(offset: int) -> pd.DataFrame:
+                result = self._find_best_actions(
+                    {**query, "data_name": data.data_name, "data_offset": offset, "data_limit": chunk_size})
+                if len(result) != min(chunk_size, n_rows - offset):
+                    raise Exception("CausaDB server request failed - the server doesn't support paging data")
+                result.index = pd.RangeIndex(offset, offset + len(result))
+                return result
+        else:
+            n_rows = len(data)
+
+            def run(offset: int) -> pd.DataFrame:
+                chunk = data.iloc[offset:offset + chunk_size]
+                result = self._find_best_actions({**query, "data": chunk.to_dict(orient="list")})
+                if len(result) == len(chunk):
+                    result.index = chunk.index
+                return result
+
+        total = -(-n_rows // chunk_size)
+
+        def chunks() -> Iterator[pd.DataFrame]:
+            offsets = range(0, n_rows, chunk_size)
+            for result in iter_concurrent(run, offsets, max_workers=max_workers, ordered=ordered):
+                if not result.ok:
+                    raise Exception(f"CausaDB server request failed: {result.error}")
+                yield result.value
+
+        results = chunks()
+
+        if progress:
+            from tqdm import tqdm
+            results = tqdm(results, total=total, unit="chunk")
+
+        for result in results:
+            if len(result):
+                yield result
+
+    def optimize_actions(self, targets: dict[str, float], actionable: list[str], constraints: dict[str, tuple],
+                         fixed: dict = {}, target_importance: dict[str, float] = {}, max_calls: int = 20,
+                         **kwargs) -> OptimizationResult:
+        """Search for the optimal actions on the client, with a controllable budget of `simulate_actions` calls.
 
+        Args:
+            targets (dict[str, float]): A dictionary representing the target outcomes.
+            actionable (list[str]): A list of actionable nodes.
+            constraints (dict[str, tuple]): The (low, high) bounds of every actionable node, and optionally of outcomes.
+            fixed (dict): A dictionary representing the fixed nodes.
+            target_importance (dict[str, float]): A dictionary representing the target importance.
+            max_calls (int): The maximum number of requests.
+            **kwargs: Other arguments of `ActionOptimizer`, e.g. `population` or `batch_size`.
+
+        Returns:
+            OptimizationResult: The best actions found, their predicted outcomes and the search statistics.
+
+        Example:
+            >>> model.optimize_actions({"y": 0.5}, ["x"], constraints={"x": (0, 10)}, max_calls=10).actions
+        """
+        optimizer = ActionOptimizer(self, targets, actionable, constraints, fixed=fixed,
+                                    target_importance=target_importance, max_calls=max_calls, **kwargs)
+        return optimizer.run()
+
+    def best_actions_to_parquet(self, path: str, targets: dict[str, float], actionable: list[str],
+                                data: Union[pd.DataFrame, Data], **kwargs) -> int:
+        """Write the optimal actions for each row of a large dataset to a Parquet file, chunk by chunk.
+
+        Args:
+            path (str): The Parquet file to write.
+            targets (dict[str, float]): A dictionary representing the target outcomes.
+            actionable (list[str]): A list of actionable nodes.
+            data (Union[pd.DataFrame, Data]): A dataframe, or data already added to CausaDB.
+            **kwargs: Other arguments of `iter_best_actions`.
+
+        Returns:
+            int: The number of rows written.
+
+        Example:
+            >>> model.best_actions_to_parquet("best-actions.parquet", {"y": 0.5}, ["x"], data=df)
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        rows = 0
+        try:
+            for chunk in self.iter_best_actions(targets, actionable, data, **kwargs):
+                table = pa.Table.from_pandas(chunk)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        return rows
+
+    def _best_actions_query(self, targets: dict, actionable: list, fixed: dict, constraints: dict,
+                            target_importance: dict) -> dict:
         query = {
             "targets": targets,
             "actionable": actionable,
@@ -418,17 +824,17 @@ class Model:
         if constraints:
             query["constraints"] = constraints
 
-        if data is not None:
-            query["data"] = data.to_dict(orient="list")
-
         if target_importance:
             query["target_importance"] = target_importance
 
+        return query
+
+    def _find_best_actions(self, query: dict) -> pd.DataFrame:
         try:
-            response = requests.post(
-                f"{get_causadb_url()}/models/{self.model_name}/find-best-actions",
-                headers=headers,
+            response = self.client._request(
+                "POST", f"/models/{self.model_name}/find-best-actions",
                 json=query,
+                lane="bulk",
             )
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -457,18 +863,16 @@ class Model:
         Example:
             >>> model.causal_attributions("y")
         """
-        headers = {"token": self.client.token}
-
         query = {
             "outcome": outcome,
             "normalise": normalise
         }
 
         try:
-            response = requests.post(
-                f"{get_causadb_url()}/models/{self.model_name}/causal-attributions",
-                headers=headers,
+            response = self.client._request(
+                "POST", f"/models/{self.model_name}/causal-attributions",
                 json=query,
+                idempotent=True,
             )
         except Exception as e:
             raise Exception(f"CausaDB server request failed: {e}")
@@ -483,14 +887,206 @@ class Model:
 
         raise Exception("CausaDB server request failed")
 
+    @validate_call
+    def export(self, path: Optional[str] = None) -> LocalModel:
+        """Export the trained model's posterior draws, to answer queries in-process without the server.
+
+        Args:
+            path (str, optional): A file to save the export to, e.g. "my-model.npz". It can be loaded
+                again with `LocalModel.load`.
+
+        Returns:
+            LocalModel: The local model, with `simulate_actions` and `causal_effects` methods.
+
+        Example:
+            >>> local = model.export("my-model.npz")
+            >>> local.simulate_actions({"x": [0, 1]})
+        """
+        try:
+            response = self.client._request(
+                "GET", f"/models/{self.model_name}/export",
+                lane="bulk",
+            )
+        except Exception as e:
+            raise Exception(f"CausaDB server request failed: {e}")
+
+        if response.status_code != 200:
+            raise Exception(response.json()["detail"])
+
+        response = response.json()
+
+        if "export" not in response:
+            raise Exception("CausaDB server request failed - unexpected response.")
+
+        local = LocalModel.from_response(response["export"])
+        if path is not None:
+            local.save(path)
+        return local
+
+    def fit_local(self, data: pd.DataFrame, n_draws: int = 500, seed: int = None) -> LocalModel:
+        """Fit a linear-Gaussian approximation of the model locally, without the server.
+
+        This uses the model's nodes and edges, so it gives an instant baseline to compare server
+        results against, or a fallback when the server is slow.
+
+        Args:
+            data (pd.DataFrame): The data, with a numeric column for every node.
+            n_draws (int): The number of posterior draws.
+            seed (int, optional): The random seed.
+
+        Returns:
+            LocalModel: The local model, with `simulate_actions`, `causal_effects` and `causal_attributions` methods.
+
+        Example:
+            >>> local = model.fit_local(df)
+            >>> local.causal_effects({"x": (0, 1)})
+        """
+        return LocalModel.fit(self.graph.nodes, self.graph.edges, data, n_draws=n_draws, seed=seed)
+
+    def attribution_matrix(self, outcomes: list[str] = None, normalise: bool = False, refresh: bool = False,
+                           max_age: float = 60.0) -> pd.DataFrame:
+        """Get the causal attributions for several outcomes at once, as a node x outcome matrix.
+
+        The attributions are requested for all outcomes in one batch, and cached with the model's
+        version: later calls for any of the same outcomes are answered from the cache, and the
+        version is checked again (with one lightweight request) only once the cache is older than
+        `max_age` seconds. If the server answers only part of a batch, the remaining outcomes are
+        requested one per call, concurrently. A single outcome is always requested on its own, and
+        once the server rejects batches as unsupported (404, 405 or 422), the client sends one outcome
+        per call from then on.
+
+        Args:
+            outcomes (list[str], optional): The outcome nodes. Defaults to every node of the model.
+            normalise (bool): Whether to normalise the causal attributions.
+            refresh (bool): Whether to ignore the cache.
+            max_age (float): The number of seconds the cache is trusted for before checking the model's version.
+
+        Returns:
+            pd.DataFrame: The attributions, with one row per node and one column per outcome. Nodes without
+                an attribution for an outcome are 0.
+
+        Example:
+            >>> model.attribution_matrix(["y", "z"])
+        """
+        return self._attributions(outcomes, normalise, refresh, max_age).fillna(0.0)
+
+    def _attributions(self, outcomes: list[str], normalise: bool, refresh: bool = False,
+                      max_age: float = 60.0) -> pd.DataFrame:
+        """The cached attribution matrix, with NaN for nodes the server gave no attribution for."""
+        outcomes = list(outcomes) if outcomes is not None else list(self.graph.nodes)
+        cache = self._attribution_cache
+        entry = cache.get(normalise)
+        now = time.monotonic()
+
+        if entry is not None and now - entry["checked_at"] > max_age:
+            if self.version() == entry["version"]:
+                entry["checked_at"] = now
+            else:
+                del cache[normalise]
+                entry = None
+
+        missing = outcomes if refresh or entry is None else [
+            outcome for outcome in outcomes if outcome not in entry["matrix"].columns]
+        stats = getattr(self.client, "_stats", None)
+        if stats is not None:
+            stats.record_cache("attributions", not missing)
+
+        if missing:
+            if entry is not None and not refresh:
+                version = entry["version"]
+            else:
+                # A version that is out of date only makes the next check discard these results early
+                version = self._version or self.version()
+            matrix = self._fetch_attributions(missing, normalise)
+            if entry is not None and not refresh:
+                matrix = pd.concat([entry["matrix"].drop(columns=missing, errors="ignore"), matrix], axis=1)
+            entry = cache[normalise] = {"version": version, "checked_at": now, "matrix": matrix}
+
+        return entry["matrix"][outcomes].dropna(how="all").copy()
+
+    def _fetch_attributions(self, outcomes: list[str], normalise: bool) -> pd.DataFrame:
+        matrix = pd.DataFrame()
+
+        # A single outcome, or a server known not to support batches, goes straight to the per-outcome calls
+        transport = getattr(self.client, "_transport", None)
+        unsupported = transport.unsupported if transport is not None else set()
+        if len(outcomes) > 1 and "attribution-batches" not in unsupported:
+            try:
+                response = self.client._request(
+                    "POST", f"/models/{self.model_name}/causal-attributions",
+                    json={"outcomes": outcomes, "normalise": normalise},
+                    idempotent=True,
+                )
+            except Exception as e:
+                raise Exception(f"CausaDB server request failed: {e}")
+
+            # A server that doesn't support batches rejects the query, so later batches aren't sent. Other
+            # failures (e.g. a 503) may be transient, so only this batch falls back to the per-outcome calls.
+            if response.status_code in (404, 405, 422):
+                unsupported.add("attribution-batches")
+            elif response.status_code == 200:
+                response = response.json()
+                if "outcome" in response:
+                    matrix = pd.DataFrame.from_dict(response["outcome"])
+                    matrix = matrix[[outcome for outcome in outcomes if outcome in matrix.columns]]
+
+        # Outcomes the batch didn't answer are requested one per call
+        remaining = [outcome for outcome in outcomes if outcome not in matrix.columns]
+        results = iter_concurrent(lambda outcome: self.causal_attributions(outcome, normalise), remaining)
+        for result in results:
+            if not result.ok:
+                raise result.error
+            matrix = pd.concat([matrix, result.value[[result.item]]], axis=1)
+
+        return matrix[outcomes]
+
+    def _prune_query(self, actions: Union[str, dict], fixed: dict, outcomes: list[str]) -> tuple:
+        """Use the local graph to drop the actions and fixed nodes that can't affect the outcomes.
+
+        Fixed nodes are set by intervention, so only those with a causal path to an outcome change it.
+
+        Returns:
+            tuple: The pruned actions and fixed nodes, and the outcomes that no action has a causal path to.
+        """
+        graph = self.graph
+        action_nodes = [actions] if isinstance(actions, str) else list(actions)
+        if not graph.is_acyclic or any(node not in graph for node in [*action_nodes, *(fixed or {}), *outcomes]):
+            # The local graph doesn't describe this query, so send it unchanged
+            return actions, fixed, []
+
+        relevant = set(outcomes).union(*(graph.ancestors(node) for node in outcomes))
+        affected = set(action_nodes).union(*(graph.descendants(node) for node in action_nodes))
+        unaffected = [node for node in outcomes if node not in affected]
+
+        # Keep every action if none is relevant, since the actions also define the rows of a simulation
+        if isinstance(actions, dict):
+            actions = {node: value for node, value in actions.items() if node in relevant} or actions
+        if fixed:
+            fixed = {node: value for node, value in fixed.items() if node in relevant}
+
+        return actions, fixed, unaffected
+
+    def _parse_samples(self, response: requests.Response) -> PosteriorSamples:
+        """Parses a response containing posterior draws, in binary or JSON format."""
+        if response.headers.get("content-type", "").startswith(BINARY_CONTENT_TYPE):
+            return PosteriorSamples.from_bytes(response.content)
+
+        response = response.json()
+
+        if "samples" in response:
+            return PosteriorSamples.from_response(response)
+
+        raise Exception("CausaDB server request failed - unexpected response.")
+
     def _update(self) -> None:
         """Pushes the current state of the model to the CausaDB server."""
-        headers = {"token": self.client.token}
+        self._graph = None
+        self._attribution_cache = {}
+        self._version = None
 
         try:
-            response = requests.post(
-                f"{get_causadb_url()}/models/{self.model_name}",
-                headers=headers,
+            response = self.client._request(
+                "POST", f"/models/{self.model_name}",
                 json=self.config
             )
         except Exception as e:
@@ -498,3 +1094,14 @@ class Model:
 
         if response.status_code != 200:
             raise Exception(response.json()["detail"])
+
+
+def _fingerprint(details: dict) -> str:
+    details = json.dumps(details, sort_keys=True, default=str)
+    return hashlib.sha256(details.encode()).hexdigest()[:16]
+
+
+def _check_acyclic(graph: DagIndex) -> None:
+    if not graph.is_acyclic:
+        raise Exception(
+            f"The causal graph contains cycles, which are not valid: {' -> '.join(graph.find_cycle())}")
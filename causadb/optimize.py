@@ -0,0 +1,211 @@
+import math
+from dataclasses import dataclass, field
+import numpy as np
+
+from .executor import iter_concurrent
+
+# Added to the loss per unit of squared constraint violation, so infeasible candidates rank last
+_PENALTY = 1e6
+
+
+@dataclass
+class OptimizationResult:
+    """The outcome of `ActionOptimizer.run`."""
+    actions: dict[str, float]
+    outcomes: dict[str, float]
+    loss: float
+    calls: int
+    evaluations: int
+    history: list[float] = field(default_factory=list)
+
+
+class ActionOptimizer:
+    """Searches for the actions that bring outcomes closest to targets, on the client with CMA-ES.
+
+    Unlike `Model.find_best_actions`, the search budget is under the caller's control: each
+    generation of candidate actions is evaluated with batched `simulate_actions` calls (split into
+    concurrent requests of `batch_size` candidates), and the search stops after `max_calls`
+    requests. Evaluations are cached, so candidates that repeat (e.g. at the bounds) and repeated
+    runs don't cost extra requests.
+
+    The loss is the sum over targets of `target_importance * (median - target)^2`. `constraints`
+    bound the actionable nodes (which is required, to define the search space), and any other
+    constrained node is penalised for leaving its bounds.
+
+    Example:
+        >>> optimizer = ActionOptimizer(model, {"y": 0.5}, ["x"], constraints={"x": (0, 10)}, max_calls=10)
+        >>> optimizer.run().actions
+        {'x': 4.2}
+    """
+
+    def __init__(self, model: "Model", targets: dict[str, float], actionable: list[str],
+                 constraints: dict[str, tuple], fixed: dict = {}, target_importance: dict[str, float] = {},
+                 population: int = None, max_calls: int = 20, batch_size: int = None, max_workers: int = 4,
+                 tolerance: float = 1e-6, seed: int = None) -> None:
+        """Initializes the ActionOptimizer class.
+
+        Args:
+            model (Model): The model.
+            targets (dict[str, float]): The target value of each outcome.
+            actionable (list[str]): The nodes that can be acted on.
+            constraints (dict[str, tuple]): The (low, high) bounds of every actionable node, and optionally of outcomes.
+            fixed (dict): A dictionary representing the fixed nodes.
+            target_importance (dict[str, float]): The weight of each target in the loss. Defaults to 1.
+            population (int, optional): The number of candidates per generation. Defaults to 4 + 3 ln(len(actionable)).
+            max_calls (int): The maximum number of `simulate_actions` requests.
+            batch_size (int, optional): The number of candidates per request. Defaults to a whole generation.
+            max_workers (int): The number of requests to run at once.
+            tolerance (float): Stop once the search step is smaller than this fraction of the bounds.
+            seed (int, optional): The random seed.
+        """
+        missing = [node for node in actionable if node not in constraints]
+        if missing:
+            raise Exception(f"Actionable nodes need (low, high) constraints: {missing}")
+
+        self.model = model
+        self.targets = targets
+        self.actionable = list(actionable)
+        self.constraints = constraints
+        self.fixed = fixed
+        self.target_importance = target_importance
+        self.max_calls = max_calls
+        self.max_workers = max_workers
+        self.tolerance = tolerance
+        self.rng = np.random.default_rng(seed)
+
+        n = len(self.actionable)
+        self.population = population or 4 + int(3 * math.log(n))
+        self.batch_size = batch_size or self.population
+        self.low = np.array([constraints[node][0] for node in self.actionable], dtype=float)
+        self.high = np.array([constraints[node][1] for node in self.actionable], dtype=float)
+        if np.any(self.low >= self.high):
+            raise Exception("Constraints on actionable nodes must have low < high")
+
+        self.outcomes = list(dict.fromkeys(
+            [*targets, *(node for node in constraints if node not in self.actionable)]))
+        self.cache = {}
+        self.calls = 0
+
+    def _key(self, unit: np.ndarray) -> tuple:
+        return tuple(np.round(unit, 9))
+
+    def _evaluate(self, units: np.ndarray) -> np.ndarray:
+        """Get the outcome medians of candidates in the unit cube, querying only uncached ones."""
+        new = list({self._key(unit): unit for unit in units if self._key(unit) not in self.cache}.values())
+        batches = [np.array(new[i:i + self.batch_size]) for i in range(0, len(new), self.batch_size)]
+
+        def query(batch: np.ndarray) -> np.ndarray:
+            values = self.low + batch * (self.high - self.low)
+            result = self.model.simulate_actions(
+                {node: values[:, j].tolist() for j, node in enumerate(self.actionable)},
+                fixed=self.fixed, outcomes=self.outcomes)
+            return result["median"][self.outcomes].to_numpy(dtype=float)
+
+        self.calls += len(batches)
+        for result in iter_concurrent(query, batches, max_workers=self.max_workers):
+            if not result.ok:
+                raise Exception(f"CausaDB server request failed: {result.error}")
+            for unit, medians in zip(result.item, result.value):
+                self.cache[self._key(unit)] = medians
+
+        return np.array([self.cache[self._key(unit)] for unit in units])
+
+    def _loss(self, medians: np.ndarray) -> np.ndarray:
+        loss = np.zeros(len(medians))
+        for j, node in enumerate(self.outcomes):
+            if node in self.targets:
+                loss += self.target_importance.get(node, 1.0) * (medians[:, j] - self.targets[node]) ** 2
+            if node in self.constraints:
+                low, high = self.constraints[node]
+                violation = np.maximum(low - medians[:, j], 0) + np.maximum(medians[:, j] - high, 0)
+                loss += _PENALTY * violation ** 2
+        return loss
+
+    def _requests_needed(self, units: np.ndarray) -> int:
+        new = {self._key(unit) for unit in units} - self.cache.keys()
+        return -(-len(new) // self.batch_size)
+
+    def run(self, start: dict[str, float] = None) -> OptimizationResult:
+        """Search for the best actions until the budget is spent or the search converges.
+
+        Args:
+            start (dict[str, float], optional): The initial guess. Defaults to the middle of the bounds.
+
+        Returns:
+            OptimizationResult: The best actions found, their predicted outcomes and the search statistics.
+        """
+        n = len(self.actionable)
+        lam = self.population
+        mu = lam // 2
+        weights = math.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+        weights /= weights.sum()
+        mueff = 1 / np.sum(weights ** 2)
+
+        # Strategy parameters, following Hansen's CMA-ES tutorial
+        cc = (4 + mueff / n) / (n + 4 + 2 * mueff / n)
+        cs = (mueff + 2) / (n + mueff + 5)
+        c1 = 2 / ((n + 1.3) ** 2 + mueff)
+        cmu = min(1 - c1, 2 * (mueff - 2 + 1 / mueff) / ((n + 2) ** 2 + mueff))
+        damps = 1 + 2 * max(0, math.sqrt((mueff - 1) / (n + 1)) - 1) + cs
+        chi_n = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        # The search runs in the unit cube spanned by the bounds
+        if start is None:
+            mean = np.full(n, 0.5)
+        else:
+            mean = (np.array([start[node] for node in self.actionable]) - self.low) / (self.high - self.low)
+        sigma = 0.3
+        cov = np.eye(n)
+        pc, ps = np.zeros(n), np.zeros(n)
+
+        best_unit, best_loss, best_medians = None, math.inf, None
+        history = []
+        evaluations = 0
+        generation = 0
+
+        while sigma > self.tolerance:
+            eigenvalues, basis = np.linalg.eigh(cov)
+            scales = np.sqrt(np.maximum(eigenvalues, 1e-20))
+            steps = (self.rng.standard_normal((lam, n)) * scales) @ basis.T
+            candidates = mean + sigma * steps
+            units = np.clip(candidates, 0, 1)
+
+            if self.calls + self._requests_needed(units) > self.max_calls:
+                break
+
+            medians = self._evaluate(units)
+            evaluations += lam
+            # Candidates outside the bounds are evaluated at the nearest bound and penalised by the distance
+            losses = self._loss(medians) + np.sum((candidates - units) ** 2, axis=1)
+
+            order = np.argsort(losses)
+            if losses[order[0]] < best_loss:
+                best_unit, best_loss, best_medians = units[order[0]], losses[order[0]], medians[order[0]]
+            history.append(float(best_loss))
+
+            selected = steps[order[:mu]]
+            step = weights @ selected
+            mean = mean + sigma * step
+
+            inv_sqrt = basis @ np.diag(1 / scales) @ basis.T
+            ps = (1 - cs) * ps + math.sqrt(cs * (2 - cs) * mueff) * inv_sqrt @ step
+            generation += 1
+            hsig = np.linalg.norm(ps) / math.sqrt(1 - (1 - cs) ** (2 * generation)) / chi_n < 1.4 + 2 / (n + 1)
+            pc = (1 - cc) * pc + hsig * math.sqrt(cc * (2 - cc) * mueff) * step
+            cov = ((1 - c1 - cmu) * cov
+                   + c1 * (np.outer(pc, pc) + (1 - hsig) * cc * (2 - cc) * cov)
+                   + cmu * (selected.T * weights) @ selected)
+            sigma *= math.exp((cs / damps) * (np.linalg.norm(ps) / chi_n - 1))
+
+        if best_unit is None:
+            raise Exception(f"The budget of {self.max_calls} calls is too small to evaluate one generation")
+
+        values = self.low + best_unit * (self.high - self.low)
+        return OptimizationResult(
+            actions=dict(zip(self.actionable, values.tolist())),
+            outcomes=dict(zip(self.outcomes, best_medians.tolist())),
+            loss=float(best_loss),
+            calls=self.calls,
+            evaluations=evaluations,
+            history=history,
+        )
@@ -1,10 +1,4 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
-import networkx as nx
-import mermaid as md
-from mermaid.graph import Graph
 import tempfile
-from IPython.display import SVG, display
 
 
 def plot_causal_graph(model: "Model", style="graph", bg="white", **kwargs) -> None:
@@ -27,7 +21,9 @@ def plot_causal_graph(model: "Model", style="graph", bg="white", **kwargs) -> No
     ```
     """
     if style == "graph":
-        G = nx.DiGraph(model.get_edges())
+        import networkx as nx
+
+        G = nx.DiGraph(model.graph.edges)
         pos = nx.layout.spring_layout(G)
         nx.draw(
             G,
@@ -40,16 +36,19 @@ def plot_causal_graph(model: "Model", style="graph", bg="white", **kwargs) -> No
         )
 
     elif style == "flowchart":
+        import mermaid as md
+        from mermaid.graph import Graph
+        from IPython.display import SVG, display
 
         theme = kwargs.get("theme", "default")
         direction = kwargs.get("direction", "TD")
 
         mermaid_string = "%%{init: {'theme':'" + \
             theme + "'}}%%\ngraph " + direction + "\n"
-        for edge in model.get_edges():
+        for edge in model.graph.edges:
             mermaid_string += f"{edge[0]} --> {edge[1]}\n"
 
-        node_string = ",".join(model.get_nodes())
+        node_string = ",".join(model.graph.nodes)
         mermaid_string += f"""
         classDef rounded rx:10px,ry:10px
         class {node_string} rounded
@@ -90,9 +89,11 @@ def plot_causal_attributions(model: "Model", outcome: str, normalise: bool = Fal
     ax = plot_causal_attributions(model, "y")
     ```
     """
-    # Calculate the causal attribution
-    causal_attributions = model.causal_attributions(
-        outcome, normalise=normalise)
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Get the causal attribution, from the model's attribution cache if it was computed before
+    causal_attributions = model.attribution_matrix([outcome], normalise)
 
     # Plot the causal attribution
     if ax is None:
@@ -0,0 +1,263 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable
+import requests
+
+from .deadlines import Deadline
+from .lanes import BULK, INTERACTIVE
+
+# Status codes the server uses to signal that the client should slow down
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class TokenBucket:
+    """Token bucket limiting the rate at which requests are sent."""
+
+    def __init__(self, rate: float, burst: int = None) -> None:
+        """Initializes the TokenBucket class.
+
+        Args:
+            rate (float): The sustained number of requests per second.
+            burst (int, optional): The maximum number of requests sent at once. Defaults to `rate` (at least 1).
+        """
+        if rate <= 0:
+            raise Exception("Rate limit must be positive")
+
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Deadline = None) -> None:
+        """Take a token, waiting until one is available.
+
+        Args:
+            deadline (Deadline, optional): The deadline of the request, which stops the wait if it passes or is cancelled.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            _sleep(wait, deadline)
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit adjusted by additive increase, multiplicative decrease (AIMD).
+
+    Each successful request raises the limit by roughly one per window of requests, while each
+    throttled request cuts it by `backoff`, so the limit settles at what the server sustains.
+    """
+
+    def __init__(self, max_limit: int = 64, min_limit: int = 1, backoff: float = 0.5) -> None:
+        """Initializes the AdaptiveConcurrency class.
+
+        Args:
+            max_limit (int): The maximum number of requests in flight. Also the initial limit.
+            min_limit (int): The minimum number of requests in flight.
+            backoff (float): The factor the limit is multiplied by when a request is throttled.
+        """
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.backoff = backoff
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, deadline: Deadline = None) -> None:
+        """Wait for a free slot under the current limit and take it.
+
+        Args:
+            deadline (Deadline, optional): The deadline of the request, which stops the wait if it passes or is cancelled.
+        """
+        with self._condition:
+            while self.in_flight >= max(self.min_limit, int(self.limit)):
+                _wait(self._condition, deadline)
+            self.in_flight += 1
+
+    def release(self, throttled: bool = None) -> None:
+        """Release a slot and adjust the limit.
+
+        Args:
+            throttled (bool, optional): Whether the server throttled the request. If None (e.g. the
+                request failed for another reason), the limit is left unchanged.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+            elif throttled is not None:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class RateController:
+    """Controls the rate and concurrency of requests, and retries throttled ones.
+
+    Throttled responses are retried after the server's `Retry-After` delay, or an exponential
+    backoff when none is given. A 429 means the request was rejected before being processed, so it
+    is retried for every request, but a 503 (e.g. from a proxy) may come after the server processed
+    it, so it is only retried for idempotent requests. While a `Retry-After` delay is pending, no request
+    is sent by any thread sharing the controller.
+
+    Interactive and bulk requests have separate concurrency limits, and bulk requests wait while
+    any interactive request is waiting to be sent, so bulk work never delays interactive work.
+    """
+
+    def __init__(self, rate: float = None, burst: int = None, max_concurrency: int = 64, bulk_concurrency: int = 4,
+                 max_retries: int = 5, backoff_base: float = 0.5, max_backoff: float = 30.0) -> None:
+        """Initializes the RateController class.
+
+        Args:
+            rate (float, optional): The maximum number of requests per second. Defaults to no limit.
+            burst (int, optional): The maximum number of requests sent at once under the rate limit.
+            max_concurrency (int): The maximum number of interactive requests in flight.
+            bulk_concurrency (int): The maximum number of bulk requests in flight.
+            max_retries (int): The maximum number of times a throttled request is retried.
+            backoff_base (float): The first retry delay when the server gives no `Retry-After`.
+            max_backoff (float): The maximum retry delay, in seconds.
+        """
+        self.bucket = TokenBucket(rate, burst) if rate is not None else None
+        self.concurrency = AdaptiveConcurrency(max_limit=max_concurrency)
+        self.lanes = {
+            INTERACTIVE: self.concurrency,
+            BULK: AdaptiveConcurrency(max_limit=bulk_concurrency),
+        }
+        self._interactive_waiting = 0
+        self._priority = threading.Condition()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def send(self, send: Callable[[], requests.Response], deadline: Deadline = None,
+             on_retry: Callable[[], None] = None, lane: str = INTERACTIVE,
+             idempotent: bool = True) -> requests.Response:
+        """Send a request under the rate and concurrency limits, retrying if it is throttled.
+
+        Args:
+            send (Callable): A function sending the request and returning the response.
+            deadline (Deadline, optional): The deadline of the request. Waiting for a slot or a retry
+                raises as soon as it passes or is cancelled, and no retry is made if it would only
+                start after the deadline.
+            on_retry (Callable, optional): A function called before each retry.
+            lane (str): The lane of the request, "interactive" or "bulk".
+            idempotent (bool): Whether the request can safely be sent twice. Only idempotent requests are
+                retried after a 503.
+
+        Returns:
+            requests.Response: The response. This is the last throttled response if every retry was throttled.
+        """
+        concurrency = self.lanes[lane]
+
+        for attempt in range(self.max_retries + 1):
+            self._acquire(concurrency, lane, deadline)
+            throttled = None
+            try:
+                response = send()
+                throttled = response.status_code in THROTTLE_STATUS_CODES
+            finally:
+                concurrency.release(throttled)
+
+            retryable = response.status_code == 429 or (throttled and idempotent)
+            if not retryable or attempt == self.max_retries:
+                return response
+
+            delay = self.retry_delay(response, attempt)
+            if deadline is not None and delay >= deadline.remaining():
+                return response
+
+            if "Retry-After" in response.headers:
+                self._pause(delay)
+            else:
+                _sleep(delay, deadline)
+
+            if on_retry is not None:
+                on_retry()
+
+        return response
+
+    def retry_delay(self, response: requests.Response, attempt: int) -> float:
+        """Get the delay before retrying a throttled request.
+
+        Args:
+            response (requests.Response): The throttled response.
+            attempt (int): The number of attempts made so far, minus one.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return min(self.max_backoff, max(0.0, float(retry_after)))
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after).timestamp()
+                    return min(self.max_backoff, max(0.0, retry_at - time.time()))
+                except (TypeError, ValueError):
+                    pass
+
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.max_backoff, self.backoff_base * 2 ** attempt))
+
+    def _acquire(self, concurrency: AdaptiveConcurrency, lane: str, deadline: Deadline = None) -> None:
+        # Take a slot, letting interactive requests that are waiting go first
+        with self._priority:
+            if lane == INTERACTIVE:
+                self._interactive_waiting += 1
+            else:
+                while self._interactive_waiting > 0:
+                    _wait(self._priority, deadline)
+
+        try:
+            self._wait_for_pause(deadline)
+            if self.bucket is not None:
+                self.bucket.acquire(deadline)
+            concurrency.acquire(deadline)
+        finally:
+            if lane == INTERACTIVE:
+                with self._priority:
+                    self._interactive_waiting -= 1
+                    self._priority.notify_all()
+
+    def _pause(self, delay: float) -> None:
+        with self._lock:
+            self._paused_until = max(
+                self._paused_until, time.monotonic() + delay)
+
+    def _wait_for_pause(self, deadline: Deadline = None) -> None:
+        while True:
+            with self._lock:
+                remaining = self._paused_until - time.monotonic()
+            if remaining <= 0:
+                return
+            _sleep(remaining, deadline)
+
+
+def _sleep(seconds: float, deadline: Deadline = None) -> None:
+    # Sleep, stopping early if the deadline passes or is cancelled
+    if deadline is None:
+        time.sleep(seconds)
+    else:
+        deadline.sleep(seconds)
+
+
+def _wait(condition: threading.Condition, deadline: Deadline = None) -> None:
+    # Wait on a condition whose lock is held, stopping early if the deadline passes or is cancelled
+    if deadline is None:
+        condition.wait()
+    else:
+        deadline.wait_condition(condition)
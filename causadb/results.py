@@ -0,0 +1,278 @@
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+
+from .encoding import decode_array
+
+
+class SimulationResult(Mapping):
+    """Result of a simulation, backed by one contiguous array of shape (band, row, node).
+
+    Behaves like the dictionary returned by `Model.simulate_actions`, with the
+    "median", "lower" and "upper" DataFrames being zero-copy views of the array.
+    """
+    bands = ("median", "lower", "upper")
+
+    def __init__(self, values: np.ndarray, index: list, columns: list) -> None:
+        """Initializes the SimulationResult class.
+
+        Args:
+            values (np.ndarray): Array of shape (3, rows, nodes), ordered as `bands`.
+            index (list): The row labels (one per simulated action).
+            columns (list): The node names.
+        """
+        if values.ndim != 3 or values.shape[0] != len(self.bands):
+            raise Exception(
+                f"Simulation values must have shape (3, rows, nodes), got {values.shape}")
+
+        self.values = values
+        self.index = pd.Index(index)
+        self.columns = pd.Index(columns)
+        self._frames = {}
+
+    def __repr__(self) -> str:
+        return f"<SimulationResult {len(self.index)} rows x {len(self.columns)} nodes>"
+
+    def __getitem__(self, band: str) -> pd.DataFrame:
+        if band not in self.bands:
+            raise KeyError(band)
+
+        if band not in self._frames:
+            self._frames[band] = pd.DataFrame(
+                self.values[self.bands.index(band)],
+                index=self.index,
+                columns=self.columns,
+                copy=False,
+            )
+
+        return self._frames[band]
+
+    def __iter__(self):
+        return iter(self.bands)
+
+    def __len__(self) -> int:
+        return len(self.bands)
+
+    @property
+    def median(self) -> pd.DataFrame:
+        return self["median"]
+
+    @property
+    def lower(self) -> pd.DataFrame:
+        return self["lower"]
+
+    @property
+    def upper(self) -> pd.DataFrame:
+        return self["upper"]
+
+    def select(self, columns: list) -> "SimulationResult":
+        """Get the result for a subset of nodes.
+
+        Args:
+            columns (list): The node names.
+
+        Returns:
+            SimulationResult: The result with only these nodes.
+        """
+        return SimulationResult(self.values[:, :, _column_positions(self.columns, columns)], self.index, columns)
+
+    def to_dict(self) -> dict:
+        """Convert the result to the dictionary of DataFrames returned by `Model.simulate_actions`.
+
+        Returns:
+            dict: A dictionary with "median", "lower" and "upper" DataFrames.
+        """
+        return {band: self[band] for band in self.bands}
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "SimulationResult":
+        """Build a result from a binary simulation response.
+
+        Args:
+            payload (bytes): The response body in the compact binary format.
+
+        Returns:
+            SimulationResult: The simulation result.
+        """
+        header, values = decode_array(payload)
+
+        # Reorder the bands if the server sent them in a different order
+        bands = header.get("bands", list(cls.bands))
+        if list(bands) != list(cls.bands):
+            values = np.ascontiguousarray(
+                values[[bands.index(band) for band in cls.bands]])
+
+        return cls(values, header["index"], header["columns"])
+
+    @classmethod
+    def from_outcome(cls, outcome: dict) -> "SimulationResult":
+        """Build a result from a JSON simulation response.
+
+        Args:
+            outcome (dict): The "outcome" field of the JSON response.
+
+        Returns:
+            SimulationResult: The simulation result.
+        """
+        frames = [pd.DataFrame.from_dict(outcome[band]) for band in cls.bands]
+        index, columns = frames[0].index, frames[0].columns
+        values = np.stack([
+            frame.reindex(index=index, columns=columns).to_numpy(dtype=float)
+            for frame in frames
+        ])
+
+        return cls(values, index, columns)
+
+
+class PosteriorSamples:
+    """Raw posterior draws of a query, from which any summary can be computed locally.
+
+    The draws are stored in one array of shape (draw, row, node). For `Model.simulate_actions`
+    each row is one simulated action, for `Model.causal_effects` there is a single row.
+    """
+
+    def __init__(self, samples: np.ndarray, index: list, columns: list) -> None:
+        """Initializes the PosteriorSamples class.
+
+        Args:
+            samples (np.ndarray): Array of shape (draws, rows, nodes).
+            index (list): The row labels.
+            columns (list): The node names.
+        """
+        if samples.ndim == 2:
+            samples = samples[:, np.newaxis, :]
+        if samples.ndim != 3:
+            raise Exception(
+                f"Samples must have shape (draws, rows, nodes), got {samples.shape}")
+
+        self.samples = samples
+        self.index = pd.Index(index)
+        self.columns = pd.Index(columns)
+
+    def __repr__(self) -> str:
+        return f"<PosteriorSamples {self.n_draws} draws of {len(self.index)} rows x {len(self.columns)} nodes>"
+
+    @property
+    def n_draws(self) -> int:
+        return self.samples.shape[0]
+
+    def _frame(self, values: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(values, index=self.index, columns=self.columns, copy=False)
+
+    def quantile(self, q: float) -> pd.DataFrame:
+        """Compute a quantile of the draws.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            pd.DataFrame: The quantile for each row and node.
+        """
+        return self._frame(np.quantile(self.samples, q, axis=0))
+
+    def interval(self, interval: float = 0.9) -> SimulationResult:
+        """Compute the median and a central credible interval of the draws.
+
+        Args:
+            interval (float): The width of the interval, between 0 and 1.
+
+        Returns:
+            SimulationResult: The "median", "lower" and "upper" bands.
+        """
+        if not 0 < interval < 1:
+            raise Exception("Interval must be between 0 and 1")
+
+        tail = (1 - interval) / 2
+        values = np.quantile(self.samples, [0.5, tail, 1 - tail], axis=0)
+
+        return SimulationResult(values, self.index, self.columns)
+
+    def select(self, columns: list) -> "PosteriorSamples":
+        """Get the draws for a subset of nodes.
+
+        Args:
+            columns (list): The node names.
+
+        Returns:
+            PosteriorSamples: The draws of only these nodes.
+        """
+        return PosteriorSamples(self.samples[:, :, _column_positions(self.columns, columns)], self.index, columns)
+
+    def summary(self, interval: float = 0.9) -> pd.DataFrame:
+        """Summarise the draws in the format returned by `Model.causal_effects`.
+
+        Args:
+            interval (float): The width of the interval, between 0 and 1.
+
+        Returns:
+            pd.DataFrame: A dataframe with "median", "lower" and "upper" columns, indexed by node
+                (or by row and node when there is more than one row).
+        """
+        bands = self.interval(interval)
+        if len(self.index) == 1:
+            return pd.DataFrame({band: bands[band].iloc[0] for band in bands})
+
+        return pd.DataFrame({band: bands[band].stack() for band in bands})
+
+    def mean(self) -> pd.DataFrame:
+        """Compute the posterior mean.
+
+        Returns:
+            pd.DataFrame: The mean for each row and node.
+        """
+        return self._frame(self.samples.mean(axis=0))
+
+    def std(self) -> pd.DataFrame:
+        """Compute the posterior standard deviation.
+
+        Returns:
+            pd.DataFrame: The standard deviation for each row and node.
+        """
+        return self._frame(self.samples.std(axis=0))
+
+    def tail_probability(self, threshold: float, upper: bool = True) -> pd.DataFrame:
+        """Compute the posterior probability of exceeding (or falling below) a threshold.
+
+        Args:
+            threshold (float): The threshold value.
+            upper (bool): Whether to compute P(x > threshold) rather than P(x < threshold).
+
+        Returns:
+            pd.DataFrame: The probability for each row and node.
+        """
+        exceeds = self.samples > threshold if upper else self.samples < threshold
+        return self._frame(exceeds.mean(axis=0))
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "PosteriorSamples":
+        """Build the samples from a binary response.
+
+        Args:
+            payload (bytes): The response body in the compact binary format.
+
+        Returns:
+            PosteriorSamples: The posterior samples.
+        """
+        header, samples = decode_array(payload)
+        return cls(samples, header.get("index", [0]), header["columns"])
+
+    @classmethod
+    def from_response(cls, response: dict) -> "PosteriorSamples":
+        """Build the samples from a JSON response.
+
+        Args:
+            response (dict): The JSON response, with "samples", "columns" and optionally "index".
+
+        Returns:
+            PosteriorSamples: The posterior samples.
+        """
+        samples = np.asarray(response["samples"], dtype=float)
+        return cls(samples, response.get("index", [0]), response["columns"])
+
+
+def _column_positions(columns: pd.Index, selected: list) -> np.ndarray:
+    positions = columns.get_indexer(selected)
+    if (positions < 0).any():
+        missing = [column for column, position in zip(selected, positions) if position < 0]
+        raise KeyError(f"Nodes not in the result: {missing}")
+    return positions
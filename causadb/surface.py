@@ -0,0 +1,212 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Union
+
+_BANDS = ["median", "lower", "upper"]
+
+
+class ResponseSurface:
+    """A precomputed table of the causal effects of one node on one outcome, over a range of values.
+
+    The table is built with a single batch query to the server, and later queries are answered by
+    linear interpolation, without the server. The effects are also computed at the midpoint of
+    every grid interval, and the difference between those and the interpolated values is stored
+    as an error bound for each interval. The table can be saved as a memory-mapped file, so several
+    processes can share it. The model's version is checked at most every `check_interval` seconds,
+    and the table is rebuilt once a retrained model is ready.
+
+    Example:
+        >>> surface = ResponseSurface(model, "price", "revenue", low=5, high=20, path="price-revenue.npy")
+        >>> surface.causal_effects([7.25, 12.5])
+    """
+
+    def __init__(self, model: "Model", node: str, outcome: str, low: float, high: float, points: int = 65,
+                 baseline: float = None, fixed: dict = None, interval: float = 0.9, path: str = None,
+                 check_interval: float = 60.0) -> None:
+        """Initializes the ResponseSurface class, building the table or loading it from `path`.
+
+        Args:
+            model (Model): The model to query.
+            node (str): The action node.
+            outcome (str): The outcome node.
+            low (float): The lowest value of the action node in the table.
+            high (float): The highest value of the action node in the table.
+            points (int): The number of grid points.
+            baseline (float, optional): The value effects are measured from. Defaults to `low`.
+            fixed (dict, optional): The values to fix other nodes at.
+            interval (float): The width of the interval bands, between 0 and 1.
+            path (str, optional): A .npy file to store the table in, with its metadata in a .json file next to it.
+                An existing table for the same query and model version is loaded instead of being rebuilt.
+            check_interval (float): The minimum number of seconds between checks of the model's version.
+        """
+        if not low < high:
+            raise Exception("The range must have low < high")
+        if points < 2:
+            raise Exception("At least 2 grid points are required")
+
+        self.model = model
+        self.node = node
+        self.outcome = outcome
+        self.low = float(low)
+        self.high = float(high)
+        self.points = points
+        self.baseline = float(low if baseline is None else baseline)
+        self.fixed = fixed or {}
+        self.interval = interval
+        self.path = path
+        self.check_interval = check_interval
+        self.version = None
+        self._table = None
+        self._checked_at = None
+        self._retraining = False
+        self._lock = threading.Lock()
+
+        version = self.model.version()
+        if not self._load(version):
+            self.build(version)
+
+    def __repr__(self) -> str:
+        return f"<ResponseSurface {self.node} -> {self.outcome} on [{self.low}, {self.high}]>"
+
+    @property
+    def grid(self) -> np.ndarray:
+        """The grid of action node values."""
+        return self._table[0]
+
+    def _query(self) -> dict:
+        return {
+            "model": self.model.model_name, "node": self.node, "outcome": self.outcome,
+            "low": self.low, "high": self.high, "points": self.points, "baseline": self.baseline,
+            "fixed": self.fixed, "interval": self.interval,
+        }
+
+    def build(self, version: str = None) -> None:
+        """Query the server and rebuild the table.
+
+        Args:
+            version (str, optional): The model version the table is built from. Fetched if not given.
+        """
+        if version is None:
+            version = self.model.version()
+
+        grid = np.linspace(self.low, self.high, self.points)
+        midpoints = (grid[1:] + grid[:-1]) / 2
+
+        # One query for the baseline, the grid and the midpoints, as posterior draws so that the
+        # effect bands are quantiles of the differences rather than differences of quantiles
+        draws = self.model.simulate_actions(
+            {self.node: [self.baseline, *grid, *midpoints]},
+            fixed=self.fixed, samples=True, outcomes=[self.outcome],
+        ).samples[:, :, 0]
+        effects = draws[:, 1:] - draws[:, :1]
+
+        tail = (1 - self.interval) / 2
+        bands = np.quantile(effects, [0.5, tail, 1 - tail], axis=0)
+        at_grid, at_midpoints = bands[:, :self.points], bands[:, self.points:]
+
+        # Error bound of each interval: the largest gap between interpolation and the true midpoint value
+        interpolated = (at_grid[:, 1:] + at_grid[:, :-1]) / 2
+        error = np.abs(interpolated - at_midpoints).max(axis=0)
+
+        table = np.vstack([grid, at_grid, np.append(error, error[-1])])
+        self._store(table, version)
+
+    def _store(self, table: np.ndarray, version: str) -> None:
+        if self.path is None:
+            self._table = table
+        else:
+            # Write both files under temporary names and rename them, so readers never see a partial table
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            array = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float64, shape=table.shape)
+            array[:] = table
+            array.flush()
+            del array
+            with open(f"{tmp_path}.json", "w") as f:
+                json.dump({**self._query(), "version": version}, f)
+            os.replace(tmp_path, self.path)
+            os.replace(f"{tmp_path}.json", f"{self.path}.json")
+            self._table = np.load(self.path, mmap_mode="r")
+
+        self.version = version
+        self._checked_at = time.monotonic()
+        self._retraining = False
+
+    def _load(self, version: str) -> bool:
+        if self.path is None:
+            return False
+        try:
+            with open(f"{self.path}.json", "r") as f:
+                metadata = json.load(f)
+            table = np.load(self.path, mmap_mode="r")
+        except (OSError, ValueError):
+            return False
+
+        if metadata != {**json.loads(json.dumps(self._query())), "version": version}:
+            return False
+
+        self._table = table
+        self.version = version
+        self._checked_at = time.monotonic()
+        return True
+
+    def refresh(self, force: bool = False) -> bool:
+        """Rebuild the table if the model was retrained since it was built.
+
+        The version is checked at most every `check_interval` seconds, unless `force` is set. While
+        the model is training, the existing table keeps being used.
+
+        Args:
+            force (bool): Whether to check the version now.
+
+        Returns:
+            bool: Whether the table was rebuilt.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+
+        with self._lock:
+            if not force and now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+
+            version = self.model.version()
+            if version == self.version and not self._retraining:
+                return False
+            if self.model.status() != "trained":
+                self._retraining = True
+                return False
+
+            self.build(version)
+            return True
+
+    def causal_effects(self, values: Union[float, list[float], np.ndarray]) -> pd.DataFrame:
+        """Get the causal effects of setting the node to each value, instead of the baseline, on the outcome.
+
+        Args:
+            values (Union[float, list[float], np.ndarray]): The values of the action node, within the range of the table.
+
+        Returns:
+            pd.DataFrame: A dataframe with "median", "lower", "upper" and "error" columns, indexed by value.
+                "error" bounds the interpolation error of the bands.
+        """
+        self.refresh()
+
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        if values.size and (values.min() < self.low or values.max() > self.high):
+            raise Exception(
+                f"Values must be within the range of the table [{self.low}, {self.high}]")
+
+        table = self._table
+        grid = table[0]
+        result = {band: np.interp(values, grid, table[i + 1]) for i, band in enumerate(_BANDS)}
+
+        # The error of each value is the bound of the grid interval it falls in
+        position = np.clip(np.searchsorted(grid, values, side="right") - 1, 0, self.points - 1)
+        result["error"] = np.where(np.isin(values, grid), 0.0, table[4][position])
+
+        return pd.DataFrame(result, index=pd.Index(values, name=self.node))
@@ -0,0 +1,182 @@
+import logging
+import secrets
+import time
+
+logger = logging.getLogger("causadb")
+
+# Path segments following these collections are resource names, not part of the endpoint
+_NAMED_COLLECTIONS = {"models": "{model}", "data": "{data}"}
+
+
+def endpoint_template(path: str) -> str:
+    """Get the endpoint of a request path, with resource names replaced by placeholders.
+
+    Args:
+        path (str): The request path, e.g. "/models/my-model/causal-effects".
+
+    Returns:
+        str: The endpoint, e.g. "/models/{model}/causal-effects".
+    """
+    parts = path.split("?")[0].split("/")
+    if len(parts) > 2 and parts[1] in _NAMED_COLLECTIONS:
+        parts[2] = _NAMED_COLLECTIONS[parts[1]]
+    return "/".join(parts)
+
+
+class Span:
+    """Timings and metadata of one client request, passed to request hooks.
+
+    Before-request hooks may add entries to `headers` (e.g. trace context) and `attributes`.
+    Attributes whose name starts with an underscore are private to hooks and not exported.
+    Identifiers follow the W3C trace context format, so spans can be exported to OpenTelemetry.
+    """
+
+    def __init__(self, method: str, path: str) -> None:
+        """Initializes the Span class.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The request path, relative to the server URL.
+        """
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint_template(path)
+        parts = path.split("/")
+        self.model_name = parts[2] if len(parts) > 2 and parts[1] == "models" else None
+
+        self.trace_id = secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.headers = {}
+        self.attributes = {}
+
+        self.start_time = time.time_ns()
+        self.end_time = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.serialize_time = 0.0
+        self.network_time = 0.0
+        self.decode_time = 0.0
+        self.status_code = None
+        self.error = None
+        self.retries = 0
+        self.hedged = False
+
+    def __repr__(self) -> str:
+        return f"<Span {self.name} {self.status_code}>"
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.endpoint}"
+
+    @property
+    def duration(self) -> float:
+        """The total time of the request in seconds (so far, if it hasn't finished)."""
+        end_time = self.end_time if self.end_time is not None else time.time_ns()
+        return (end_time - self.start_time) / 1e9
+
+    def record_retry(self) -> None:
+        """Record that the request was retried."""
+        self.retries += 1
+
+    def finish(self) -> None:
+        """Record the end time of the request."""
+        self.end_time = time.time_ns()
+
+    def to_dict(self) -> dict:
+        """Convert the span to a dictionary, e.g. for structured logging.
+
+        Returns:
+            dict: The span fields.
+        """
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "method": self.method,
+            "endpoint": self.endpoint,
+            "model_name": self.model_name,
+            "status_code": self.status_code,
+            "error": repr(self.error) if self.error is not None else None,
+            "duration": self.duration,
+            "serialize_time": self.serialize_time,
+            "network_time": self.network_time,
+            "decode_time": self.decode_time,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "retries": self.retries,
+            "hedged": self.hedged,
+            **{key: value for key, value in self.attributes.items() if not key.startswith("_")},
+        }
+
+
+def run_hooks(hooks: list, span: Span) -> None:
+    """Call each hook with a span. Errors in hooks are logged rather than failing the request."""
+    for hook in hooks:
+        try:
+            hook(span)
+        except Exception:
+            logger.exception("CausaDB request hook %r failed", hook)
+
+
+class OpenTelemetryExporter:
+    """Exports client request spans to OpenTelemetry and propagates trace context to the server.
+
+    Requires the `opentelemetry-api` package (and an SDK configured by the application).
+
+    Example:
+        >>> OpenTelemetryExporter().install(client)
+    """
+
+    def __init__(self, tracer_provider=None) -> None:
+        """Initializes the OpenTelemetryExporter class.
+
+        Args:
+            tracer_provider (optional): The OpenTelemetry tracer provider. Defaults to the global one.
+        """
+        try:
+            from opentelemetry import trace, propagate
+        except ImportError:
+            raise Exception(
+                "OpenTelemetry export requires the opentelemetry-api package (pip install opentelemetry-api)")
+
+        self._trace = trace
+        self._propagate = propagate
+        self.tracer = trace.get_tracer("causadb", tracer_provider=tracer_provider)
+
+    def install(self, client: "CausaDB") -> "OpenTelemetryExporter":
+        """Register the exporter's hooks on a client.
+
+        Args:
+            client (CausaDB): The client.
+
+        Returns:
+            OpenTelemetryExporter: The exporter.
+        """
+        client.before_request(self.before_request)
+        client.after_request(self.after_request)
+        return self
+
+    def before_request(self, span: Span) -> None:
+        # Start the client span under the caller's span, and pass it on so server spans nest under it
+        otel_span = self.tracer.start_span(span.name, kind=self._trace.SpanKind.CLIENT, start_time=span.start_time)
+        context = otel_span.get_span_context()
+        if context.is_valid:
+            span.trace_id = format(context.trace_id, "032x")
+            span.span_id = format(context.span_id, "016x")
+        span.attributes["_otel_span"] = otel_span
+        self._propagate.inject(span.headers, context=self._trace.set_span_in_context(otel_span))
+
+    def after_request(self, span: Span) -> None:
+        otel_span = span.attributes.pop("_otel_span", None)
+        if otel_span is None:
+            return
+
+        otel_span.set_attributes({
+            key: value for key, value in span.to_dict().items()
+            if key not in ("name", "trace_id", "span_id") and value is not None
+        })
+        if span.error is not None:
+            otel_span.record_exception(span.error)
+            otel_span.set_status(self._trace.Status(
+                self._trace.StatusCode.ERROR))
+        otel_span.end(end_time=span.end_time)
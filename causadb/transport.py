@@ -0,0 +1,296 @@
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Union
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from .deadlines import DEADLINE_HEADER, Deadline, current_deadline
+from .endpoints import EndpointSelector
+from .lanes import BULK, INTERACTIVE, check_lane, current_lane
+from .hedging import HedgePolicy
+from .ratelimit import RateController
+from .tracing import Span, run_hooks
+from .utils import get_causadb_url
+
+
+class Transport:
+    """Pooled HTTP transport shared by a client and its models and data.
+
+    Connections are kept alive and reused across requests, and the pool is sized so that
+    concurrent queries (e.g. from `CausaDB.map_queries`) don't open a new connection each.
+    Requests are sent through a RateController, which retries throttled requests and adapts
+    the number of requests in flight to what the server sustains.
+
+    Every request has connect and read timeouts. Inside a `deadline` context, these are capped by
+    the time left, the server is told the deadline, and the request can be cancelled in flight.
+
+    With a HedgePolicy, slow idempotent requests are duplicated and the first response is used.
+
+    Requests are sent in the interactive lane or the bulk lane. Each lane has its own connection
+    pool and concurrency limit, and bulk requests yield to waiting interactive ones.
+
+    Requests go to the endpoint chosen by the EndpointSelector, failing over to another endpoint if
+    the connection fails. Without one, they go to the process-wide URL (`get_causadb_url`).
+
+    Each request is recorded in a Span, which is passed to the before- and after-request hooks.
+
+    Optional server features the server rejected as unsupported (e.g. "attribution-batches") are kept
+    in `unsupported`, so every client and model using the transport stops trying them.
+    """
+
+    def __init__(self, pool_size: int = 16, bulk_pool_size: int = 4, rate_controller: RateController = None,
+                 timeout: Union[float, tuple[float, float]] = (10.0, 300.0), hedge_policy: HedgePolicy = None,
+                 endpoints: EndpointSelector = None) -> None:
+        """Initializes the Transport class.
+
+        Args:
+            pool_size (int): The maximum number of connections kept open to the server for interactive requests.
+            bulk_pool_size (int): The maximum number of connections kept open to the server for bulk requests.
+            rate_controller (RateController, optional): The rate controller. Defaults to one with no rate limit.
+            timeout (Union[float, tuple[float, float]]): The default (connect, read) timeouts in seconds.
+            hedge_policy (HedgePolicy, optional): The policy for hedging idempotent requests. Defaults to no hedging.
+            endpoints (EndpointSelector, optional): The server endpoints. Defaults to the process-wide URL.
+        """
+        self.pool_size = pool_size
+        self.rate_controller = rate_controller or RateController()
+        self.timeout = timeout
+        self.hedge_policy = hedge_policy
+        self.endpoints = endpoints
+        self.before_request_hooks = []
+        self.after_request_hooks = []
+        self._executor = None
+        self._hedge_executor = None
+        self._executor_lock = threading.Lock()
+        self.unsupported = set()
+
+        # Separate pools, so that bulk requests never hold the connections interactive ones need
+        self.sessions = {
+            INTERACTIVE: _make_session(pool_size),
+            BULK: _make_session(bulk_pool_size),
+        }
+        self.session = self.sessions[INTERACTIVE]
+
+        if endpoints is not None and endpoints.session is None:
+            endpoints.session = self.session
+
+    @property
+    def base_url(self) -> str:
+        """The URL of the server the next request will be sent to."""
+        return self.endpoints.current() if self.endpoints is not None else get_causadb_url()
+
+    def request(self, method: str, path: str, token: str = None, headers: dict = None,
+                timeout: Union[float, tuple[float, float]] = None, idempotent: bool = None, lane: str = None,
+                **kwargs) -> requests.Response:
+        """Send a request to the CausaDB server.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path of the endpoint, relative to the server URL (e.g. "/models").
+            token (str, optional): The token secret to authenticate with.
+            headers (dict, optional): Additional request headers.
+            timeout (Union[float, tuple[float, float]], optional): The (connect, read) timeouts. Defaults to the transport's.
+            idempotent (bool, optional): Whether the request can safely be sent twice, which allows hedging
+                it. Defaults to True for GET requests only.
+            lane (str, optional): The lane to send the request in ("interactive" or "bulk"), unless another was chosen
+                for the context with `lane`. Defaults to interactive.
+            kwargs: Additional arguments passed to `requests.Session.request` (e.g. `json`).
+
+        Returns:
+            requests.Response: The server response.
+        """
+        lane = check_lane(current_lane() or lane or INTERACTIVE)
+        session = self.sessions[lane]
+
+        span = Span(method, path)
+        span.attributes["lane"] = lane
+        run_hooks(self.before_request_hooks, span)
+
+        request_headers = {}
+        if token is not None:
+            request_headers["token"] = token
+        request_headers.update(headers or {})
+        request_headers.update(span.headers)
+
+        # Serialise the body here rather than in requests, so that it can be timed
+        if "json" in kwargs:
+            start = time.perf_counter()
+            kwargs["data"] = json.dumps(
+                kwargs.pop("json"), allow_nan=False).encode("utf-8")
+            request_headers.setdefault("Content-Type", "application/json")
+            span.serialize_time = time.perf_counter() - start
+        span.request_bytes = len(kwargs.get("data") or b"")
+
+        timeout = timeout if timeout is not None else self.timeout
+        scope = current_deadline()
+
+        if idempotent is None:
+            idempotent = method == "GET"
+
+        def send() -> requests.Response:
+            return self.rate_controller.send(
+                lambda: self._send_with_failover(session, method, path, request_headers,
+                                                 timeout, scope, kwargs, idempotent),
+                deadline=scope,
+                on_retry=span.record_retry,
+                lane=lane,
+                idempotent=idempotent,
+            )
+
+        try:
+            start = time.perf_counter()
+            if self.hedge_policy is None or not idempotent:
+                response = send()
+            else:
+                response = self._send_hedged(f"{method} {path}", send, span)
+            span.network_time = time.perf_counter() - start
+            span.status_code = response.status_code
+            span.response_bytes = len(response.content)
+
+            # Decode JSON bodies here, once, to time decoding
+            if response.headers.get("content-type", "").startswith("application/json"):
+                start = time.perf_counter()
+                try:
+                    response.json = _decoded_json(response.json, response.json())
+                except ValueError:
+                    pass
+                span.decode_time = time.perf_counter() - start
+        except Exception as e:
+            span.error = e
+            raise
+        finally:
+            span.finish()
+            run_hooks(self.after_request_hooks, span)
+
+        return response
+
+    def _send_hedged(self, endpoint: str, send: Callable[[], requests.Response], span: Span) -> requests.Response:
+        """Send a request, and a duplicate if it is slow, returning whichever succeeds first."""
+        policy = self.hedge_policy
+        executor = self._get_executor("_hedge_executor")
+        start = time.monotonic()
+        futures = [executor.submit(send)]
+
+        delay = policy.hedge_delay(endpoint)
+        if delay is not None:
+            done, _ = wait(futures, timeout=delay)
+            if not done and policy.try_hedge():
+                span.hedged = True
+                futures.append(executor.submit(send))
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.add_done_callback(_close_response)
+                    policy.record(endpoint, time.monotonic() - start)
+                    return future.result()
+
+        # Every attempt failed, so raise the original request's error
+        return futures[0].result()
+
+    def _send_with_failover(self, session: requests.Session, method: str, path: str, headers: dict,
+                            timeout: Union[float, tuple[float, float]], scope: Deadline, kwargs: dict,
+                            idempotent: bool) -> requests.Response:
+        """Send a request to the best endpoint, trying the others if the connection fails."""
+        if self.endpoints is None:
+            return self._send(session, method, f"{get_causadb_url()}{path}", headers, timeout, scope, kwargs)
+
+        tried = set()
+        while True:
+            base_url = self.endpoints.current()
+            tried.add(base_url)
+            try:
+                return self._send(session, method, f"{base_url}{path}", headers, timeout, scope, kwargs)
+            except requests.ConnectionError as e:
+                self.endpoints.mark_failed(base_url)
+                # Requests that may have reached the server are only resent if they are idempotent
+                if len(tried) == len(self.endpoints) or not (idempotent or _is_connect_error(e)):
+                    raise
+
+    def _send(self, session: requests.Session, method: str, url: str, headers: dict,
+              timeout: Union[float, tuple[float, float]], scope: Deadline, kwargs: dict) -> requests.Response:
+        """Send a single request, bounded and cancellable by the deadline if there is one."""
+        if scope is None:
+            return session.request(method, url, headers=headers, timeout=timeout, **kwargs)
+
+        scope.check()
+        remaining = scope.remaining()
+        if remaining != float("inf"):
+            headers = dict(headers)
+            headers[DEADLINE_HEADER] = str(int(remaining * 1000))
+            connect, read = timeout if isinstance(
+                timeout, tuple) else (timeout, timeout)
+            timeout = (
+                min(connect, remaining) if connect is not None else remaining,
+                min(read, remaining) if read is not None else remaining,
+            )
+
+        # Wait for the request on this thread so that it can be abandoned if cancelled
+        future = self._get_executor("_executor").submit(
+            session.request, method, url, headers=headers, timeout=timeout, **kwargs)
+        done = threading.Event()
+        future.add_done_callback(lambda _: done.set())
+
+        while not future.done():
+            scope.wait(done)
+            if not future.done():
+                try:
+                    scope.check()
+                except Exception:
+                    future.add_done_callback(_close_response)
+                    raise
+
+        return future.result()
+
+    def _get_executor(self, name: str) -> ThreadPoolExecutor:
+        # Cancellable and hedged requests each get their own pool so they never wait on each other
+        with self._executor_lock:
+            if getattr(self, name) is None:
+                setattr(self, name, ThreadPoolExecutor(
+                    max_workers=sum(
+                        lane.max_limit for lane in self.rate_controller.lanes.values()),
+                    thread_name_prefix="causadb-request",
+                ))
+            return getattr(self, name)
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        for session in self.sessions.values():
+            session.close()
+        for executor in (self._executor, self._hedge_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+
+def _make_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _is_connect_error(error: requests.ConnectionError) -> bool:
+    # Whether the connection failed before the request was sent
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _decoded_json(decode: Callable, body) -> Callable:
+    # Serve the body decoded by the transport, decoding again only when given decoding options
+    def json(**kwargs):
+        return decode(**kwargs) if kwargs else body
+    return json
+
+
+def _close_response(future: Future) -> None:
+    # Release the connection of a request that was abandoned after a cancellation
+    if future.exception() is None:
+        future.result().close()
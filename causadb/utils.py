@@ -9,3 +9,24 @@ def get_causadb_url():
 
 def set_causadb_url(url: str):
     os.environ["CAUSADB_URL"] = url
+
+
+_config_cache = {}
+
+
+def load_config(config_filepath: str = "~/.causadb/config.toml") -> dict:
+    """Load a config file, reusing the parsed contents until the file is modified."""
+    config_filepath = os.path.expanduser(config_filepath)
+    mtime = os.stat(config_filepath).st_mtime_ns
+
+    cached = _config_cache.get(config_filepath)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    import toml
+
+    with open(config_filepath, "r") as f:
+        config = toml.load(f)
+
+    _config_cache[config_filepath] = (mtime, config)
+    return config
@@ -113,6 +113,42 @@ def parse_markdown_cli(file_path):
                 f.writelines(section)
 
 
+@task
+def import_time(c, repeat=10, budget=100):
+    """
+    Benchmark the startup time of the library and the CLI.
+    """
+    import statistics
+    import subprocess
+    import sys
+
+    # Each snippet runs in a fresh interpreter, timing everything after interpreter startup
+    snippets = {
+        "import causadb": "import causadb",
+        "causadb --version": "from causadb.cli.main import app; app(['--version'], standalone_mode=False)",
+        "from causadb import CausaDB": "from causadb import CausaDB",
+    }
+    # Only the import and short CLI commands are held to the budget
+    budgeted = ["import causadb", "causadb --version"]
+
+    over_budget = []
+    for name, snippet in snippets.items():
+        script = f"import time; t = time.perf_counter(); {snippet}; print(time.perf_counter() - t)"
+        times = [
+            float(subprocess.run([sys.executable, "-c", script], check=True,
+                                 capture_output=True, text=True).stdout.splitlines()[-1])
+            for _ in range(repeat)
+        ]
+        elapsed = statistics.median(times) * 1000
+        print(f"{name:<30} {elapsed:8.1f} ms")
+        if name in budgeted and elapsed > budget:
+            over_budget.append(name)
+
+    if over_budget:
+        raise SystemExit(
+            f"Over the {budget} ms import budget: {', '.join(over_budget)}")
+
+
 @task
 def build_docs(c):
     """
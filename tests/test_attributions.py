@@ -0,0 +1,118 @@
+import json
+import pytest
+import requests
+from causadb import Model
+from causadb.metrics import ClientStats
+from causadb.transport import Transport
+
+PARENTS = {"x": {"x": 1.0}, "y": {"x": 0.5, "y": 0.5}, "z": {"x": 0.2, "y": 0.3, "z": 0.5}}
+
+
+class AttributionsClient:
+    """Stands in for a client of a server answering causal-attributions for a model x -> y -> z.
+
+    Batches of outcomes are answered with `batch_status`, e.g. 422 for a server that only answers one
+    outcome per request. The model's version changes with `status`.
+    """
+
+    def __init__(self, batch_status=200):
+        self.batch_status = batch_status
+        self.status = "trained"
+        self.requests = []
+        self._stats = ClientStats()
+        self._transport = Transport()
+
+    def _request(self, method, path, **kwargs):
+        query = kwargs.get("json")
+        self.requests.append((method, path, query))
+        response = requests.Response()
+        response.status_code = 200
+        if method == "GET":
+            body = {"details": {"status": self.status,
+                                "config": {"nodes": ["x", "y", "z"], "edges": [["x", "y"], ["y", "z"]]}}}
+        elif path.endswith("/causal-attributions") and "outcomes" in query:
+            response.status_code = self.batch_status
+            body = {"outcome": {outcome: PARENTS[outcome] for outcome in query["outcomes"]}} \
+                if self.batch_status == 200 else {"detail": "Batch rejected"}
+        elif path.endswith("/causal-attributions"):
+            body = {"outcome": {query["outcome"]: PARENTS[query["outcome"]]}}
+        else:
+            body = {}
+        response._content = json.dumps(body).encode()
+        return response
+
+    def attribution_queries(self):
+        return [query for _, path, query in self.requests if path.endswith("/causal-attributions")]
+
+
+@pytest.fixture
+def model():
+    model = Model("attributions-model", AttributionsClient())
+    model.client.requests.clear()
+    return model
+
+
+def test_attribution_matrix_is_cached(model):
+    matrix = model.attribution_matrix()
+    assert model.client.attribution_queries() == [{"outcomes": ["x", "y", "z"], "normalise": False}]
+    assert list(matrix.columns) == ["x", "y", "z"]
+    assert matrix.loc["z", "x"] == 0.0
+    assert matrix.loc["x", "z"] == 0.2
+
+    # Any subset is answered from the cache, without the zero rows of other outcomes
+    assert list(model.attribution_matrix(["y"]).index) == ["x", "y"]
+    assert model.attribution_matrix(["z"]).loc["y", "z"] == 0.3
+    assert len(model.client.attribution_queries()) == 1
+    assert model.client._stats.cache_hit_rates()["attributions"] == 2 / 3
+
+    model.attribution_matrix(["y"], refresh=True)
+    assert model.client.attribution_queries()[-1] == {"outcome": "y", "normalise": False}
+
+
+def test_attribution_matrix_refetches_new_versions(model):
+    model.attribution_matrix(["y"])
+    model.attribution_matrix(["z"])
+    assert [query["outcome"] for query in model.client.attribution_queries()] == ["y", "z"]
+
+    model.client.status = "retrained"
+    model.attribution_matrix(["y"], max_age=60)
+    assert len(model.client.attribution_queries()) == 2
+    model.attribution_matrix(["y", "z"], max_age=0)
+    assert model.client.attribution_queries()[-1] == {"outcomes": ["y", "z"], "normalise": False}
+
+
+def test_attribution_requests_on_cache_miss():
+    client = AttributionsClient(batch_status=422)
+    model = Model("attributions-model", client)
+    client.requests.clear()
+
+    # The version is fetched once, and a single outcome isn't sent as a batch
+    model.attribution_matrix(["y"])
+    assert client.requests == [
+        ("GET", "/models/attributions-model", None),
+        ("POST", "/models/attributions-model/causal-attributions", {"outcome": "y", "normalise": False}),
+    ]
+
+    # The rejected batch falls back to one request per outcome, and isn't sent again to this server
+    client.requests.clear()
+    assert list(model.attribution_matrix(["x", "z"]).columns) == ["x", "z"]
+    assert client.attribution_queries()[0] == {"outcomes": ["x", "z"], "normalise": False}
+    assert len(client.attribution_queries()) == 3
+
+    other = Model("other", client)
+    client.requests.clear()
+    other.attribution_matrix(["x", "y"])
+    assert all("outcome" in query for query in client.attribution_queries())
+    assert len(client.attribution_queries()) == 2
+
+
+def test_attribution_batches_survive_transient_failures():
+    client = AttributionsClient(batch_status=503)
+    model = Model("attributions-model", client)
+
+    # A failed batch falls back to one request per outcome, but the next batch is still tried
+    assert model.attribution_matrix(["x", "y"]).loc["x", "y"] == 0.5
+    client.batch_status = 200
+    client.requests.clear()
+    model.attribution_matrix(["y", "z"], refresh=True)
+    assert client.attribution_queries() == [{"outcomes": ["y", "z"], "normalise": False}]
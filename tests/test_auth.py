@@ -0,0 +1,60 @@
+import os
+import time
+from causadb import CausaDB
+from causadb.auth import TokenCache
+from causadb.utils import load_config
+
+
+def test_token_cache(tmp_path):
+    path = tmp_path / "token-cache.json"
+    cache = TokenCache(path=str(path), ttl=60)
+    assert not cache.is_valid("https://a", "token")
+
+    cache.add("https://a", "token")
+    assert cache.is_valid("https://a", "token")
+    assert not cache.is_valid("https://b", "token")
+    assert "token" not in path.read_text()
+
+    # Another process sees the validation through the file
+    assert TokenCache(path=str(path)).is_valid("https://a", "token")
+
+    cache.invalidate("https://a", "token")
+    assert not cache.is_valid("https://a", "token")
+    assert not TokenCache(path=str(path)).is_valid("https://a", "token")
+
+
+def test_token_cache_expiry():
+    cache = TokenCache(path=None, ttl=0.05)
+    cache.add("https://a", "token")
+    assert cache.is_valid("https://a", "token")
+    time.sleep(0.1)
+    assert not cache.is_valid("https://a", "token")
+
+
+def test_client_construction_is_offline(monkeypatch):
+    # Nothing listens on this port, so any request would fail
+    monkeypatch.setenv("CAUSADB_URL", "http://127.0.0.1:9/v1")
+    client = CausaDB("token", token_cache=False)
+    assert client.token == "token"
+
+
+def test_set_token_uses_cache(monkeypatch):
+    monkeypatch.setenv("CAUSADB_URL", "http://127.0.0.1:9/v1")
+    cache = TokenCache(path=None)
+    cache.add("http://127.0.0.1:9/v1", "cached-token")
+
+    client = CausaDB("token", token_cache=cache)
+    client.set_token("cached-token")
+    assert client.token == "cached-token"
+    assert client.stats().cache_hit_rates() == {"token": 1.0}
+
+
+def test_load_config_cached_until_modified(tmp_path):
+    path = tmp_path / "config.toml"
+    path.write_text('[default]\ntoken_secret = "a"\n')
+    assert load_config(str(path))["default"]["token_secret"] == "a"
+
+    path.write_text('[default]\ntoken_secret = "b"\n')
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert load_config(str(path))["default"]["token_secret"] == "b"
+    assert load_config(str(path)) is load_config(str(path))
@@ -0,0 +1,96 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+from causadb import LocalModel, Model
+
+
+class LocalClient:
+    """Stands in for a client of a server whose model is a LocalModel.
+
+    Simulations are answered with the LocalModel's draws and causal effects with its effects. Actions on
+    the `categorical` nodes, which the LocalModel can't simulate, are recorded and ignored, and actions on
+    unknown nodes are rejected.
+    """
+
+    def __init__(self, local, categorical=()):
+        self.local = local
+        self.categorical = list(categorical)
+        self.queries = []
+
+    def _request(self, method, path, **kwargs):
+        query = kwargs.get("json")
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["content-type"] = "application/json"
+
+        unknown = [node for node in (query or {}).get("actions", {})
+                   if node not in self.local.nodes + self.categorical]
+        if unknown:
+            response.status_code = 422
+            body = {"detail": f"Unknown nodes: {unknown}"}
+        elif path.endswith("/simulate-actions"):
+            self.queries.append(query)
+            actions = {node: values for node, values in query["actions"].items() if node in self.local.nodes}
+            draws = self.local.simulate_actions(actions, samples=True)
+            body = {"samples": draws.samples.tolist(), "columns": list(draws.columns)}
+        elif path.endswith("/causal-effects"):
+            self.queries.append(query)
+            effects = self.local.causal_effects(query["actions"], fixed=query["fixed"], interval=query["interval"])
+            body = {"outcome": effects.to_dict()}
+        else:
+            body = {"details": {"config": {"nodes": self.local.nodes + self.categorical, "edges": self.local.edges}}}
+
+        response._content = json.dumps(body).encode()
+        return response
+
+
+@pytest.fixture
+def model():
+    # x -> y -> z and w -> z
+    rng = np.random.default_rng(0)
+    local = LocalModel(["x", "w", "y", "z"], [("x", "y"), ("y", "z"), ("w", "z")], np.zeros((100, 4)),
+                       np.column_stack([2 + 0.1 * rng.standard_normal(100), np.ones(100), -np.ones(100)]),
+                       np.ones((100, 4)))
+    return Model("batch-model", LocalClient(local, categorical=["segment"]))
+
+
+def test_causal_effects_by_row(model):
+    contexts = pd.DataFrame({"w": np.arange(10.0)}, index=[f"customer-{i}" for i in range(10)])
+
+    effects = model.causal_effects_by_row({"x": (0, 1)}, contexts, outcomes=["y", "z"], chunk_size=3)
+    assert len(model.client.queries) == 4
+    assert list(effects.index) == list(contexts.index)
+    assert list(effects.columns) == [("y", "median"), ("y", "lower"), ("y", "upper"),
+                                     ("z", "median"), ("z", "lower"), ("z", "upper")]
+
+
+def test_causal_effects_by_row_matches_causal_effects_per_row(model):
+    # y is a descendant of x, so setting it by intervention blocks the effect of x on z
+    contexts = pd.DataFrame({"w": [0.0, 2.5, -1.0], "y": [1.0, 0.0, 2.0]})
+    effects = model.causal_effects_by_row({"x": (0, 1)}, contexts, interval=0.8)
+    assert (effects[("z", "median")] == 0).all()
+
+    for index, row in contexts.iterrows():
+        expected = model.causal_effects({"x": (0, 1)}, fixed=row.to_dict(), interval=0.8)
+        for node in expected.index:
+            for band in ("median", "lower", "upper"):
+                assert effects.loc[index, (node, band)] == pytest.approx(expected.loc[node, band])
+
+
+def test_causal_effects_by_row_errors(model):
+    with pytest.raises(Exception):
+        model.causal_effects_by_row({"x": (0, 1)}, pd.DataFrame({"x": [1.0]}))
+    with pytest.raises(Exception):
+        model.causal_effects_by_row({"x": (0, 1)}, pd.DataFrame({"missing": [1.0]}))
+
+
+def test_causal_effects_by_row_defaults_and_raw_contexts(model):
+    contexts = pd.DataFrame({"w": [1, 2], "segment": pd.Categorical(["a", "b"])})
+
+    # Every node is returned by default, and the contexts are sent as they are
+    effects = model.causal_effects_by_row({"x": (0, 1)}, contexts)
+    assert set(effects.columns.get_level_values(0)) == {"x", "w", "y", "z"}
+    assert model.client.queries[0]["actions"]["segment"] == ["a", "a", "b", "b"]
+    assert model.client.queries[0]["actions"]["w"] == [1, 1, 2, 2]
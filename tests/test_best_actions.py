@@ -0,0 +1,102 @@
+import json
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+from causadb import Data, Model
+
+
+class BestActionsClient:
+    """Stands in for a client of a server answering find-best-actions with x = 2 * w for each row.
+
+    The rows come from the query's data, or from the stored `rows` paged by offset and limit. With
+    paging=False, the server ignores the offset and limit and answers every stored row.
+    """
+
+    def __init__(self, rows=(), paging=True):
+        self.rows = np.asarray(rows, dtype=float)
+        self.paging = paging
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def _request(self, method, path, **kwargs):
+        query = kwargs.get("json")
+        if path.endswith("/find-best-actions"):
+            with self._lock:
+                self.queries.append(query)
+            if "data_name" not in query:
+                w = np.asarray(query["data"]["w"], dtype=float)
+            elif self.paging:
+                w = self.rows[query["data_offset"]:query["data_offset"] + query["data_limit"]]
+            else:
+                w = self.rows
+            body = {"best_actions": {"x": (2 * w).tolist()}}
+        elif path.startswith("/data/"):
+            body = {"details": {"rows": len(self.rows)}}
+        else:
+            body = {"details": {"config": {"nodes": ["w", "x", "y"], "edges": [["w", "y"], ["x", "y"]]}}}
+
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(body).encode()
+        return response
+
+
+def test_iter_best_actions_chunks():
+    client = BestActionsClient()
+    model = Model("best-actions-model", client)
+    data = pd.DataFrame({"w": np.arange(25.0)}, index=np.arange(100, 125))
+
+    chunks = list(model.iter_best_actions({"y": 1.0}, ["x"], data=data, chunk_size=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    result = pd.concat(chunks)
+    assert list(result.index) == list(data.index)
+    assert np.array_equal(result["x"], 2 * data["w"])
+    assert all(query["targets"] == {"y": 1.0} and len(query["data"]["w"]) <= 10 for query in client.queries)
+
+
+def test_iter_best_actions_pages_uploaded_data():
+    client = BestActionsClient(rows=np.arange(23.0))
+    model = Model("best-actions-model", client)
+
+    result = pd.concat(model.iter_best_actions({"y": 1.0}, ["x"], data=Data("uploaded", client), chunk_size=5,
+                                               max_workers=2, ordered=False)).sort_index()
+    assert list(result.index) == list(range(23))
+    assert np.array_equal(result["x"], 2 * np.arange(23.0))
+    assert all("data" not in query and query["data_name"] == "uploaded" for query in client.queries)
+    # The pages are bounded by the number of rows, so none is requested past the end
+    assert sorted(query["data_offset"] for query in client.queries) == [0, 5, 10, 15, 20]
+
+
+def test_iter_best_actions_pages_with_equal_results():
+    # Every row has the same best action, so consecutive pages are equal
+    client = BestActionsClient(rows=np.ones(12))
+    model = Model("best-actions-model", client)
+
+    result = pd.concat(model.iter_best_actions({"y": 1.0}, ["x"], data=Data("uploaded", client), chunk_size=5))
+    assert list(result.index) == list(range(12))
+    assert (result["x"] == 2).all()
+
+
+def test_iter_best_actions_detects_servers_that_dont_page():
+    client = BestActionsClient(rows=np.arange(12.0), paging=False)
+    model = Model("best-actions-model", client)
+    with pytest.raises(Exception, match="paging"):
+        list(model.iter_best_actions({"y": 1.0}, ["x"], data=Data("uploaded", client), chunk_size=5))
+
+    # Data that fits in one page is answered in full either way
+    client = BestActionsClient(rows=np.arange(3.0), paging=False)
+    model = Model("best-actions-model", client)
+    result = pd.concat(model.iter_best_actions({"y": 1.0}, ["x"], data=Data("uploaded", client), chunk_size=10))
+    assert len(result) == 3
+    assert len(client.queries) == 1
+
+
+def test_best_actions_to_parquet(tmp_path):
+    model = Model("best-actions-model", BestActionsClient())
+    data = pd.DataFrame({"w": np.arange(25.0)})
+
+    path = tmp_path / "best-actions.parquet"
+    assert model.best_actions_to_parquet(path, {"y": 1.0}, ["x"], data=data, chunk_size=10) == 25
+    assert np.array_equal(pd.read_parquet(path)["x"], 2 * data["w"])
@@ -172,28 +172,15 @@ def test_model_structure_invalid(client):
     # Create a new model
     model = client.create_model("test-model-invalid-structure")
 
-    # Define nodes and edges
+    # Define nodes and edges, check that the cycle is rejected before reaching the server
     model.set_nodes(["x", "y", "z"])
-    model.set_edges([
-        ("x", "y"),
-        ("y", "z"),
-        ("z", "x"),  # This creates a cycle, which is not valid
-    ])
-
-    # Add data to the model
-    data = {
-        "x": [1, 2, 3, 4, 5],
-        "y": [2, 3, 4, 5, 6],
-        "z": [3, 4, 5, 6, 7],
-    }
-    df = pd.DataFrame(data)
-
-    client.add_data("test-data-invalid-structure").from_pandas(df)
-
-    # Try to train the model, check it raises an exception mentioning the cycle
 
     with pytest.raises(Exception) as excinfo:
-        model.train("test-data-invalid-structure", poll_limit=2)
+        model.set_edges([
+            ("x", "y"),
+            ("y", "z"),
+            ("z", "x"),  # This creates a cycle, which is not valid
+        ])
 
     assert "cycles" in str(excinfo.value)
 
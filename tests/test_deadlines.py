@@ -0,0 +1,112 @@
+import threading
+import time
+import pytest
+import requests
+from causadb.deadlines import deadline, current_deadline, DeadlineExceeded, RequestCancelled, DEADLINE_HEADER
+from causadb.ratelimit import RateController
+from causadb.transport import Transport
+
+
+class BlockingSession:
+    """Stands in for a requests.Session, holding every request until released."""
+
+    def __init__(self):
+        self.headers = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def request(self, method, url, headers=None, timeout=None, **kwargs):
+        self.headers.append(headers)
+        self.started.set()
+        self.release.wait(5)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b""
+        return response
+
+
+def make_transport(session, max_concurrency=64):
+    transport = Transport(rate_controller=RateController(max_concurrency=max_concurrency))
+    transport.sessions = {"interactive": session, "bulk": session}
+    return transport
+
+
+def test_deadline_context():
+    assert current_deadline() is None
+    with deadline(1.0) as scope:
+        assert current_deadline() is scope
+        assert 0 < scope.remaining() <= 1.0
+    assert current_deadline() is None
+
+
+def test_nested_deadline_uses_earliest():
+    with deadline(0.05) as outer:
+        with deadline(10.0) as inner:
+            assert inner.expires_at == outer.expires_at
+            with pytest.raises(DeadlineExceeded):
+                inner.sleep(1.0)
+
+
+def test_cancel_wakes_sleepers():
+    with deadline() as scope:
+        threading.Timer(0.05, scope.cancel).start()
+        start = time.monotonic()
+        with pytest.raises(RequestCancelled):
+            scope.sleep(5.0)
+        assert time.monotonic() - start < 1.0
+
+
+def test_cancel_propagates_to_nested():
+    with deadline() as outer:
+        with deadline(10.0) as inner:
+            outer.cancel()
+            assert inner.cancelled
+
+
+def test_deadline_header_is_sent():
+    session = BlockingSession()
+    session.release.set()
+    transport = make_transport(session)
+    with deadline(5.0):
+        transport.request("GET", "/models")
+    assert 0 < int(session.headers[0][DEADLINE_HEADER]) <= 5000
+
+
+def test_cancel_in_flight_request():
+    session = BlockingSession()
+    transport = make_transport(session)
+    with deadline() as scope:
+        threading.Timer(0.05, scope.cancel).start()
+        start = time.monotonic()
+        with pytest.raises(RequestCancelled):
+            transport.request("GET", "/models")
+        assert time.monotonic() - start < 1.0
+    assert session.started.is_set()
+    session.release.set()
+
+
+def test_queued_request_is_cancelled_and_times_out():
+    session = BlockingSession()
+    transport = make_transport(session, max_concurrency=1)
+    # Hold the only slot, so the next requests queue in the rate controller
+    holder = threading.Thread(target=transport.request, args=("GET", "/models"))
+    holder.start()
+    session.started.wait(1)
+
+    with deadline() as scope:
+        threading.Timer(0.05, scope.cancel).start()
+        start = time.monotonic()
+        with pytest.raises(RequestCancelled):
+            transport.request("GET", "/models")
+        assert time.monotonic() - start < 1.0
+
+    start = time.monotonic()
+    with deadline(0.1):
+        with pytest.raises(DeadlineExceeded):
+            transport.request("GET", "/models")
+    assert time.monotonic() - start < 1.0
+
+    # Neither queued request reached the server
+    assert len(session.headers) == 1
+    session.release.set()
+    holder.join()
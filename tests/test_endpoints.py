@@ -0,0 +1,112 @@
+import os
+import socket
+import pytest
+import requests
+from causadb import CausaDB
+from causadb.endpoints import EndpointSelector
+from causadb.transport import Transport
+
+
+class FixedLatencySelector(EndpointSelector):
+    def __init__(self, latencies, **kwargs):
+        super().__init__(list(latencies), **kwargs)
+        self.fixed_latencies = latencies
+        self.probes = 0
+
+    def _probe_endpoint(self, url):
+        self.probes += 1
+        return self.fixed_latencies[url]
+
+
+def test_selects_lowest_latency():
+    selector = FixedLatencySelector({"https://eu/v1": 0.05, "https://us/v1": 0.01, "https://ap/v1": float("inf")})
+    assert selector.current() == "https://us/v1"
+    assert selector.probes == 3
+    selector.current()
+    assert selector.probes == 3
+
+
+def test_fails_over():
+    selector = FixedLatencySelector({"https://eu/v1": 0.05, "https://us/v1": 0.01}, cooldown=60)
+    assert selector.current() == "https://us/v1"
+    selector.mark_failed("https://us/v1")
+    assert selector.current() == "https://eu/v1"
+
+    # With every endpoint failing, the one that failed first is retried
+    selector.mark_failed("https://eu/v1")
+    assert selector.current() == "https://us/v1"
+
+
+def test_single_endpoint_is_not_probed():
+    selector = FixedLatencySelector({"https://eu/v1/": 0.05})
+    assert selector.current() == "https://eu/v1"
+    assert selector.probes == 0
+
+
+def test_url_is_per_client(monkeypatch):
+    monkeypatch.delenv("CAUSADB_URL", raising=False)
+    a = CausaDB("token", custom_url="https://a.example.com/v1", token_cache=False)
+    b = CausaDB("token", custom_url="https://b.example.com/v1", token_cache=False)
+    assert a.url == "https://a.example.com/v1"
+    assert b.url == "https://b.example.com/v1"
+    assert "CAUSADB_URL" not in os.environ
+
+
+def closed_port_url():
+    # A local URL that refuses connections
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/v1"
+
+
+class RoutingSession:
+    """Stands in for a requests.Session, answering requests to `good_url` and failing the others."""
+
+    def __init__(self, good_url, failure=None):
+        self.good_url = good_url
+        self.failure = failure
+        self.urls = []
+        self.real = requests.Session()
+
+    def request(self, method, url, **kwargs):
+        self.urls.append(url)
+        if url.startswith(self.good_url):
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b""
+            return response
+        if self.failure is not None:
+            raise self.failure
+        return self.real.request(method, url, **kwargs)
+
+
+def make_transport(latencies, session):
+    selector = FixedLatencySelector(latencies, cooldown=60)
+    transport = Transport(endpoints=selector, timeout=2.0)
+    transport.sessions = {"interactive": session, "bulk": session}
+    return transport
+
+
+def test_refused_connection_fails_over():
+    refused = closed_port_url()
+    session = RoutingSession("https://backup/v1")
+    transport = make_transport({refused: 0.01, "https://backup/v1": 0.05}, session)
+
+    # Even a POST is resent, as the refused connection never reached the server
+    assert transport.request("POST", "/models", json={}).status_code == 200
+    assert session.urls == [f"{refused}/models", "https://backup/v1/models"]
+    assert transport.endpoints.current() == "https://backup/v1"
+
+
+def test_request_failing_after_connecting_is_only_resent_if_idempotent():
+    latencies = {"https://primary/v1": 0.01, "https://backup/v1": 0.05}
+    session = RoutingSession("https://backup/v1", failure=requests.ConnectionError("Connection aborted"))
+
+    with pytest.raises(requests.ConnectionError):
+        make_transport(latencies, session).request("POST", "/models/m/train", json={})
+    assert session.urls == ["https://primary/v1/models/m/train"]
+
+    session.urls.clear()
+    assert make_transport(latencies, session).request("GET", "/models").status_code == 200
+    assert session.urls == ["https://primary/v1/models", "https://backup/v1/models"]
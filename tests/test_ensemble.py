@@ -0,0 +1,62 @@
+import threading
+import pandas as pd
+import pytest
+from causadb import ModelEnsemble
+
+
+class SlopeModel:
+    """Stands in for a Model whose effects are `slope` per unit of x, and which waits for the others."""
+
+    def __init__(self, name, slope, barrier=None, nodes=("y", "z")):
+        self.model_name = name
+        self.slope = slope
+        self.barrier = barrier
+        self.nodes = list(nodes)
+
+    def wait(self):
+        if self.barrier is not None:
+            self.barrier.wait(timeout=5)
+        if self.slope is None:
+            raise Exception("Model not trained")
+
+    def causal_effects(self, actions, fixed=None, interval=0.9, observation_noise=False, outcomes=None):
+        self.wait()
+        low, high = actions["x"]
+        median = pd.Series({node: self.slope * (high - low) for node in self.nodes})
+        return pd.DataFrame({"median": median, "lower": median - 1, "upper": median + 1})
+
+    def simulate_actions(self, actions, fixed={}, interval=0.9, observation_noise=False, outcomes=None):
+        self.wait()
+        median = pd.DataFrame({node: [self.slope * x for x in actions["x"]] for node in self.nodes})
+        return {"median": median, "lower": median - 0.5, "upper": median + 0.5}
+
+
+def test_ensemble_queries_models_concurrently():
+    # The models only answer once all three are queried at the same time
+    barrier = threading.Barrier(3)
+    ensemble = ModelEnsemble([SlopeModel("a", 1.0, barrier), SlopeModel("b", 2.0, barrier),
+                              SlopeModel("c", 3.0, barrier, nodes=["y"])])
+
+    result = ensemble.causal_effects({"x": (0, 1)})
+    summary = result.summary()
+    assert list(summary.columns) == ["a", "b", "c", "mean", "std", "disagreement"]
+    assert summary.loc["y", "mean"] == pytest.approx(2.0)
+    assert summary.loc["z", "mean"] == pytest.approx(1.5)
+    assert pd.isna(summary.loc["z", "c"])
+    # Medians 1, 2 and 3 with intervals of width 2
+    assert summary.loc["y", "disagreement"] == pytest.approx(1.0)
+
+
+def test_ensemble_simulate_actions_and_errors():
+    ensemble = ModelEnsemble([SlopeModel("a", 1.0), SlopeModel("b", 3.0), SlopeModel("broken", None)])
+    result = ensemble.simulate_actions({"x": [0, 2]})
+    assert list(result.errors) == ["broken"]
+    assert list(result.medians.columns) == ["a", "b"]
+    assert result.mean[(1, "y")] == pytest.approx(4.0)
+    assert result.std[(0, "z")] == 0
+    assert result.disagreement[(1, "z")] == pytest.approx(4.0)
+
+    with pytest.raises(Exception):
+        ModelEnsemble([SlopeModel("a", 1.0), SlopeModel("a", 2.0)])
+    with pytest.raises(Exception):
+        ModelEnsemble([SlopeModel("broken", None)]).causal_effects({"x": (0, 1)})
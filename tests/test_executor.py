@@ -0,0 +1,55 @@
+import threading
+import time
+import pytest
+from causadb.executor import iter_concurrent
+
+
+def slow_square(x):
+    time.sleep(0.01 * (5 - x))
+    if x == 3:
+        raise Exception("query failed")
+    return x * x
+
+
+def test_iter_concurrent_ordered():
+    results = list(iter_concurrent(slow_square, range(5), max_workers=5))
+    assert [r.index for r in results] == [0, 1, 2, 3, 4]
+    assert [r.value for r in results if r.ok] == [0, 1, 4, 16]
+
+
+def test_iter_concurrent_captures_errors():
+    results = list(iter_concurrent(slow_square, range(5), max_workers=2))
+    failed = [r for r in results if not r.ok]
+    assert len(failed) == 1
+    assert failed[0].item == 3
+    assert "query failed" in str(failed[0].error)
+
+
+def test_iter_concurrent_as_completed():
+    release = threading.Event()
+
+    def query(x):
+        if x != 4:
+            release.wait(5)
+        return x
+
+    results = iter_concurrent(query, range(5), max_workers=5, ordered=False)
+    # Only the last item can complete until the others are released, so it is yielded first
+    first = next(results)
+    assert first.item == 4
+    release.set()
+    assert sorted(r.index for r in [first, *results]) == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 3])
+def test_iter_concurrent_bounded(max_in_flight):
+    submitted = []
+
+    def items():
+        for i in range(10):
+            submitted.append(i)
+            yield i
+
+    for result in iter_concurrent(lambda x: x, items(), max_workers=2, max_in_flight=max_in_flight):
+        # Only a bounded number of items are pulled ahead of the consumer
+        assert len(submitted) <= result.index + 1 + max_in_flight
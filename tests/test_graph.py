@@ -0,0 +1,140 @@
+import json
+import logging
+import pytest
+import requests
+from causadb import Model
+from causadb.graph import DagIndex
+
+
+def test_topological_order():
+    graph = DagIndex(["z", "y", "x"], [("x", "y"), ("y", "z"), ("x", "z")])
+    order = graph.topological_order()
+    assert order.index("x") < order.index("y") < order.index("z")
+    assert graph.is_acyclic
+    assert graph.find_cycle() is None
+
+
+def test_ancestors_and_descendants():
+    graph = DagIndex(["a", "b", "c", "d", "e"], [("a", "b"), ("b", "c"), ("d", "c")])
+    assert graph.ancestors("c") == {"a", "b", "d"}
+    assert graph.descendants("a") == {"b", "c"}
+    assert graph.descendants("e") == frozenset()
+    assert graph.parents("c") == ["b", "d"]
+    with pytest.raises(Exception):
+        graph.ancestors("missing")
+
+
+def test_nodes_from_edges():
+    graph = DagIndex([], [("x", "y")])
+    assert graph.nodes == ["x", "y"]
+    assert "y" in graph
+
+
+def test_find_cycle():
+    graph = DagIndex(["w", "x", "y", "z"], [("w", "x"), ("x", "y"), ("y", "z"), ("z", "x")])
+    assert not graph.is_acyclic
+    cycle = graph.find_cycle()
+    assert cycle[0] == cycle[-1]
+    assert set(cycle) == {"x", "y", "z"}
+    with pytest.raises(Exception, match="cycles"):
+        graph.topological_order()
+
+
+def test_large_chain():
+    nodes = [f"n{i}" for i in range(5000)]
+    graph = DagIndex(nodes, list(zip(nodes, nodes[1:])))
+    assert graph.topological_order() == nodes
+    assert len(graph.descendants("n0")) == 4999
+    assert len(graph.ancestors("n4999")) == 4999
+
+
+class StoredGraphClient:
+    """Stands in for a client of a server storing the given model config, which answers no queries."""
+
+    def __init__(self, config):
+        self.config = config
+        self.requests = []
+
+    def _request(self, method, path, **kwargs):
+        self.requests.append((method, path))
+        response = requests.Response()
+        response.status_code = 200
+        if path.count("/") > 2:
+            response.status_code = 404
+            body = {"detail": "Not found"}
+        else:
+            if method == "POST":
+                self.config = kwargs["json"]
+            body = {"details": {"config": self.config}}
+        response._content = json.dumps(body).encode()
+        return response
+
+
+def test_model_with_stored_cycle_can_be_loaded_and_fixed(caplog):
+    client = StoredGraphClient({"nodes": ["x", "y"], "edges": [["x", "y"], ["y", "x"]]})
+    with caplog.at_level(logging.WARNING, logger="causadb"):
+        model = Model("cyclic-model", client)
+    assert "cycles" in caplog.text
+
+    model.set_edges([("x", "y")])
+    assert model.graph.is_acyclic
+    assert client.config["edges"] == [("x", "y")]
+
+
+def test_model_rejects_cycles_locally():
+    client = StoredGraphClient({"nodes": ["x", "y"], "edges": [["x", "y"]]})
+    model = Model("graph-model", client)
+    assert model.graph.descendants("x") == {"y"}
+
+    sent = len(client.requests)
+    with pytest.raises(Exception, match="cycles"):
+        model.set_edges([("x", "y"), ("y", "x")])
+    assert len(client.requests) == sent
+    assert client.config["edges"] == [["x", "y"]]
+
+
+@pytest.fixture
+def model():
+    # x -> y -> z, w -> z, and v on its own
+    client = StoredGraphClient({"nodes": ["v", "w", "x", "y", "z"], "edges": [["x", "y"], ["y", "z"], ["w", "z"]]})
+    return Model("graph-model", client)
+
+
+def test_prune_query(model):
+    actions, fixed, unaffected = model._prune_query(
+        {"x": [0, 1], "v": [0, 1]}, {"w": 1.0, "v": 2.0, "z": 0.0}, ["y", "v"])
+    assert actions == {"x": [0, 1], "v": [0, 1]}
+    assert fixed == {"v": 2.0}
+    assert unaffected == []
+
+    actions, fixed, unaffected = model._prune_query({"x": [0, 1], "v": [0, 1]}, {"w": 1.0}, ["y", "w"])
+    assert actions == {"x": [0, 1]}
+    assert fixed == {"w": 1.0}
+    assert unaffected == ["w"]
+
+
+def test_prune_query_unknown_nodes_unchanged(model):
+    assert model._prune_query({"q": [0, 1]}, {"v": 1.0}, ["y"]) == ({"q": [0, 1]}, {"v": 1.0}, [])
+
+
+def test_causal_effects_answered_locally(model):
+    effects = model.causal_effects({"y": [0, 1]}, outcomes=["x", "w"])
+    assert list(effects.index) == ["x", "w"]
+    assert (effects == 0).all().all()
+
+    samples = model.causal_effects({"y": [0, 1]}, outcomes=["x"], samples=True)
+    assert (samples.summary()["median"] == 0).all()
+    assert not any(path.endswith("/causal-effects") for _, path in model.client.requests)
+
+
+def test_explicit_none_arguments_are_valid():
+    client = StoredGraphClient({"nodes": ["x", "y"], "edges": [["x", "y"]]})
+    model = Model("graph-model", client)
+
+    # Reaches the server rather than failing validation
+    with pytest.raises(Exception, match="Not found"):
+        model.causal_effects({"x": [0, 1]}, fixed=None, outcomes=None)
+    with pytest.raises(Exception, match="Not found"):
+        model.simulate_actions({"x": [0, 1]}, outcomes=None)
+    assert client.requests[-2:] == [("POST", "/models/graph-model/causal-effects"),
+                                    ("POST", "/models/graph-model/simulate-actions")]
@@ -0,0 +1,148 @@
+import threading
+import time
+import pytest
+import requests
+from causadb import HedgePolicy
+from causadb.transport import Transport
+
+
+class TrackedResponse(requests.Response):
+    def __init__(self, name):
+        super().__init__()
+        self.status_code = 200
+        self._content = name.encode()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ScriptedSession:
+    """Stands in for a requests.Session, answering the n-th request with the n-th behaviour."""
+
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers=None, timeout=None, **kwargs):
+        with self._lock:
+            behaviour = self.behaviours[self.calls]
+            self.calls += 1
+        return behaviour()
+
+
+def slow(release, result):
+    def behaviour():
+        release.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return behaviour
+
+
+def fast(result):
+    released = threading.Event()
+    released.set()
+    return slow(released, result)
+
+
+def make_transport(session, policy):
+    transport = Transport(hedge_policy=policy)
+    transport.sessions = {"interactive": session, "bulk": session}
+    return transport
+
+
+def funded_policy(**kwargs):
+    policy = HedgePolicy(delay=0.05, budget=1.0, **kwargs)
+    policy.record("GET /warm-up", 0.01)
+    return policy
+
+
+def test_hedge_delay_from_percentile():
+    policy = HedgePolicy(percentile=0.9, min_samples=10)
+    assert policy.hedge_delay("GET /models/m") is None
+
+    for latency in range(1, 11):
+        policy.record("GET /models/m", latency / 10)
+    assert policy.hedge_delay("GET /models/m") == 1.0
+    # Latencies are tracked per endpoint
+    assert policy.hedge_delay("GET /models/other") is None
+
+
+def test_fixed_hedge_delay():
+    assert HedgePolicy(delay=0.2).hedge_delay("GET /models/m") == 0.2
+
+
+def test_hedge_budget():
+    policy = HedgePolicy(delay=0.1, budget=0.25)
+    assert not policy.try_hedge()
+
+    for _ in range(4):
+        policy.record("GET /models/m", 0.01)
+    assert policy.try_hedge()
+    assert not policy.try_hedge()
+    assert policy.hedges_sent == 1
+
+
+def test_slow_request_is_hedged_and_loser_closed():
+    release = threading.Event()
+    original, duplicate = TrackedResponse("original"), TrackedResponse("duplicate")
+    session = ScriptedSession(slow(release, original), fast(duplicate))
+    policy = funded_policy()
+
+    response = make_transport(session, policy).request("GET", "/models")
+    assert response is duplicate
+    assert session.calls == 2
+    assert policy.hedges_sent == 1
+
+    # The original response is closed once it arrives, returning its connection to the pool
+    assert not original.closed
+    release.set()
+    deadline = time.monotonic() + 1.0
+    while not original.closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert original.closed
+    assert not duplicate.closed
+
+
+def test_hedge_failure_falls_back_to_original_error():
+    release = threading.Event()
+    session = ScriptedSession(slow(release, requests.ConnectionError("original")),
+                              fast(requests.ConnectionError("duplicate")))
+    transport = make_transport(session, funded_policy())
+
+    threading.Timer(0.2, release.set).start()
+    with pytest.raises(requests.ConnectionError, match="original"):
+        transport.request("GET", "/models")
+    assert session.calls == 2
+
+
+def test_hedge_takes_first_success_when_duplicate_fails():
+    release = threading.Event()
+    original = TrackedResponse("original")
+    session = ScriptedSession(slow(release, original), fast(requests.ConnectionError("duplicate")))
+
+    threading.Timer(0.2, release.set).start()
+    assert make_transport(session, funded_policy()).request("GET", "/models") is original
+    assert session.calls == 2
+
+
+def test_hedging_respects_budget_and_idempotency():
+    release = threading.Event()
+    threading.Timer(0.2, release.set).start()
+    # No budget has accrued, so the slow request isn't duplicated
+    policy = HedgePolicy(delay=0.05, budget=0.01)
+    session = ScriptedSession(slow(release, TrackedResponse("original")))
+    make_transport(session, policy).request("GET", "/models")
+    assert session.calls == 1
+    assert policy.hedges_sent == 0
+
+    # POST requests are never hedged, however much budget there is
+    release = threading.Event()
+    threading.Timer(0.2, release.set).start()
+    policy = funded_policy()
+    session = ScriptedSession(slow(release, TrackedResponse("original")))
+    make_transport(session, policy).request("POST", "/models", json={})
+    assert session.calls == 1
+    assert policy.hedges_sent == 0
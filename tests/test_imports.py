@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+HEAVY_MODULES = ["pandas", "numpy", "pydantic", "requests", "matplotlib", "seaborn", "rich"]
+
+
+def imported_modules(snippet):
+    script = f"import sys; {snippet}; print(' '.join(sys.modules))"
+    output = subprocess.run([sys.executable, "-c", script], check=True,
+                            capture_output=True, text=True).stdout
+    return set(output.split())
+
+
+def test_import_is_lazy():
+    modules = imported_modules("import causadb")
+    assert not modules & set(HEAVY_MODULES)
+
+
+def test_cli_version_is_lazy():
+    modules = imported_modules(
+        "from causadb.cli.main import app; app(['--version'], standalone_mode=False)")
+    assert not modules & set(HEAVY_MODULES)
+
+
+def test_lazy_attributes():
+    import causadb
+    from causadb.causadb import CausaDB
+    assert causadb.CausaDB is CausaDB
+    assert "SimulationResult" in dir(causadb)
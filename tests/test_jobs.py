@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from causadb import BulkJob
+
+
+def flaky_query(calls, fail_chunks):
+    def query(chunk):
+        first = int(chunk["w"].iloc[0]) // 10
+        calls.append(first)
+        if first in fail_chunks:
+            raise Exception("Connection reset")
+        return pd.DataFrame({"x": 2 * chunk["w"]}, index=chunk.index)
+    return query
+
+
+def test_job_resumes_failed_chunks(tmp_path):
+    data = pd.DataFrame({"w": np.arange(45.0)}, index=[f"row-{i}" for i in range(45)])
+    calls = []
+
+    job = BulkJob(tmp_path, flaky_query(calls, {2}), data, chunk_size=10, max_attempts=2, retry_delay=0)
+    with pytest.raises(Exception):
+        job.run()
+    assert sorted(calls) == [0, 1, 2, 2, 3, 4]
+    assert job.failed.keys() == {"2"}
+    assert not job.done
+
+    # A new process resumes from the manifest and only queries the failed chunk
+    calls.clear()
+    job = BulkJob(tmp_path, flaky_query(calls, set()), data, chunk_size=10)
+    job.run()
+    assert calls == [2]
+    assert job.done
+
+    result = job.result()
+    assert list(result.index) == list(data.index)
+    assert np.array_equal(result["x"], 2 * data["w"])
+
+
+def test_job_rejects_different_data(tmp_path):
+    data = pd.DataFrame({"w": np.arange(20.0)})
+    BulkJob(tmp_path, flaky_query([], set()), data, chunk_size=10).run()
+
+    with pytest.raises(Exception):
+        BulkJob(tmp_path, flaky_query([], set()), data + 1, chunk_size=10)
+    with pytest.raises(Exception):
+        BulkJob(tmp_path, flaky_query([], set()), data, chunk_size=5)
+
+
+class EffectsModel:
+    """Stands in for a Model, recording the arguments of each causal_effects_by_row call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def causal_effects_by_row(self, actions, contexts, **kwargs):
+        self.calls.append(kwargs)
+        return pd.DataFrame({("y", "median"): contexts["w"]}, index=contexts.index)
+
+
+def test_causal_effects_job_bounds_requests_per_chunk(tmp_path):
+    model = EffectsModel()
+    data = pd.DataFrame({"w": np.arange(20.0)})
+
+    job = BulkJob.for_causal_effects(tmp_path, model, {"x": (0, 1)}, data, chunk_size=10, request_size=5)
+    job.run()
+    assert [call["max_workers"] for call in model.calls] == [1, 1]
+    assert [call["chunk_size"] for call in model.calls] == [5, 5]
+    assert len(job.result()) == 20
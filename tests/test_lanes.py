@@ -0,0 +1,70 @@
+import threading
+import time
+import pytest
+from causadb.lanes import lane, current_lane
+from causadb.ratelimit import RateController
+
+
+class Response:
+    status_code = 200
+    headers = {}
+
+
+def test_lane_context():
+    assert current_lane() is None
+    with lane("bulk"):
+        assert current_lane() == "bulk"
+        with lane("interactive"):
+            assert current_lane() == "interactive"
+        assert current_lane() == "bulk"
+    assert current_lane() is None
+
+    with pytest.raises(Exception):
+        with lane("urgent"):
+            pass
+
+
+def test_lanes_have_separate_limits():
+    controller = RateController(max_concurrency=2, bulk_concurrency=1)
+    release_bulk = threading.Event()
+    threading.Thread(target=controller.send, args=(
+        lambda: release_bulk.wait() and Response(),), kwargs={"lane": "bulk"}).start()
+    time.sleep(0.05)
+
+    # The bulk lane is full, but interactive requests are unaffected
+    start = time.monotonic()
+    controller.send(lambda: Response())
+    assert time.monotonic() - start < 0.5
+    assert controller.lanes["bulk"].in_flight == 1
+    release_bulk.set()
+
+
+def test_bulk_yields_to_waiting_interactive():
+    controller = RateController(max_concurrency=1, bulk_concurrency=4)
+    order = []
+    release = threading.Event()
+
+    def record(name, wait=False):
+        def send():
+            if wait:
+                release.wait()
+            order.append(name)
+            return Response()
+        return send
+
+    first = threading.Thread(target=controller.send, args=(record("interactive-1", wait=True),))
+    first.start()
+    time.sleep(0.05)
+    # A second interactive request is now waiting for the interactive slot
+    second = threading.Thread(target=controller.send, args=(record("interactive-2"),))
+    second.start()
+    time.sleep(0.05)
+    bulk = threading.Thread(target=controller.send, args=(record("bulk"),), kwargs={"lane": "bulk"})
+    bulk.start()
+    time.sleep(0.05)
+    assert order == []
+
+    release.set()
+    for thread in (first, second, bulk):
+        thread.join()
+    assert order == ["interactive-1", "interactive-2", "bulk"]
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from causadb import LocalModel
+
+
+def chain_model(n_draws=200):
+    # x -> y -> z, with y = 1 + 2x and z = y - 3, and some posterior spread on the x -> y coefficient
+    rng = np.random.default_rng(0)
+    intercepts = np.tile([0.0, 1.0, -3.0], (n_draws, 1))
+    coefficients = np.column_stack([2.0 + 0.1 * rng.standard_normal(n_draws), np.ones(n_draws)])
+    return LocalModel(["x", "y", "z"], [("x", "y"), ("y", "z")], intercepts, coefficients, np.ones((n_draws, 3)))
+
+
+def test_simulate_actions():
+    result = chain_model().simulate_actions({"x": [0, 1, 2]})
+    assert list(result["median"].columns) == ["x", "y", "z"]
+    assert np.allclose(result["median"]["z"], [-2, 0, 2], atol=0.05)
+    assert (result["lower"]["y"] <= result["upper"]["y"]).all()
+
+    result = chain_model().simulate_actions({"x": [0, 1]}, fixed={"y": 5})
+    assert np.allclose(result["median"]["z"], [2, 2])
+
+
+def test_causal_effects():
+    effects = chain_model().causal_effects({"x": (0, 1)})
+    assert effects.loc["z", "median"] == pytest.approx(2, abs=0.05)
+    assert effects.loc["x", "median"] == 1
+
+    samples = chain_model().causal_effects({"x": (0, 1)}, observation_noise=True, samples=True, seed=1)
+    # Both arms share the same noise, so it cancels out of the effects
+    assert samples.std()["z"].iloc[0] == pytest.approx(0.1, abs=0.03)
+
+
+def test_save_and_load(tmp_path):
+    model = chain_model()
+    model.save(tmp_path / "model.npz")
+    loaded = LocalModel.load(tmp_path / "model.npz")
+    assert loaded.edges == model.edges
+    assert np.array_equal(loaded.coefficients, model.coefficients)
+
+
+def test_invalid_models():
+    with pytest.raises(Exception):
+        LocalModel(["x"], [("x", "y")], np.zeros((1, 1)), np.zeros((1, 1)), np.zeros((1, 1)))
+    with pytest.raises(Exception):
+        LocalModel(["x", "y"], [("x", "y")], np.zeros((1, 2)), np.zeros((1, 2)), np.zeros((1, 2)))
+    with pytest.raises(Exception):
+        chain_model().simulate_actions({"missing": [0]})
+
+
+def test_fit():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(2000)
+    y = 1 + 2 * x + 0.5 * rng.standard_normal(2000)
+    z = y - 3 * x + rng.standard_normal(2000)
+    data = pd.DataFrame({"x": x, "y": y, "z": z})
+
+    local = LocalModel.fit(["x", "y", "z"], [("x", "y"), ("y", "z"), ("x", "z")], data, seed=0)
+    effects = local.causal_effects({"x": (0, 1)})
+    assert effects.loc["y", "median"] == pytest.approx(2, abs=0.05)
+    assert effects.loc["z", "median"] == pytest.approx(-1, abs=0.1)
+    assert local.noise_scale[:, 1].mean() == pytest.approx(0.5, abs=0.05)
+
+    with pytest.raises(Exception):
+        LocalModel.fit(["x", "w"], [("x", "w")], data)
+
+
+def test_causal_attributions():
+    attributions = chain_model().causal_attributions("z", normalise=True)
+    assert list(attributions.columns) == ["z"]
+    assert list(attributions.index) == ["x", "y", "z"]
+    # Var(z) = 4 Var(x) + Var(y noise) + Var(z noise)
+    assert attributions["z"].sum() == pytest.approx(1)
+    assert attributions.loc["x", "z"] == pytest.approx(4 / 6, abs=0.02)
+    assert list(chain_model().causal_attributions("x").index) == ["x"]
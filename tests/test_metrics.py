@@ -0,0 +1,62 @@
+import logging
+from causadb.metrics import ClientStats
+from causadb.tracing import Span
+
+
+def make_span(path, duration, method="POST", status_code=200, request_bytes=100, response_bytes=1000):
+    span = Span(method, path)
+    span.end_time = span.start_time + int(duration * 1e9)
+    span.status_code = status_code
+    span.request_bytes = request_bytes
+    span.response_bytes = response_bytes
+    return span
+
+
+def test_stats_per_endpoint():
+    stats = ClientStats()
+    for i in range(100):
+        stats.record(make_span("/models/a/causal-effects", (i + 1) / 1000))
+    stats.record(make_span("/models/b/causal-effects", 0.5, status_code=500))
+    stats.record(make_span("/models/a", 0.01, method="GET"))
+
+    summary = stats.summary()
+    row = summary.loc[("POST", "/models/{model}/causal-effects")]
+    assert row["calls"] == 101
+    assert row["errors"] == 1
+    assert row["bytes_sent"] == 10100
+    assert abs(row["p50"] - 0.051) < 1e-6
+    assert abs(row["p99"] - 0.1) < 1e-6
+    assert summary.index[0] == ("POST", "/models/{model}/causal-effects")
+
+
+def test_cache_hit_rates():
+    stats = ClientStats()
+    for hit in [True, True, True, False]:
+        stats.record_cache("token", hit)
+    assert stats.cache_hit_rates() == {"token": 0.75}
+
+
+def test_prometheus_export():
+    stats = ClientStats()
+    stats.record(make_span("/models/a/simulate-actions", 0.02))
+    stats.record(make_span("/models/a/simulate-actions", 3.0))
+    stats.record_cache("graph", False)
+
+    text = stats.to_prometheus()
+    labels = 'method="POST",endpoint="/models/{model}/simulate-actions"'
+    assert f"causadb_requests_total{{{labels}}} 2" in text
+    assert f'causadb_request_duration_seconds_bucket{{{labels},le="0.025"}} 1' in text
+    assert f'causadb_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert 'causadb_cache_lookups_total{cache="graph",result="miss"} 1' in text
+
+
+def test_slow_call_log(caplog):
+    stats = ClientStats(slow_threshold=1.0)
+    stats.record(make_span("/models/fast/causal-effects", 0.1))
+    with caplog.at_level(logging.WARNING, logger="causadb"):
+        stats.record(make_span("/models/slow/causal-effects", 2.0, request_bytes=5000))
+
+    assert len(stats.slow_calls) == 1
+    assert stats.slow_calls[0]["model_name"] == "slow"
+    assert stats.slow_calls[0]["request_bytes"] == 5000
+    assert "slow" in caplog.text and "5000 bytes" in caplog.text
@@ -0,0 +1,66 @@
+import json
+import threading
+import numpy as np
+import pytest
+import requests
+from causadb import ActionOptimizer, Model
+
+
+class BowlClient:
+    """Stands in for a client of a server simulating y = (x1 - 3)^2 + (x2 + 1)^2 and z = x1 + x2.
+
+    The number of candidates in each simulate-actions request is recorded in `calls`.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _request(self, method, path, **kwargs):
+        if path.endswith("/simulate-actions"):
+            actions = kwargs["json"]["actions"]
+            x1, x2 = np.array(actions["x1"]), np.array(actions["x2"])
+            with self._lock:
+                self.calls.append(len(x1))
+            median = {"y": ((x1 - 3) ** 2 + (x2 + 1) ** 2).tolist(), "z": (x1 + x2).tolist()}
+            body = {"outcome": {"median": median, "lower": median, "upper": median}}
+        else:
+            body = {"details": {"config": {
+                "nodes": ["x1", "x2", "y", "z"],
+                "edges": [["x1", "y"], ["x2", "y"], ["x1", "z"], ["x2", "z"]],
+            }}}
+
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(body).encode()
+        return response
+
+
+@pytest.fixture
+def model():
+    return Model("bowl-model", BowlClient())
+
+
+def test_optimizer_finds_target_within_budget(model):
+    result = model.optimize_actions({"y": 0.0}, ["x1", "x2"], {"x1": (-5, 5), "x2": (-5, 5)},
+                                    max_calls=60, population=12, seed=0)
+    assert result.actions["x1"] == pytest.approx(3, abs=0.05)
+    assert result.actions["x2"] == pytest.approx(-1, abs=0.05)
+    assert result.calls == len(model.client.calls) <= 60
+    assert all(size <= 12 for size in model.client.calls)
+    assert result.history == sorted(result.history, reverse=True)
+
+
+def test_optimizer_constraints_and_batches(model):
+    optimizer = ActionOptimizer(model, {"y": 0.0}, ["x1", "x2"], {"x1": (-5, 5), "x2": (-5, 5), "z": (3, 10)},
+                                max_calls=200, population=8, batch_size=4, seed=1)
+    result = optimizer.run()
+    # The unconstrained optimum has z = 2, so the best feasible point lies on z = 3
+    assert result.outcomes["z"] >= 3 - 1e-3
+    assert result.actions["x1"] + result.actions["x2"] == pytest.approx(3, abs=0.05)
+    assert max(model.client.calls) <= 4
+
+    with pytest.raises(Exception):
+        ActionOptimizer(model, {"y": 0.0}, ["x1", "x2"], {"x1": (-5, 5)})
+    with pytest.raises(Exception):
+        ActionOptimizer(model, {"y": 0.0}, ["x1", "x2"], {"x1": (-5, 5), "x2": (-5, 5)}, max_calls=0).run()
@@ -0,0 +1,67 @@
+import json
+import pickle
+import requests
+from causadb import CausaDB, HedgePolicy, Model
+
+
+def make_client(**kwargs):
+    return CausaDB("token", custom_url="https://a.example.com/v1", token_cache=False, **kwargs)
+
+
+def test_client_roundtrip():
+    client = make_client(hedging=HedgePolicy(delay=0.5), max_concurrency=8)
+    client.after_request(lambda span: None)
+
+    copy = pickle.loads(pickle.dumps(client))
+    assert copy.token == "token"
+    assert copy.url == "https://a.example.com/v1"
+    assert copy._transport.hedge_policy.delay == 0.5
+    assert copy._transport.rate_controller.concurrency.max_limit == 8
+    # Hooks aren't pickled, only the client's own statistics hook is installed
+    assert copy._transport.after_request_hooks == [copy._stats.record]
+
+
+def test_unpickled_clients_share_transport():
+    data = pickle.dumps(make_client())
+    a, b = pickle.loads(data), pickle.loads(data)
+    assert a._transport is b._transport
+    assert pickle.loads(pickle.dumps(make_client(max_retries=1)))._transport is not a._transport
+
+
+def test_config_token_not_pickled(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / ".causadb").mkdir()
+    (tmp_path / ".causadb" / "config.toml").write_text('[default]\ntoken_secret = "secret-from-config"\n')
+
+    client = CausaDB(token_cache=False)
+    data = pickle.dumps(client)
+    assert b"secret-from-config" not in data
+    assert pickle.loads(data).token == "secret-from-config"
+
+
+class ConfigSession:
+    """Stands in for a requests.Session of a server storing one model config."""
+
+    def __init__(self, config):
+        self.config = config
+
+    def request(self, method, url, data=None, **kwargs):
+        if method == "POST":
+            self.config = json.loads(data)
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["content-type"] = "application/json"
+        response._content = json.dumps({"details": {"config": self.config}}).encode()
+        return response
+
+
+def test_model_roundtrip():
+    client = make_client()
+    session = ConfigSession({"nodes": ["x", "y"], "edges": [["x", "y"]]})
+    client._transport.sessions = {"interactive": session, "bulk": session}
+    model = Model("my-model", client)
+
+    copy = pickle.loads(pickle.dumps(model))
+    assert copy.model_name == "my-model"
+    assert copy.config == model.config
+    assert copy.client.token == "token"
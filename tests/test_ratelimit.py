@@ -0,0 +1,79 @@
+import time
+import pytest
+import requests
+from causadb.ratelimit import TokenBucket, AdaptiveConcurrency, RateController
+
+
+def make_response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # The first token is available immediately, the next five take 1/50s each
+    assert time.monotonic() - start >= 0.09
+
+
+def test_adaptive_concurrency_aimd():
+    concurrency = AdaptiveConcurrency(max_limit=16)
+    concurrency.acquire()
+    concurrency.release(throttled=True)
+    assert concurrency.limit == 8
+
+    concurrency.acquire()
+    concurrency.release(throttled=False)
+    assert concurrency.limit == pytest.approx(8.125)
+
+    concurrency.acquire()
+    concurrency.release(throttled=None)
+    assert concurrency.limit == pytest.approx(8.125)
+    assert concurrency.in_flight == 0
+
+
+def test_rate_controller_retries_throttled():
+    responses = [
+        make_response(429, {"Retry-After": "0.01"}),
+        make_response(503),
+        make_response(200),
+    ]
+    controller = RateController(backoff_base=0.01)
+    response = controller.send(lambda: responses.pop(0))
+    assert response.status_code == 200
+    assert responses == []
+
+
+def test_rate_controller_gives_up():
+    controller = RateController(max_retries=2, backoff_base=0.001)
+    calls = []
+
+    def send():
+        calls.append(1)
+        return make_response(429)
+
+    assert controller.send(send).status_code == 429
+    assert len(calls) == 3
+
+
+def test_retry_after_http_date():
+    controller = RateController()
+    response = make_response(
+        429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    # Dates in the past mean the request can be retried straight away
+    assert controller.retry_delay(response, 0) == 0.0
+
+
+def test_rate_controller_only_retries_503_if_idempotent():
+    controller = RateController(backoff_base=0.001)
+    responses = [make_response(503), make_response(200)]
+    assert controller.send(lambda: responses.pop(0), idempotent=False).status_code == 503
+    assert len(responses) == 1
+
+    # A 429 means the request wasn't processed, so even a non-idempotent request is retried
+    responses = [make_response(429), make_response(200)]
+    assert controller.send(lambda: responses.pop(0), idempotent=False).status_code == 200
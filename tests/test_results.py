@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from causadb import SimulationResult, PosteriorSamples
+from causadb.encoding import encode_array, decode_array
+
+
+def test_encoding_roundtrip():
+    array = np.arange(24, dtype=np.float32).reshape(2, 3, 4)
+    payload = encode_array(array, columns=["a", "b", "c", "d"])
+    header, decoded = decode_array(payload)
+    assert header["columns"] == ["a", "b", "c", "d"]
+    assert decoded.dtype == np.float32
+    assert np.array_equal(decoded, array)
+
+
+def test_simulation_result_from_bytes():
+    values = np.random.rand(3, 2, 2).astype(np.float32)
+    payload = encode_array(
+        values, bands=["median", "lower", "upper"], index=[0, 1], columns=["y", "z"])
+    result = SimulationResult.from_bytes(payload)
+
+    assert set(result.keys()) == {"median", "lower", "upper"}
+    assert list(result["median"].columns) == ["y", "z"]
+    assert np.allclose(result.upper.to_numpy(), values[2])
+    # The band DataFrames are views of the single backing array
+    assert np.shares_memory(result.median.to_numpy(), result.values)
+
+
+def test_simulation_result_band_order():
+    values = np.stack([np.full((1, 1), v) for v in (1.0, 2.0, 3.0)])
+    payload = encode_array(
+        values, bands=["lower", "median", "upper"], index=[0], columns=["y"])
+    result = SimulationResult.from_bytes(payload)
+    assert result.lower.iloc[0, 0] == 1.0
+    assert result.median.iloc[0, 0] == 2.0
+
+
+def test_simulation_result_from_outcome():
+    outcome = {
+        "median": {"y": {"0": 1.0, "1": 2.0}},
+        "lower": {"y": {"0": 0.5, "1": 1.5}},
+        "upper": {"y": {"0": 1.5, "1": 2.5}},
+    }
+    result = SimulationResult.from_outcome(outcome)
+    expected = pd.DataFrame.from_dict(outcome["lower"])
+    assert result.lower.equals(expected)
+
+
+def test_posterior_samples_interval():
+    draws = np.random.default_rng(0).normal(size=(4000, 1, 2))
+    samples = PosteriorSamples(draws, [0], ["y", "z"])
+
+    summary = samples.summary(interval=0.9)
+    assert list(summary.columns) == ["median", "lower", "upper"]
+    assert list(summary.index) == ["y", "z"]
+    assert np.allclose(summary["lower"], -1.645, atol=0.1)
+    assert np.allclose(summary["upper"], 1.645, atol=0.1)
+
+    # Wider intervals are computed from the same draws without another query
+    wide = samples.interval(0.99)
+    assert (wide.upper.to_numpy() > summary["upper"].to_numpy()).all()
+
+
+def test_posterior_samples_statistics():
+    draws = np.stack([np.zeros((2, 1)), np.ones((2, 1))])
+    samples = PosteriorSamples.from_bytes(
+        encode_array(draws, index=["a", "b"], columns=["y"]))
+    assert samples.n_draws == 2
+    assert np.allclose(samples.mean().to_numpy(), 0.5)
+    assert np.allclose(samples.tail_probability(0.5).to_numpy(), 0.5)
+    assert np.allclose(samples.tail_probability(2.0).to_numpy(), 0.0)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from causadb import LocalModel, ResponseSurface
+
+
+class QuadraticModel:
+    """Stands in for a Model, with y = a * x^2 answered by a LocalModel of the squared node."""
+
+    model_name = "quadratic"
+
+    def __init__(self, a=1.0):
+        self.calls = 0
+        self.status_value = "trained"
+        self.retrain(a)
+
+    def retrain(self, a):
+        self.a = a
+        self.local = LocalModel(["x2", "y"], [("x2", "y")], np.zeros((100, 2)),
+                                np.linspace(a - 0.1, a + 0.1, 100)[:, None], np.ones((100, 2)))
+
+    def version(self):
+        return f"v{self.a}"
+
+    def status(self):
+        return self.status_value
+
+    def simulate_actions(self, actions, fixed={}, samples=False, outcomes=None):
+        self.calls += 1
+        return self.local.simulate_actions({"x2": np.square(actions["x"])}, samples=samples, outcomes=outcomes)
+
+
+def test_interpolation_and_error_bounds():
+    model = QuadraticModel()
+    surface = ResponseSurface(model, "x", "y", low=0, high=4, points=9, baseline=0)
+    assert model.calls == 1
+
+    effects = surface.causal_effects([1.0, 1.25, 3.9])
+    assert model.calls == 1
+    assert list(effects.columns) == ["median", "lower", "upper", "error"]
+    assert effects.loc[1.0, "median"] == pytest.approx(1.0, rel=1e-3)
+    assert effects.loc[1.0, "error"] == 0
+    # Linear interpolation of a * x^2 on a grid of spacing 0.5 is off by a * 0.5^2 / 4, and the upper band has a > 1
+    assert 0.0625 <= effects.loc[1.25, "error"] <= 0.07
+    assert abs(effects.loc[1.25, "median"] - 1.25 ** 2) <= effects.loc[1.25, "error"]
+
+    with pytest.raises(Exception):
+        surface.causal_effects([5.0])
+
+
+def test_saved_table_is_reused_and_rebuilt_after_retraining(tmp_path):
+    model = QuadraticModel()
+    path = str(tmp_path / "surface.npy")
+    ResponseSurface(model, "x", "y", low=0, high=4, path=path)
+    surface = ResponseSurface(model, "x", "y", low=0, high=4, path=path, check_interval=0)
+    assert model.calls == 1
+    assert isinstance(surface._table, np.memmap)
+
+    model.retrain(2.0)
+    model.status_value = "training"
+    assert not surface.refresh()
+    assert surface.causal_effects(2.0).loc[2.0, "median"] == pytest.approx(4.0, rel=1e-3)
+
+    model.status_value = "trained"
+    assert surface.causal_effects(2.0).loc[2.0, "median"] == pytest.approx(8.0, rel=1e-3)
+    assert model.calls == 2
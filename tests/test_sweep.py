@@ -0,0 +1,70 @@
+import json
+import numpy as np
+import pytest
+import requests
+from causadb import Model
+
+
+class CurveClient:
+    """Stands in for a client of a server simulating outcomes of x given by `curves`, with bands of +-1.
+
+    The number of values in each simulate-actions request is recorded in `calls`.
+    """
+
+    def __init__(self, curves):
+        self.curves = curves
+        self.calls = []
+
+    def _request(self, method, path, **kwargs):
+        if path.endswith("/simulate-actions"):
+            x = np.array(kwargs["json"]["actions"]["x"])
+            self.calls.append(len(x))
+            median = {outcome: curve(x) for outcome, curve in self.curves.items()}
+            body = {"outcome": {band: {outcome: (values + offset).tolist() for outcome, values in median.items()}
+                                for band, offset in [("median", 0), ("lower", -1), ("upper", 1)]}}
+        else:
+            body = {"details": {"config": {
+                "nodes": ["x", *self.curves],
+                "edges": [["x", outcome] for outcome in self.curves],
+            }}}
+
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(body).encode()
+        return response
+
+
+@pytest.fixture
+def model():
+    # y = |x - 3| and z = 2x
+    return Model("sweep-model", CurveClient({"y": lambda x: np.abs(x - 3), "z": lambda x: 2 * x}))
+
+
+def test_sweep_refines_only_near_bends(model):
+    curve = model.sweep("x", (0, 10), ["y", "z"], initial_points=11, max_points=200, tolerance=0.001)
+
+    assert list(curve.columns) == ["x", "outcome", "median", "lower", "upper"]
+    points = curve.loc[curve["outcome"] == "y", "x"].to_numpy()
+    assert np.all(np.diff(points) > 0)
+    # Refinement stays around the kink at x = 3, so far fewer points than a uniform grid of the same resolution
+    assert len(points) < 30
+    assert np.diff(points).min() < 0.01
+    assert np.diff(points[points > 5]).min() == pytest.approx(1)
+    assert np.allclose(curve.loc[curve["outcome"] == "z", "median"], 2 * points)
+    assert np.allclose(curve.loc[curve["outcome"] == "z", "upper"], 2 * points + 1)
+    assert sum(model.client.calls) == len(points)
+
+
+def test_sweep_respects_max_points(model):
+    curve = model.sweep("x", (0, 10), ["y"], initial_points=11, max_points=15, tolerance=0.0)
+    assert len(curve) == 15
+    with pytest.raises(Exception):
+        model.sweep("x", (1, 1), ["y"])
+
+
+def test_sweep_refines_sharpest_bends_first():
+    # A slight kink at x = 1 and a sharp one at x = 7
+    model = Model("sweep-model", CurveClient({"y": lambda x: 0.2 * np.abs(x - 1) + np.abs(x - 7)}))
+
+    curve = model.sweep("x", (0, 10), ["y"], initial_points=11, max_points=13, tolerance=0.001)
+    assert sorted(set(curve["x"]) - set(np.linspace(0, 10, 11))) == [6.5, 7.5]
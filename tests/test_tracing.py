@@ -0,0 +1,93 @@
+import pytest
+import requests
+from causadb.tracing import Span, endpoint_template, run_hooks
+from causadb.transport import Transport
+
+
+def test_endpoint_template():
+    assert endpoint_template(
+        "/models/my-model/causal-effects") == "/models/{model}/causal-effects"
+    assert endpoint_template("/data/my-data") == "/data/{data}"
+    assert endpoint_template("/models") == "/models"
+    assert endpoint_template("/account") == "/account"
+
+
+def test_span_fields():
+    span = Span("POST", "/models/my-model/simulate-actions")
+    assert span.model_name == "my-model"
+    assert span.name == "POST /models/{model}/simulate-actions"
+    assert len(span.trace_id) == 32 and len(span.span_id) == 16
+
+    span.attributes["team"] = "pricing"
+    span.attributes["_private"] = object()
+    span.finish()
+    fields = span.to_dict()
+    assert fields["team"] == "pricing"
+    assert "_private" not in fields
+    assert fields["duration"] >= 0
+
+
+def test_failing_hook_does_not_raise():
+    calls = []
+
+    def broken_hook(span):
+        raise Exception("hook failed")
+
+    run_hooks([broken_hook, calls.append], Span("GET", "/models"))
+    assert len(calls) == 1
+
+
+def test_opentelemetry_spans_nest_server_spans():
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from causadb.tracing import OpenTelemetryExporter
+
+    exported = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exported))
+    exporter = OpenTelemetryExporter(tracer_provider=provider)
+
+    with provider.get_tracer("test").start_as_current_span("caller") as caller:
+        span = Span("GET", "/models/my-model")
+        exporter.before_request(span)
+        span.status_code = 200
+        span.finish()
+        exporter.after_request(span)
+
+    client_span = next(s for s in exported.get_finished_spans() if s.name == span.name)
+    # The exported span is the client span, a child of the caller's span
+    assert format(client_span.context.span_id, "016x") == span.span_id
+    assert client_span.context.trace_id == caller.get_span_context().trace_id
+    assert client_span.parent.span_id == caller.get_span_context().span_id
+    assert client_span.attributes["status_code"] == 200
+    # The server is told the client span is its parent
+    assert span.span_id in span.headers["traceparent"]
+
+
+class JSONSession:
+    """Stands in for a requests.Session, answering every request with the same JSON body."""
+
+    def request(self, method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["content-type"] = "application/json"
+        response._content = b'{"value": 1.5}'
+        return response
+
+
+def test_transport_decodes_json_once():
+    transport = Transport()
+    transport.sessions = {"interactive": JSONSession(), "bulk": JSONSession()}
+    spans = []
+    transport.after_request_hooks.append(spans.append)
+
+    response = transport.request("GET", "/models")
+    assert type(response) is requests.Response
+    assert response.json() is response.json()
+    assert response.json() == {"value": 1.5}
+    # Decoding options still apply
+    assert response.json(parse_float=str) == {"value": "1.5"}
+    assert spans[0].decode_time > 0